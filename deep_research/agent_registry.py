@@ -0,0 +1,50 @@
+import functools
+import importlib
+
+# Agent name -> (module, attribute). Importing an agent module builds its Agent
+# and loads the Agents SDK, so nothing here is imported until an agent is used.
+AGENTS = {
+    "planner": ("planner_agent", "planner_agent"),
+    "search": ("search_agent", "search_agent"),
+    "corpus_search": ("search_agent", "corpus_search_agent"),
+    "corpus_summary": ("search_agent", "corpus_summary_agent"),
+    "writer": ("writer_agent", "writer_agent"),
+    "email": ("email_agent", "email_agent"),
+    "followup": ("followup_agent", "followup_agent"),
+    "outline": ("outline_agent", "outline_agent"),
+    "section": ("section_agent", "section_agent"),
+}
+
+
+@functools.cache
+def get_agent(name: str):
+    """Return the named agent, importing its module on first use."""
+    try:
+        module, attribute = AGENTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown agent: {name!r}") from None
+    return getattr(importlib.import_module(module), attribute)
+
+
+@functools.cache
+def get_search_agent(search_context_size: str):
+    """Return the search agent with its web search tool set to ``search_context_size``."""
+    agent = get_agent("search")
+    if all(getattr(tool, "search_context_size", None) == search_context_size for tool in agent.tools):
+        return agent
+    from agents import WebSearchTool
+
+    return agent.clone(tools=[WebSearchTool(search_context_size=search_context_size)])
+
+
+def get_corpus_search_agent(index=None):
+    """
+    Return the corpus search agent, searching ``index`` instead of the default
+    corpus index if given. Not cached, so no index is kept alive by the agent.
+    """
+    agent = get_agent("corpus_search")
+    if index is None:
+        return agent
+    from search_agent import corpus_search_tool
+
+    return agent.clone(tools=[corpus_search_tool(index)])
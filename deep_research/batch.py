@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Callable
+
+DEFAULT_BATCH_CONCURRENCY = 4
+
+
+def query_id(query: str) -> str:
+    return hashlib.sha1(" ".join(query.lower().split()).encode("utf-8")).hexdigest()[:16]
+
+
+def load_queries(path: str) -> list[dict]:
+    """
+    Read queries from a JSONL file. Each line is either a JSON string or an
+    object with a "query" field and an optional "id"; lines without an ID get
+    one derived from the normalized query so reruns line up.
+    """
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"query": record}
+            if not isinstance(record, dict) or not record.get("query"):
+                raise ValueError(f"{path}:{line_number}: expected a query string or an object with a 'query' field")
+            record["id"] = str(record.get("id") or query_id(record["query"]))
+            queries.append(record)
+    return queries
+
+
+def completed_ids(path: str) -> set[str]:
+    """IDs that already have a successful result in an output JSONL file."""
+    if not os.path.exists(path):
+        return set()
+    done = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A partially written last line from an interrupted run.
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def default_manager_factory(scheduler, send_emails: bool):
+    from research_manager import ResearchManager
+    from scheduler import BATCH
+
+    return lambda: ResearchManager(
+        scheduler=scheduler,
+        priority=BATCH,
+        email_mode="render" if send_emails else "none",
+    )
+
+
+async def run_batch(
+    input_path: str,
+    output_path: str,
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    send_emails: bool = False,
+    scheduler=None,
+    manager_factory: Callable | None = None,
+) -> dict:
+    """
+    Research every query in ``input_path``, appending one result record per
+    query to ``output_path`` as soon as it finishes. Queries that already have
+    a successful record are skipped, so an interrupted batch can be rerun.
+    All pipelines share the process-wide search cache and the scheduler's
+    global concurrency and rate limits; ``concurrency`` caps how many
+    pipelines are in flight at once. Returns aggregate throughput figures.
+    """
+    if scheduler is None:
+        from scheduler import default_scheduler
+
+        scheduler = default_scheduler()
+    if manager_factory is None:
+        manager_factory = default_manager_factory(scheduler, send_emails)
+
+    queries = load_queries(input_path)
+    done = completed_ids(output_path)
+    pending = [record for record in queries if record["id"] not in done]
+    print(f"{len(queries)} queries, {len(queries) - len(pending)} already done, {len(pending)} to run")
+
+    start_stats = scheduler.stats()
+    started_at = time.monotonic()
+    semaphore = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+    counts = {"ok": 0, "error": 0}
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(output_path, "a", encoding="utf-8") as output:
+
+        async def research(record: dict) -> None:
+            async with semaphore:
+                manager = manager_factory()
+                query_started = time.monotonic()
+                result = {"id": record["id"], "query": record["query"]}
+                try:
+                    async for _ in manager.run(record["query"]):
+                        pass
+                    if manager.report is None:
+                        raise RuntimeError("research finished without a report")
+                    result.update(status="ok", **manager.report.model_dump())
+                except Exception as e:
+                    result.update(status="error", error=f"{type(e).__name__}: {e}")
+                result["elapsed_seconds"] = round(time.monotonic() - query_started, 3)
+
+            async with write_lock:
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+                counts[result["status"]] += 1
+                print(f"[{counts['ok'] + counts['error']}/{len(pending)}] {result['status']}: {record['query']}")
+
+        await asyncio.gather(*(research(record) for record in pending))
+
+    if send_emails:
+        # The outbox worker is a task on this loop, which asyncio.run cancels on return.
+        from email_outbox import default_email_outbox
+
+        await default_email_outbox().flush(wait_for_retries=True)
+
+    elapsed_minutes = max(time.monotonic() - started_at, 1e-9) / 60
+    end_stats = scheduler.stats()
+    tokens = (end_stats["input_tokens"] - start_stats["input_tokens"]) + (
+        end_stats["output_tokens"] - start_stats["output_tokens"]
+    )
+    summary = {
+        "queries": len(pending),
+        "skipped": len(queries) - len(pending),
+        "succeeded": counts["ok"],
+        "failed": counts["error"],
+        "elapsed_seconds": round(elapsed_minutes * 60, 3),
+        "queries_per_minute": round(len(pending) / elapsed_minutes, 2),
+        "tokens": tokens,
+        "tokens_per_minute": round(tokens / elapsed_minutes, 1),
+        "retries": end_stats["retries"] - start_stats["retries"],
+    }
+    print(f"Batch complete: {json.dumps(summary)}")
+    return summary
@@ -0,0 +1,453 @@
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+
+import httpx
+from agents import RunConfig, Usage, set_tracing_disabled
+from agents.items import ModelResponse
+from agents.models.interface import Model, ModelProvider
+from openai import RateLimitError
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+)
+
+from checkpoints import CheckpointStore
+from email_outbox import EmailOutbox
+from hedging import LatencyTracker
+from metrics import QUANTILES, MetricsRegistry, quantile
+from report_store import ReportStore
+from research_manager import ResearchManager
+from scheduler import AgentScheduler, estimate_tokens
+from search_cache import SearchCache
+
+DEFAULT_BASELINE_PATH = "benchmarks/baseline.json"
+DEFAULT_TOLERANCE = 0.25
+# Latency differences below this are scheduling noise, not regressions.
+NOISE_FLOOR_SECONDS = 0.05
+# Below this many samples a nearest-rank p99 is just the maximum, too noisy to gate on.
+MIN_SAMPLES_FOR_P99 = 100
+
+FACETS = [
+    "market size", "policy landscape", "technology maturity", "supply chain risks",
+    "investment trends", "regional adoption", "cost curves", "workforce skills",
+    "environmental impact", "public opinion", "regulatory outlook", "competitive landscape",
+]
+SCHEMA_KINDS = {
+    "WebSearchPlan": "plan",
+    "ReportData": "write",
+    "FollowUpQuestions": "followup",
+    "ReportOutline": "outline",
+}
+WORDS = (
+    "capacity growth grid storage demand subsidy tariff forecast pilot deployment efficiency "
+    "emissions financing utility adoption research output capital pricing export region"
+).split()
+
+
+@dataclass
+class AgentProfile:
+    """Simulated behaviour of one agent: a log-normal latency, failure rates and output size."""
+
+    median_latency: float
+    latency_sigma: float = 0.4
+    output_tokens: int = 200
+    failure_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+
+    def sample_latency(self, rng: random.Random) -> float:
+        return self.median_latency * math.exp(self.latency_sigma * rng.gauss(0, 1))
+
+
+def default_profiles() -> dict[str, AgentProfile]:
+    return {
+        "plan": AgentProfile(median_latency=0.05, output_tokens=120),
+        "search": AgentProfile(median_latency=0.15, latency_sigma=0.6, output_tokens=300, failure_rate=0.02),
+        "write": AgentProfile(median_latency=0.3, output_tokens=1500),
+        # Summarizing local passages skips the hosted web search round trip.
+        "corpus_search": AgentProfile(median_latency=0.08, latency_sigma=0.4, output_tokens=300),
+        "email": AgentProfile(median_latency=0.05, output_tokens=50),
+        "followup": AgentProfile(median_latency=0.05, output_tokens=80),
+        "outline": AgentProfile(median_latency=0.06, output_tokens=250),
+        # A fifth of the writer's output, so about a fifth of its latency.
+        "section": AgentProfile(median_latency=0.08, output_tokens=300),
+    }
+
+
+@dataclass
+class BenchmarkConfig:
+    pipelines: int = 20
+    concurrency: int = 10
+    searches: int = 5
+    seed: int = 7
+    stream_report: bool = False
+    email_mode: str = "render"
+    max_concurrency: int = 16
+    measure_memory: bool = True
+    search_quorum: int | None = None
+    search_budget: float | None = None
+    iterative_search: bool = False
+    sectioned_report: bool = False
+    profiles: dict[str, AgentProfile] = field(default_factory=default_profiles)
+
+
+class FakeModelError(Exception):
+    """A simulated non-retryable model failure."""
+
+
+def _rate_limit_error() -> RateLimitError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/responses")
+    return RateLimitError("simulated rate limit", response=httpx.Response(429, request=request), body=None)
+
+
+def _message(text: str) -> ResponseOutputMessage:
+    return ResponseOutputMessage(
+        id="msg_fake",
+        type="message",
+        role="assistant",
+        status="completed",
+        content=[ResponseOutputText(type="output_text", text=text, annotations=[])],
+    )
+
+
+def _input_text(input) -> str:
+    if isinstance(input, str):
+        return input
+    return "\n".join(item["content"] for item in input if isinstance(item.get("content"), str))
+
+
+class FakeModel(Model):
+    """
+    Local stand-in for the OpenAI model. The agent is recognised from its output
+    schema and tools, and answers with schema-valid JSON or a plain-text summary
+    after a sampled delay, reporting token usage like the real API. Each call is
+    seeded from its input, so results do not depend on the order calls arrive in.
+    """
+
+    def __init__(self, profiles: dict[str, AgentProfile], searches: int, seed: int):
+        self.profiles = profiles
+        self.searches = searches
+        self.seed = seed
+        self.calls: dict[str, int] = {}
+
+    def _kind(self, output_schema, tools) -> str:
+        if output_schema is not None and not output_schema.is_plain_text():
+            return SCHEMA_KINDS.get(output_schema.name(), "write")
+        if any(type(tool).__name__ == "WebSearchTool" for tool in tools):
+            return "search"
+        if any(getattr(tool, "name", None) == "search_corpus" for tool in tools):
+            return "corpus_search"
+        # The email agent sends through a function tool; the section writer has no tools.
+        return "email" if tools else "section"
+
+    def _words(self, rng: random.Random, tokens: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(max(1, int(tokens * 0.75))))
+
+    def _output(self, rng: random.Random, kind: str, input_text: str, profile: AgentProfile) -> str:
+        if kind == "plan":
+            topic = input_text.splitlines()[0].removeprefix("Query: ").strip()[:80]
+            requested = re.search(r"Number of searches: (\d+)", input_text)
+            how_many = int(requested.group(1)) if requested else self.searches
+            unused = [facet for facet in FACETS if f"{topic} {facet}" not in input_text]
+            facets = rng.sample(unused, min(how_many, len(unused)))
+            return json.dumps({
+                "searches": [{"reason": f"Covers the {facet}", "query": f"{topic} {facet}"} for facet in facets]
+            })
+        if kind == "write":
+            body = "\n\n".join(f"## Section {i + 1}\n\n{self._words(rng, profile.output_tokens // 5)}" for i in range(5))
+            return json.dumps({
+                "short_summary": self._words(rng, 40) + ".",
+                "markdown_report": f"# Report\n\n{body}",
+                "follow_up_questions": [self._words(rng, 8) + "?" for _ in range(3)],
+            })
+        if kind == "outline":
+            return json.dumps({
+                "title": "Report",
+                "sections": [
+                    {"heading": f"Section {i + 1}", "focus": self._words(rng, 15), "sources": [i + 1]}
+                    for i in range(5)
+                ],
+                "short_summary": self._words(rng, 40) + ".",
+                "follow_up_questions": [self._words(rng, 8) + "?" for _ in range(3)],
+            })
+        if kind == "followup":
+            return json.dumps({"questions": [{"question": self._words(rng, 12) + "?"} for _ in range(3)]})
+        return self._words(rng, profile.output_tokens)
+
+    async def _prepare(self, input, output_schema, tools) -> tuple[str, Usage]:
+        kind = self._kind(output_schema, tools)
+        profile = self.profiles[kind]
+        input_text = _input_text(input)
+        # Retries of the same input get their own draw, so a simulated 429 can clear.
+        attempt = self.calls[input_text] = self.calls.get(input_text, 0) + 1
+        rng = random.Random(f"{self.seed}:{kind}:{attempt}:{input_text}")
+        await asyncio.sleep(profile.sample_latency(rng))
+        roll = rng.random()
+        if roll < profile.rate_limit_rate:
+            raise _rate_limit_error()
+        if roll < profile.rate_limit_rate + profile.failure_rate:
+            raise FakeModelError(f"simulated {kind} failure")
+        text = self._output(rng, kind, input_text, profile)
+        input_tokens = estimate_tokens(input_text)
+        output_tokens = estimate_tokens(text)
+        usage = Usage(
+            requests=1,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+        )
+        return text, usage
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, *,
+                           previous_response_id=None, conversation_id=None, prompt=None) -> ModelResponse:
+        text, usage = await self._prepare(input, output_schema, tools)
+        return ModelResponse(output=[_message(text)], usage=usage, response_id=None)
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, *,
+                              previous_response_id=None, conversation_id=None, prompt=None):
+        text, usage = await self._prepare(input, output_schema, tools)
+        sequence = 0
+        for start in range(0, len(text), 40):
+            yield ResponseTextDeltaEvent(
+                type="response.output_text.delta",
+                delta=text[start:start + 40],
+                item_id="msg_fake",
+                output_index=0,
+                content_index=0,
+                sequence_number=sequence,
+                logprobs=[],
+            )
+            sequence += 1
+            await asyncio.sleep(0)
+        response = Response(
+            id="resp_fake",
+            created_at=time.time(),
+            model="fake",
+            object="response",
+            output=[_message(text)],
+            parallel_tool_calls=False,
+            tool_choice="auto",
+            tools=[],
+            usage={
+                "input_tokens": usage.input_tokens,
+                "output_tokens": usage.output_tokens,
+                "total_tokens": usage.total_tokens,
+                "input_tokens_details": {"cached_tokens": 0, "cache_write_tokens": 0},
+                "output_tokens_details": {"reasoning_tokens": 0},
+            },
+        )
+        yield ResponseCompletedEvent(type="response.completed", response=response, sequence_number=sequence)
+
+
+class FakeModelProvider(ModelProvider):
+    """Serve every model name with the same simulated model."""
+
+    def __init__(self, profiles: dict[str, AgentProfile], searches: int, seed: int):
+        self.model = FakeModel(profiles, searches, seed)
+
+    def get_model(self, model_name: str | None) -> Model:
+        return self.model
+
+
+def offline_manager(stream_report: bool = True, **options) -> ResearchManager:
+    """
+    A ResearchManager wired to the simulated model with in-memory stores and no
+    email, for running the UI or the research service without network access.
+    Other ResearchManager ``options`` are passed through.
+    """
+    set_tracing_disabled(True)
+    config = BenchmarkConfig()
+    scheduler = AgentScheduler(
+        base_delay=0.05,
+        run_config=RunConfig(
+            model_provider=FakeModelProvider(config.profiles, config.searches, config.seed),
+            tracing_disabled=True,
+        ),
+    )
+    return ResearchManager(
+        search_cache=SearchCache(path=None),
+        scheduler=scheduler,
+        stream_report=stream_report,
+        email_mode="none",
+        checkpoints=CheckpointStore(path=":memory:"),
+        search_latencies=LatencyTracker(),
+        report_store=ReportStore(path=":memory:"),
+        **options,
+    )
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    return {f"p{int(q * 100)}": round(quantile(samples, q), 4) for q in QUANTILES}
+
+
+async def _drive(config: BenchmarkConfig, trace_memory: bool = False) -> dict:
+    """Run every pipeline once against a fresh fake provider, scheduler, cache and stores."""
+    metrics = MetricsRegistry(jsonl_path=None)
+    provider = FakeModelProvider(config.profiles, config.searches, config.seed)
+    scheduler = AgentScheduler(
+        max_concurrency=config.max_concurrency,
+        requests_per_minute=1_000_000,
+        tokens_per_minute=1_000_000_000,
+        base_delay=0.05,
+        max_delay=1.0,
+        metrics=metrics,
+        run_config=RunConfig(model_provider=provider, tracing_disabled=True),
+    )
+    search_latencies = LatencyTracker()
+    sent = []
+    durations: list[float] = []
+    failures = 0
+    gate = asyncio.Semaphore(config.concurrency)
+
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = EmailOutbox(path=os.path.join(directory, "outbox.sqlite"), sender=lambda *email: sent.append(email))
+        checkpoints = CheckpointStore(path=os.path.join(directory, "checkpoints.sqlite"))
+        search_cache = SearchCache(path=None)
+
+        async def pipeline(index: int):
+            nonlocal failures
+            manager = ResearchManager(
+                search_cache=search_cache,
+                scheduler=scheduler,
+                stream_report=config.stream_report,
+                email_mode=config.email_mode,
+                email_outbox=outbox,
+                checkpoints=checkpoints,
+                metrics=metrics,
+                search_quorum=config.search_quorum,
+                search_budget=config.search_budget,
+                iterative_search=config.iterative_search,
+                sectioned_report=config.sectioned_report,
+                search_latencies=search_latencies,
+                # A store per pipeline, so every run researches its topic afresh.
+                report_store=ReportStore(path=":memory:"),
+            )
+            async with gate:
+                started = time.perf_counter()
+                try:
+                    async for _ in manager.run(f"Benchmark topic {index}: {FACETS[index % len(FACETS)]}"):
+                        pass
+                except Exception as e:
+                    failures += 1
+                    print(f"Pipeline {index} failed: {e}")
+                    return
+                durations.append(time.perf_counter() - started)
+
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(pipeline(i) for i in range(config.pipelines)))
+            # Wait for the background outbox worker the managers started, not a second drain beside it.
+            await outbox.ensure_worker()
+            elapsed = time.perf_counter() - started
+            peak_memory = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+            outbox.close()
+
+    return {
+        "metrics": metrics,
+        "scheduler": scheduler,
+        "durations": durations,
+        "failures": failures,
+        "sent": len(sent),
+        "elapsed": elapsed,
+        "peak_memory": peak_memory,
+    }
+
+
+async def run_benchmark(config: BenchmarkConfig) -> dict:
+    """
+    Drive ``config.pipelines`` full ResearchManager runs against the fake model,
+    ``config.concurrency`` at a time, and return throughput, latency percentiles,
+    token counts and peak memory. Tracing is disabled so nothing leaves the process.
+
+    Peak memory comes from a second pass under tracemalloc, whose overhead would
+    otherwise distort the latencies of the timed pass.
+    """
+    set_tracing_disabled(True)
+    run = await _drive(config)
+    peak_memory = (await _drive(config, trace_memory=True))["peak_memory"] if config.measure_memory else 0
+
+    snapshot = run["metrics"].snapshot()
+    stages = {
+        entry["labels"]["stage"]: {key: round(entry[key], 4) for key in ("p50", "p95", "p99")} | {"count": entry["count"]}
+        for entry in snapshot["histograms"].get("stage_duration_seconds", [])
+    }
+    agents = {
+        entry["labels"]["agent"]: {key: round(entry[key], 4) for key in ("p50", "p95", "p99")} | {"count": entry["count"]}
+        for entry in snapshot["histograms"].get("agent_latency_seconds", [])
+    }
+    stats = run["scheduler"].stats()
+    durations, elapsed = run["durations"], run["elapsed"]
+    return {
+        "config": {key: value for key, value in asdict(config).items() if key != "profiles"},
+        "pipelines": config.pipelines,
+        "succeeded": len(durations),
+        "failed": run["failures"],
+        "emails_sent": run["sent"],
+        "elapsed_seconds": round(elapsed, 3),
+        "pipelines_per_minute": round(len(durations) / elapsed * 60, 2) if elapsed else 0.0,
+        "end_to_end_seconds": _percentiles(durations),
+        "stage_seconds": stages,
+        "agent_seconds": agents,
+        "input_tokens": stats["input_tokens"],
+        "output_tokens": stats["output_tokens"],
+        "retries": stats["retries"],
+        "search_hedges": run["metrics"].counter("search_hedges_total"),
+        "searches_cancelled": run["metrics"].counter("searches_cancelled_total"),
+        "peak_memory_mb": round(peak_memory / 1_000_000, 2),
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """Return a message for every metric that is more than ``tolerance`` worse than the baseline."""
+    regressions = []
+
+    def slower(name: str, current: float, previous: float, floor: float = NOISE_FLOOR_SECONDS):
+        if previous and current > previous * (1 + tolerance) + floor:
+            regressions.append(f"{name}: {current:g} vs baseline {previous:g}")
+
+    if results["pipelines_per_minute"] < baseline["pipelines_per_minute"] * (1 - tolerance):
+        regressions.append(
+            f"pipelines_per_minute: {results['pipelines_per_minute']:g} vs baseline {baseline['pipelines_per_minute']:g}"
+        )
+
+    def gated(count: int) -> tuple[str, ...]:
+        return ("p50", "p95", "p99") if count >= MIN_SAMPLES_FOR_P99 else ("p50", "p95")
+
+    for key in gated(results["succeeded"]):
+        slower(f"end_to_end_seconds.{key}", results["end_to_end_seconds"][key], baseline["end_to_end_seconds"][key])
+    for stage, percentiles in baseline["stage_seconds"].items():
+        if stage not in results["stage_seconds"]:
+            continue
+        for key in gated(results["stage_seconds"][stage]["count"]):
+            slower(f"stage_seconds.{stage}.{key}", results["stage_seconds"][stage][key], percentiles[key])
+    slower("input_tokens", results["input_tokens"], baseline["input_tokens"], floor=0)
+    slower("peak_memory_mb", results["peak_memory_mb"], baseline["peak_memory_mb"], floor=0)
+    return regressions
+
+
+def print_results(results: dict) -> None:
+    print(
+        f"{results['succeeded']}/{results['pipelines']} pipelines in {results['elapsed_seconds']}s "
+        f"({results['pipelines_per_minute']} pipelines/min, {results['retries']} retries, "
+        f"{results['search_hedges']} hedged searches, {results['searches_cancelled']} cancelled)"
+    )
+    print(f"End to end: {results['end_to_end_seconds']}")
+    for stage, percentiles in sorted(results["stage_seconds"].items()):
+        print(f"  {stage:<8} {percentiles}")
+    print(f"Tokens: {results['input_tokens']} in / {results['output_tokens']} out")
+    print(f"Peak memory: {results['peak_memory_mb']} MB")
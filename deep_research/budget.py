@@ -0,0 +1,280 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+
+from scheduler import DEFAULT_OUTPUT_TOKENS, estimate_tokens, result_tokens
+
+DEFAULT_RUN_TOKEN_BUDGET = int(os.getenv("RUN_TOKEN_BUDGET", "0")) or None
+DEFAULT_RUN_COST_BUDGET = float(os.getenv("RUN_COST_BUDGET", "0")) or None
+DEFAULT_RUN_TIME_BUDGET = float(os.getenv("RUN_TIME_BUDGET", "0")) or None
+
+# USD per million input and output tokens. Unknown models are priced like gpt-4o.
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "o4-mini": (1.10, 4.40),
+}
+DEFAULT_MODEL_PRICE = MODEL_PRICES["gpt-4o"]
+
+# USD per web search tool call by search_context_size, and roughly how many
+# tokens of search results each call adds to the model input.
+WEB_SEARCH_CALL_PRICES = {
+    "gpt-4o-mini": {"low": 0.025, "medium": 0.0275, "high": 0.030},
+    "gpt-4.1-mini": {"low": 0.025, "medium": 0.0275, "high": 0.030},
+    "gpt-4o": {"low": 0.030, "medium": 0.035, "high": 0.050},
+}
+DEFAULT_WEB_SEARCH_CALL_PRICE = WEB_SEARCH_CALL_PRICES["gpt-4o"]
+WEB_SEARCH_CONTEXT_TOKENS = {"low": 2000, "medium": 4000, "high": 8000}
+SEARCH_CONTEXT_SIZES = ("low", "medium", "high")
+
+# A search summary is under 300 words.
+SEARCH_OUTPUT_TOKENS = 500
+# The writer is asked for at least 1000 words and usually writes about twice that.
+DEFAULT_REPORT_WORDS = 2000
+REPORT_WORD_LIMITS = (1200, 800, 500)
+TOKENS_PER_WORD = 1.4
+# Short summary, follow-up questions and JSON around the markdown report.
+REPORT_OVERHEAD_TOKENS = 300
+# Share of the remaining wall-clock budget searching may use, leaving the rest for writing.
+SEARCH_TIME_SHARE = 0.5
+
+
+class BudgetExceeded(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Estimate:
+    tokens: int = 0
+    cost: float = 0.0
+
+    def __add__(self, other: "Estimate") -> "Estimate":
+        return Estimate(self.tokens + other.tokens, self.cost + other.cost)
+
+    def __sub__(self, other: "Estimate") -> "Estimate":
+        return Estimate(self.tokens - other.tokens, self.cost - other.cost)
+
+    def __mul__(self, times: int) -> "Estimate":
+        return Estimate(self.tokens * times, self.cost * times)
+
+
+@dataclass(frozen=True)
+class RunPlan:
+    """How much work a run does: searches, search context size and report length (None = as the writer likes)."""
+
+    searches: int
+    search_context_size: str = "low"
+    report_words: int | None = None
+
+
+def report_output_tokens(words: int | None) -> int:
+    return int((words or DEFAULT_REPORT_WORDS) * TOKENS_PER_WORD) + REPORT_OVERHEAD_TOKENS
+
+
+def search_context_size(agent) -> str | None:
+    """The search_context_size of the agent's web search tool, or None if it has none."""
+    for tool in getattr(agent, "tools", None) or []:
+        size = getattr(tool, "search_context_size", None)
+        if size is not None:
+            return size
+    return None
+
+
+def call_cost(model: str, input_tokens: int, output_tokens: int, web_searches: int = 0, context_size: str = "low") -> float:
+    input_price, output_price = MODEL_PRICES.get(model, DEFAULT_MODEL_PRICE)
+    search_price = WEB_SEARCH_CALL_PRICES.get(model, DEFAULT_WEB_SEARCH_CALL_PRICE)[context_size]
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000 + web_searches * search_price
+
+
+def estimate_call(agent, input, output_tokens: int = DEFAULT_OUTPUT_TOKENS) -> Estimate:
+    """
+    Pre-flight estimate of one agent call on ``input`` (text, or its size in
+    tokens), counting one web search for agents with a search tool.
+    """
+    instructions = agent.instructions if isinstance(agent.instructions, str) else ""
+    input_tokens = estimate_tokens(instructions) + (input if isinstance(input, int) else estimate_tokens(str(input)))
+    size = search_context_size(agent)
+    searches = 0 if size is None else 1
+    if size is not None:
+        input_tokens += WEB_SEARCH_CONTEXT_TOKENS[size]
+    cost = call_cost(str(agent.model), input_tokens, output_tokens, searches, size or "low")
+    return Estimate(input_tokens + output_tokens, cost)
+
+
+def usage_cost(agent, result) -> Estimate:
+    """Actual tokens and cost of a completed Runner result."""
+    input_tokens, output_tokens = result_tokens(result)
+    searches = sum(
+        1
+        for item in getattr(result, "new_items", None) or []
+        if getattr(getattr(item, "raw_item", None), "type", None) == "web_search_call"
+    )
+    size = search_context_size(agent) or "low"
+    return Estimate(input_tokens + output_tokens, call_cost(str(agent.model), input_tokens, output_tokens, searches, size))
+
+
+def degrade(plan: RunPlan, fits) -> tuple[RunPlan, list[str]]:
+    """
+    Shrink ``plan`` one step at a time until ``fits(plan)``: fewer searches
+    (down to one), then a smaller search context, then a shorter report.
+    Searches come first because the web search tool fee dominates the cost of
+    a run. Returns the plan, which may still not fit at the smallest
+    setting, and the steps taken.
+    """
+    steps = []
+    while not fits(plan):
+        context = SEARCH_CONTEXT_SIZES.index(plan.search_context_size)
+        shorter = [words for words in REPORT_WORD_LIMITS if plan.report_words is None or words < plan.report_words]
+        if plan.searches > 1:
+            plan, step = replace(plan, searches=plan.searches - 1), "searches"
+        elif context > 0:
+            plan, step = replace(plan, search_context_size=SEARCH_CONTEXT_SIZES[context - 1]), "search_context"
+        elif shorter:
+            plan, step = replace(plan, report_words=shorter[0]), "report_length"
+        else:
+            break
+        steps.append(step)
+    return plan, steps
+
+
+class RunBudget:
+    """
+    Token, cost and wall-clock budget of a research run, or of several runs
+    sharing one instance. Calls reserve their estimate before they are
+    dispatched and settle it against actual usage when they finish; a call
+    only gets a reservation while spent plus reserved plus its estimate stays
+    within every limit, so concurrent calls, in any thread, cannot jointly
+    overspend. Limits left as None are not enforced.
+    """
+
+    def __init__(
+        self,
+        tokens: int | None = DEFAULT_RUN_TOKEN_BUDGET,
+        cost: float | None = DEFAULT_RUN_COST_BUDGET,
+        seconds: float | None = DEFAULT_RUN_TIME_BUDGET,
+    ):
+        self.tokens = tokens
+        self.cost = cost
+        self.seconds = seconds
+        self.spent = Estimate()
+        self.reserved = Estimate()
+        self.started_at: float | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the wall clock, unless an earlier run sharing this budget already has."""
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.monotonic()
+
+    def remaining_seconds(self) -> float:
+        if self.seconds is None:
+            return math.inf
+        elapsed = time.monotonic() - self.started_at if self.started_at is not None else 0.0
+        return self.seconds - elapsed
+
+    def _fits(self, estimate: Estimate) -> bool:
+        total = self.spent + self.reserved + estimate
+        return (
+            (self.tokens is None or total.tokens <= self.tokens)
+            and (self.cost is None or total.cost <= self.cost)
+            and self.remaining_seconds() > 0
+        )
+
+    def fits(self, estimate: Estimate) -> bool:
+        with self._lock:
+            return self._fits(estimate)
+
+    def reserve(self, estimate: Estimate, required: bool = False) -> bool:
+        """Hold ``estimate`` for a call about to start. Required calls always get it, even over budget."""
+        with self._lock:
+            if not required and not self._fits(estimate):
+                return False
+            self.reserved += estimate
+            return True
+
+    def release(self, estimate: Estimate) -> None:
+        with self._lock:
+            self.reserved -= estimate
+
+    def settle(self, estimate: Estimate, actual: Estimate) -> None:
+        """Replace a call's reservation with what it actually used."""
+        with self._lock:
+            self.reserved -= estimate
+            self.spent += actual
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tokens": self.spent.tokens,
+                "cost": round(self.spent.cost, 6),
+                "reserved_tokens": self.reserved.tokens,
+                "reserved_cost": round(self.reserved.cost, 6),
+                "token_limit": self.tokens,
+                "cost_limit": self.cost,
+                "seconds_left": None if self.seconds is None else round(self.remaining_seconds(), 1),
+            }
+
+
+class BudgetedScheduler:
+    """
+    Wraps an AgentScheduler and charges every call to a RunBudget. Each call
+    is estimated and reserved before dispatch, and settled against the
+    tokens and web searches it actually used. Calls passed ``required=False``
+    raise BudgetExceeded instead of running when the budget cannot cover
+    them. ``output_tokens`` is the expected output length for the estimate.
+    """
+
+    def __init__(self, scheduler, budget: RunBudget, metrics=None):
+        self.scheduler = scheduler
+        self.budget = budget
+        self.metrics = metrics
+
+    def _reserve(self, agent, input, output_tokens: int, required: bool) -> Estimate:
+        estimate = estimate_call(agent, input, output_tokens)
+        if not self.budget.reserve(estimate, required):
+            if self.metrics is not None:
+                self.metrics.inc("budget_skipped_calls_total", agent=agent.name)
+            raise BudgetExceeded(f"{agent.name} call (~{estimate.tokens} tokens, ${estimate.cost:.4f}) is over the run budget")
+        return estimate
+
+    def _abandon(self, estimate: Estimate, error: BaseException) -> None:
+        # A cancelled call may still be billed, so it is charged its estimate; a failed one is not.
+        if isinstance(error, asyncio.CancelledError):
+            self.budget.settle(estimate, estimate)
+        else:
+            self.budget.release(estimate)
+
+    async def run(self, agent, input, required: bool = True, output_tokens: int = DEFAULT_OUTPUT_TOKENS, **kwargs):
+        estimate = self._reserve(agent, input, output_tokens, required)
+        try:
+            result = await self.scheduler.run(agent, input, estimated_tokens=estimate.tokens, **kwargs)
+        except BaseException as e:
+            self._abandon(estimate, e)
+            raise
+        self.budget.settle(estimate, usage_cost(agent, result))
+        return result
+
+    async def run_streamed(self, agent, input, required: bool = True, output_tokens: int = DEFAULT_OUTPUT_TOKENS, **kwargs):
+        estimate = self._reserve(agent, input, output_tokens, required)
+        # The last item is the completed result, so each event is held back until the next arrives.
+        last = None
+        try:
+            async for event in self.scheduler.run_streamed(agent, input, estimated_tokens=estimate.tokens, **kwargs):
+                if last is not None:
+                    yield last
+                last = event
+        except BaseException as e:
+            self._abandon(estimate, e)
+            raise
+        self.budget.settle(estimate, usage_cost(agent, last))
+        yield last
+
+    def __getattr__(self, name):
+        return getattr(self.scheduler, name)
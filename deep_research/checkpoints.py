@@ -0,0 +1,98 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+DEFAULT_CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite")
+
+CLARIFICATION = "clarification"
+PLAN = "plan"
+SEARCH_RESULTS = "search_results"
+REPORT = "report"
+EMAIL = "email"
+STAGES = (CLARIFICATION, PLAN, SEARCH_RESULTS, REPORT, EMAIL)
+
+
+class CheckpointStore:
+    """
+    SQLite store of per-stage outputs for research runs, keyed by run ID.
+
+    Each stage's output is saved as JSON as soon as the stage completes, so a
+    run that fails later can be resumed without repeating the stages that
+    already finished.
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "run_id TEXT PRIMARY KEY, query TEXT NOT NULL, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stages ("
+            "run_id TEXT NOT NULL, stage TEXT NOT NULL, payload TEXT NOT NULL, "
+            "created_at REAL NOT NULL, PRIMARY KEY (run_id, stage))"
+        )
+        self._conn.commit()
+
+    def create_run(self, query: str) -> str:
+        """Register a new run for ``query`` and return its run ID."""
+        run_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, query, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (run_id, query, now, now),
+            )
+            self._conn.commit()
+        return run_id
+
+    def query(self, run_id: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT query FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return row[0] if row else None
+
+    def save(self, run_id: str, stage: str, payload) -> None:
+        """Persist the JSON-serializable output of ``stage``."""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: {stage!r}")
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stages (run_id, stage, payload, created_at) VALUES (?, ?, ?, ?)",
+                (run_id, stage, json.dumps(payload), now),
+            )
+            self._conn.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (now, run_id))
+            self._conn.commit()
+
+    def load(self, run_id: str) -> dict:
+        """Return the saved outputs of ``run_id`` keyed by stage."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, payload FROM stages WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        return {stage: json.loads(payload) for stage, payload in rows}
+
+    def last_completed_stage(self, run_id: str) -> str | None:
+        saved = self.load(run_id)
+        completed = [stage for stage in STAGES if stage in saved]
+        return completed[-1] if completed else None
+
+
+_default_store: CheckpointStore | None = None
+
+
+def default_checkpoint_store() -> CheckpointStore:
+    """Return the process-wide checkpoint store shared by every ResearchManager."""
+    global _default_store
+    if _default_store is None:
+        _default_store = CheckpointStore()
+    return _default_store
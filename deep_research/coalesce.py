@@ -0,0 +1,98 @@
+import asyncio
+from typing import Callable
+
+from search_cache import normalize_query
+from search_dedup import query_similarity
+
+_END = object()
+
+
+class _Flight:
+    """One in-flight research pipeline and the queues of everyone subscribed to it."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.history: list = []
+        self.queues: set[asyncio.Queue] = set()
+        self.task: asyncio.Task | None = None
+        self.done = False
+        self.error: BaseException | None = None
+
+
+class ResearchCoalescer:
+    """
+    Single-flight front for research runs.
+
+    Concurrent calls for the same normalized query, or for a query at least
+    ``fuzzy_threshold`` similar to one in flight, attach to the running
+    pipeline instead of starting their own. Every subscriber receives the
+    updates already produced followed by the rest of the stream. The pipeline
+    is cancelled only when its last subscriber goes away.
+    """
+
+    def __init__(self, manager_factory: Callable, fuzzy_threshold: float | None = None, metrics=None):
+        self.manager_factory = manager_factory
+        self.fuzzy_threshold = fuzzy_threshold
+        self.metrics = metrics
+        self._flights: dict[str, _Flight] = {}
+
+    def _find(self, key: str) -> _Flight | None:
+        flight = self._flights.get(key)
+        if flight is None and self.fuzzy_threshold is not None:
+            flight = next(
+                (f for k, f in self._flights.items() if query_similarity(key, k) >= self.fuzzy_threshold),
+                None,
+            )
+        return flight
+
+    async def _drive(self, flight: _Flight, query: str) -> None:
+        try:
+            async for update in self.manager_factory().run(query):
+                flight.history.append(update)
+                for queue in flight.queues:
+                    queue.put_nowait(update)
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            for queue in flight.queues:
+                queue.put_nowait(_END)
+
+    async def run(self, query: str):
+        """Yield the status updates and final report of the research run for ``query``."""
+        key = normalize_query(query)
+        flight = self._find(key)
+        if flight is None:
+            flight = _Flight(key)
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._drive(flight, query))
+        else:
+            print(f"Joining in-flight research for '{flight.key}' ({len(flight.queues)} subscribers)")
+            if self.metrics is not None:
+                self.metrics.inc("research_coalesced_total")
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for update in flight.history:
+            queue.put_nowait(update)
+        flight.queues.add(queue)
+        try:
+            while True:
+                update = await queue.get()
+                if update is _END:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                yield update
+        finally:
+            flight.queues.discard(queue)
+            if not flight.queues and not flight.done:
+                print(f"Last subscriber left, cancelling research for '{flight.key}'")
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+                flight.task.cancel()
+
+    def in_flight(self) -> dict[str, int]:
+        """Subscriber counts of the pipelines currently running, keyed by normalized query."""
+        return {key: len(flight.queues) for key, flight in self._flights.items()}
@@ -0,0 +1,114 @@
+import random
+import string
+import tempfile
+import time
+
+from corpus_index import CorpusIndex
+from metrics import QUANTILES, quantile
+
+DEFAULT_BENCHMARK_CHUNKS = 1_000_000
+DEFAULT_BENCHMARK_CHUNK_WORDS = 60
+DEFAULT_VOCABULARY = 50_000
+CHUNKS_PER_DOCUMENT = 10
+# Query words are drawn from these Zipf ranks: frequent enough to match many
+# chunks, rare enough to carry weight, like the terms of a real search.
+QUERY_RANKS = (50, 20_000)
+
+
+def synthetic_vocabulary(size: int, rng: random.Random) -> list[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))))
+    return sorted(words)
+
+
+def synthetic_documents(chunks: int, chunk_words: int, vocabulary: list[str], rng: random.Random):
+    """Documents of CHUNKS_PER_DOCUMENT chunks whose words follow a Zipf distribution over ``vocabulary``."""
+    weights, total = [], 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1 / rank
+        weights.append(total)
+    for n in range(0, chunks, CHUNKS_PER_DOCUMENT):
+        words = min(CHUNKS_PER_DOCUMENT, chunks - n) * chunk_words
+        yield f"doc-{n // CHUNKS_PER_DOCUMENT:07d}.txt", " ".join(rng.choices(vocabulary, cum_weights=weights, k=words))
+
+
+class _Timed:
+    """Iterate ``items`` while adding up the time spent producing them, to leave it out of the measurement."""
+
+    def __init__(self, items):
+        self.items = iter(items)
+        self.seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            return next(self.items)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    return {f"p{int(q * 100)}": round(quantile(samples, q) * 1000, 2) for q in QUANTILES}
+
+
+def run_corpus_benchmark(
+    chunks: int = DEFAULT_BENCHMARK_CHUNKS,
+    chunk_words: int = DEFAULT_BENCHMARK_CHUNK_WORDS,
+    queries: int = 200,
+    seed: int = 7,
+    directory: str | None = None,
+) -> dict:
+    """
+    Index ``chunks`` synthetic chunks, then time BM25 queries of two to four
+    words against the index and the incremental addition of one more document.
+    """
+    rng = random.Random(seed)
+    vocabulary = synthetic_vocabulary(DEFAULT_VOCABULARY, rng)
+    with tempfile.TemporaryDirectory() as scratch:
+        index = CorpusIndex(directory or scratch, chunk_words=chunk_words, chunk_overlap=0)
+        documents = _Timed(synthetic_documents(chunks, chunk_words, vocabulary, rng))
+        started = time.perf_counter()
+        index.add_documents(documents)
+        index_seconds = time.perf_counter() - started - documents.seconds
+
+        low, high = QUERY_RANKS
+        latencies, hits = [], 0
+        for _ in range(queries):
+            terms = rng.sample(vocabulary[low:min(high, len(vocabulary))], rng.randint(2, 4))
+            started = time.perf_counter()
+            hits += len(index.search(" ".join(terms)))
+            latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        index.add_documents(synthetic_documents(CHUNKS_PER_DOCUMENT, chunk_words, vocabulary, rng))
+        update_seconds = time.perf_counter() - started
+        stats = index.stats()
+        index.close()
+    return {
+        "config": {"chunks": chunks, "chunk_words": chunk_words, "queries": queries, "seed": seed},
+        "index": {
+            "seconds": round(index_seconds, 2),
+            "chunks_per_second": round(chunks / index_seconds),
+            "segments": stats["segments"],
+            "terms": stats["terms"],
+            "megabytes": round(stats["bytes"] / 1e6, 1),
+        },
+        "query_ms": _percentiles(latencies),
+        "mean_hits": round(hits / max(queries, 1), 2),
+        "add_document_ms": round(update_seconds * 1000, 2),
+    }
+
+
+def print_corpus_results(results: dict) -> None:
+    config, index = results["config"], results["index"]
+    print(f"Corpus index of {config['chunks']} chunks of {config['chunk_words']} words:")
+    print(
+        f"  indexed in {index['seconds']}s ({index['chunks_per_second']} chunks/s), "
+        f"{index['segments']} segments, {index['terms']} terms, {index['megabytes']} MB"
+    )
+    print(f"  query latency (ms) over {config['queries']} queries: {results['query_ms']}")
+    print(f"  adding one {CHUNKS_PER_DOCUMENT}-chunk document: {results['add_document_ms']} ms")
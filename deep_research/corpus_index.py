@@ -0,0 +1,463 @@
+import contextlib
+import heapq
+import math
+import mmap
+import os
+import sqlite3
+import threading
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from novelty import content_words
+
+DEFAULT_CORPUS_DIR = os.getenv("CORPUS_DIR", "corpus")
+DEFAULT_CORPUS_INDEX_DIR = os.getenv("CORPUS_INDEX_DIR", ".cache/corpus_index")
+CORPUS_EXTENSIONS = (".txt", ".md", ".markdown", ".rst")
+DEFAULT_CHUNK_WORDS = 200
+DEFAULT_CHUNK_OVERLAP = 40
+DEFAULT_SEGMENT_CHUNKS = 100_000
+DEFAULT_HITS = 5
+SNIPPET_WORDS = 60
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Term frequencies and chunk lengths are stored as unsigned 16-bit integers.
+MAX_COUNT = 0xFFFF
+# update() merges every segment once this share of stored chunks belongs to
+# deleted or changed documents, and merges the small segments once there are
+# more than MAX_SMALL_SEGMENTS of them.
+MAX_DEAD_FRACTION = 0.3
+MAX_SMALL_SEGMENTS = 8
+# Where searches go: the hosted web search tool, the local corpus, or the
+# corpus first and the web when the corpus has too little on a search.
+SEARCH_BACKENDS = ("web", "local", "hybrid")
+DEFAULT_SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "web")
+# Share of a search's content words the local hits must contain for hybrid
+# search to answer from the corpus instead of the web.
+DEFAULT_LOCAL_RECALL_THRESHOLD = float(os.getenv("LOCAL_RECALL_THRESHOLD", "0.6"))
+
+
+@dataclass
+class CorpusHit:
+    path: str
+    chunk: int
+    score: float
+    text: str
+    snippet: str
+
+
+def chunk_text(text: str, words: int = DEFAULT_CHUNK_WORDS, overlap: int = DEFAULT_CHUNK_OVERLAP) -> list[str]:
+    """
+    Split ``text`` into windows of ``words`` words, each sharing ``overlap``
+    words with the previous one. Whitespace inside a chunk becomes one space.
+    """
+    tokens = text.split()
+    step = max(1, words - overlap)
+    chunks = []
+    for start in range(0, len(tokens), step):
+        chunks.append(" ".join(tokens[start:start + words]))
+        if start + words >= len(tokens):
+            break
+    return chunks
+
+
+def make_snippet(text: str, terms: set[str], words: int = SNIPPET_WORDS) -> str:
+    """The window of ``words`` words of ``text`` containing the most distinct ``terms``."""
+    tokens = text.split()
+    if len(tokens) <= words:
+        return " ".join(tokens)
+    matched = [set(content_words(token)) & terms for token in tokens]
+    best, best_score = 0, -1
+    for start in range(len(tokens) - words + 1):
+        score = len(set().union(*matched[start:start + words]))
+        if score > best_score:
+            best, best_score = start, score
+    prefix = "…" if best > 0 else ""
+    suffix = "…" if best + words < len(tokens) else ""
+    return f"{prefix}{' '.join(tokens[best:best + words])}{suffix}"
+
+
+def local_recall(query: str, hits: list[CorpusHit]) -> float:
+    """Share of the content words of ``query`` that appear in at least one hit."""
+    terms = set(content_words(query))
+    if not terms or not hits:
+        return 0.0
+    found = set()
+    for hit in hits:
+        found |= terms & set(content_words(hit.text))
+    return len(found) / len(terms)
+
+
+def format_hits(hits: list[CorpusHit]) -> str:
+    """Hits as numbered passages with their source file, for a search agent to summarize."""
+    if not hits:
+        return "No matching documents in the local corpus."
+    return "\n\n".join(f"[{n}] {hit.path} (part {hit.chunk + 1})\n{hit.snippet}" for n, hit in enumerate(hits, start=1))
+
+
+def _segment_path(directory: str, segment: int, kind: str) -> str:
+    return os.path.join(directory, f"{segment:06d}.{kind}")
+
+
+def _remove_segment_files(directory: str, segment: int) -> None:
+    for kind in ("post", "chunks", "text"):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(_segment_path(directory, segment, kind))
+
+
+def _padding(size: int, alignment: int) -> bytes:
+    return b"\0" * (-size % alignment)
+
+
+class _Segment:
+    """
+    One immutable, memory-mapped segment of the index:
+
+    - ``.post``: per term, the local ids (uint32) then the term frequencies
+      (uint16) of the chunks containing it, padded to 4 bytes.
+    - ``.chunks``: per chunk, its document id (uint32) and length in content
+      words (uint16), then the offsets (uint64) of each chunk in ``.text``.
+    - ``.text``: the UTF-8 text of every chunk, back to back.
+    """
+
+    def __init__(self, directory: str, id: int, chunks: int):
+        self.id = id
+        self.chunks = chunks
+        self.directory = directory
+        self._maps = {}
+        for kind in ("post", "chunks", "text"):
+            with open(_segment_path(directory, id, kind), "rb") as file:
+                size = os.fstat(file.fileno()).st_size
+                self._maps[kind] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def postings(self, offset: int, df: int) -> tuple[memoryview, memoryview]:
+        view = memoryview(self._maps["post"])
+        ids_end = offset + 4 * df
+        return view[offset:ids_end].cast("I"), view[ids_end:ids_end + 2 * df].cast("H")
+
+    def docs(self) -> memoryview:
+        return memoryview(self._maps["chunks"])[:4 * self.chunks].cast("I")
+
+    def lengths(self) -> memoryview:
+        return memoryview(self._maps["chunks"])[4 * self.chunks:6 * self.chunks].cast("H")
+
+    def text(self, local: int) -> str:
+        start = 6 * self.chunks + len(_padding(6 * self.chunks, 8))
+        offsets = memoryview(self._maps["chunks"])[start:start + 8 * (self.chunks + 1)].cast("Q")
+        return self._maps["text"][offsets[local]:offsets[local + 1]].decode("utf-8")
+
+    def close(self) -> None:
+        for map in self._maps.values():
+            if isinstance(map, mmap.mmap):
+                map.close()
+
+    def remove(self) -> None:
+        self.close()
+        _remove_segment_files(self.directory, self.id)
+
+
+class _SegmentWriter:
+    """Buffers added documents in memory and writes them out as segments of about ``segment_chunks`` chunks."""
+
+    def __init__(self, index: "CorpusIndex"):
+        self.index = index
+        self.next_id = (index._conn.execute("SELECT MAX(id) FROM segments").fetchone()[0] or 0) + 1
+        self.written: list[int] = []
+        self._reset()
+
+    def _reset(self) -> None:
+        self.postings: dict[str, tuple[array, array]] = {}
+        self.docs = array("I")
+        self.lengths = array("H")
+        self.offsets = array("Q", [0])
+        self.text = bytearray()
+
+    def add_document(self, path: str, chunks: list[str], mtime: float = 0.0, size: int = 0) -> int:
+        if self.docs and len(self.docs) + len(chunks) > self.index.segment_chunks:
+            self.flush()
+        first = len(self.docs)
+        tokens = 0
+        postings = self.postings
+        for chunk in chunks:
+            words = content_words(chunk)[:MAX_COUNT]
+            local = len(self.lengths)
+            for term, tf in Counter(words).items():
+                posting = postings.get(term)
+                if posting is None:
+                    posting = postings[term] = (array("I"), array("H"))
+                posting[0].append(local)
+                posting[1].append(tf)
+            self.lengths.append(len(words))
+            tokens += len(words)
+            self.text += chunk.encode("utf-8")
+            self.offsets.append(len(self.text))
+        cursor = self.index._conn.execute(
+            "INSERT INTO documents (path, mtime, size, segment, first_chunk, chunks, tokens) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, mtime, size, self.next_id, first, len(chunks), tokens),
+        )
+        self.docs.extend([cursor.lastrowid] * len(chunks))
+        return len(chunks)
+
+    def flush(self) -> None:
+        if not self.docs:
+            return
+        segment, directory, conn = self.next_id, self.index.directory, self.index._conn
+        terms = []
+        offset = 0
+        with open(_segment_path(directory, segment, "post"), "wb") as file:
+            for term in sorted(self.postings):
+                ids, tfs = self.postings[term]
+                data = ids.tobytes() + tfs.tobytes()
+                data += _padding(len(data), 4)
+                file.write(data)
+                terms.append((term, segment, offset, len(ids)))
+                offset += len(data)
+        with open(_segment_path(directory, segment, "chunks"), "wb") as file:
+            head = self.docs.tobytes() + self.lengths.tobytes()
+            file.write(head + _padding(len(head), 8) + self.offsets.tobytes())
+        with open(_segment_path(directory, segment, "text"), "wb") as file:
+            file.write(self.text)
+        conn.executemany("INSERT INTO terms (term, segment, offset, df) VALUES (?, ?, ?, ?)", terms)
+        conn.execute("INSERT INTO segments (id, chunks) VALUES (?, ?)", (segment, len(self.docs)))
+        self.written.append(segment)
+        self.next_id += 1
+        self._reset()
+
+
+class CorpusIndex:
+    """
+    Incremental BM25 index over a directory of text and markdown documents.
+
+    Documents are split into overlapping chunks of ``chunk_words`` words,
+    and each chunk is scored as a separate document. The index is a set of
+    immutable segments, each with memory-mapped postings, chunk metadata and
+    chunk text, and an SQLite catalog of documents, segments and the
+    postings offset of each term in each segment. ``update`` only indexes
+    new and changed files into a new segment; the chunks of changed and
+    deleted files stay in their old segment, skipped at query time, until
+    segments are merged.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_CORPUS_INDEX_DIR,
+        chunk_words: int = DEFAULT_CHUNK_WORDS,
+        chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+        segment_chunks: int = DEFAULT_SEGMENT_CHUNKS,
+    ):
+        self.directory = directory
+        self.chunk_words = chunk_words
+        self.chunk_overlap = chunk_overlap
+        self.segment_chunks = segment_chunks
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "catalog.sqlite"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "id INTEGER PRIMARY KEY, path TEXT NOT NULL, mtime REAL NOT NULL, size INTEGER NOT NULL, "
+            "segment INTEGER NOT NULL, first_chunk INTEGER NOT NULL, chunks INTEGER NOT NULL, tokens INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documents_path ON documents (path)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS segments (id INTEGER PRIMARY KEY, chunks INTEGER NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS terms (term TEXT NOT NULL, segment INTEGER NOT NULL, "
+            "offset INTEGER NOT NULL, df INTEGER NOT NULL, PRIMARY KEY (term, segment)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+        self._segments: dict[int, _Segment] = {}
+        self._reload()
+
+    def _reload(self) -> None:
+        """Sync the open segments, live documents and corpus statistics with the catalog."""
+        stored = dict(self._conn.execute("SELECT id, chunks FROM segments"))
+        for id in [id for id in self._segments if id not in stored]:
+            self._segments.pop(id).close()
+        for id, chunks in stored.items():
+            if id not in self._segments:
+                self._segments[id] = _Segment(self.directory, id, chunks)
+        self._live = {row[0] for row in self._conn.execute("SELECT id FROM documents")}
+        chunks, tokens = self._conn.execute("SELECT COALESCE(SUM(chunks), 0), COALESCE(SUM(tokens), 0) FROM documents").fetchone()
+        self.chunks, self.tokens = chunks, tokens
+        self.stored_chunks = sum(stored.values())
+
+    def _write(self, change) -> None:
+        """Run ``change(writer)`` in one transaction, removing any segment files it wrote if it fails."""
+        writer = _SegmentWriter(self)
+        try:
+            change(writer)
+            writer.flush()
+            self._conn.commit()
+        except BaseException:
+            self._conn.rollback()
+            for segment in [*writer.written, writer.next_id]:
+                _remove_segment_files(self.directory, segment)
+            raise
+        finally:
+            self._reload()
+
+    def add_documents(self, documents: Iterable[tuple[str, str]]) -> int:
+        """
+        Index ``(path, text)`` pairs as new documents, for corpora that are
+        not files under one directory. Returns the number of chunks added.
+        Documents added this way are removed by ``update``.
+        """
+        added = 0
+
+        def add(writer: _SegmentWriter) -> None:
+            nonlocal added
+            for path, text in documents:
+                added += writer.add_document(path, chunk_text(text, self.chunk_words, self.chunk_overlap))
+
+        with self._lock:
+            self._write(add)
+        return added
+
+    def update(self, corpus_dir: str = DEFAULT_CORPUS_DIR) -> dict:
+        """
+        Bring the index in line with the documents under ``corpus_dir``:
+        index new and changed files, forget deleted ones, and merge segments
+        when too many chunks are dead or too many small segments piled up.
+        """
+        root = Path(corpus_dir)
+        files = {}
+        for path in sorted(root.rglob("*")):
+            if path.is_file() and path.suffix.lower() in CORPUS_EXTENSIONS:
+                stat = path.stat()
+                files[path.relative_to(root).as_posix()] = (path, stat.st_mtime, stat.st_size)
+        stats = {"added": 0, "removed": 0, "chunks": 0, "merged": 0}
+        with self._lock:
+            known = {row[1]: row for row in self._conn.execute("SELECT id, path, mtime, size FROM documents")}
+            stale = [
+                row[0] for name, row in known.items() if name not in files or (row[2], row[3]) != files[name][1:]
+            ]
+            new = [name for name in files if name not in known or known[name][0] in stale]
+
+            def change(writer: _SegmentWriter) -> None:
+                self._conn.executemany("DELETE FROM documents WHERE id = ?", [(id,) for id in stale])
+                for name in new:
+                    path, mtime, size = files[name]
+                    text = path.read_text(encoding="utf-8", errors="replace")
+                    chunks = chunk_text(text, self.chunk_words, self.chunk_overlap)
+                    stats["chunks"] += writer.add_document(name, chunks, mtime, size)
+
+            self._write(change)
+            stats["added"] = len(new)
+            stats["removed"] = len(stale) - sum(1 for name in new if name in known)
+            stats["merged"] = self._maybe_merge()
+        return stats
+
+    def _maybe_merge(self) -> int:
+        if self.stored_chunks and (self.stored_chunks - self.chunks) / self.stored_chunks > MAX_DEAD_FRACTION:
+            segments = list(self._segments)
+        else:
+            segments = [id for id, segment in self._segments.items() if segment.chunks < self.segment_chunks // 10]
+            if len(segments) <= MAX_SMALL_SEGMENTS:
+                return 0
+        self._merge(segments)
+        return len(segments)
+
+    def merge(self) -> None:
+        """Rewrite every segment into as few as possible, dropping the chunks of deleted documents."""
+        with self._lock:
+            self._merge(list(self._segments))
+
+    def _merge(self, segments: list[int]) -> None:
+        if not segments:
+            return
+        old = {id: self._segments[id] for id in segments}
+        placeholders = ", ".join("?" * len(segments))
+        rows = self._conn.execute(
+            "SELECT id, path, mtime, size, segment, first_chunk, chunks FROM documents "
+            f"WHERE segment IN ({placeholders}) ORDER BY segment, first_chunk",
+            segments,
+        ).fetchall()
+
+        def change(writer: _SegmentWriter) -> None:
+            for id, path, mtime, size, segment, first, chunks in rows:
+                texts = [old[segment].text(first + n) for n in range(chunks)]
+                writer.add_document(path, texts, mtime, size)
+            self._conn.executemany("DELETE FROM documents WHERE id = ?", [(row[0],) for row in rows])
+            self._conn.execute(f"DELETE FROM terms WHERE segment IN ({placeholders})", segments)
+            self._conn.execute(f"DELETE FROM segments WHERE id IN ({placeholders})", segments)
+
+        self._write(change)
+        for segment in old.values():
+            segment.remove()
+
+    def search(self, query: str, k: int = DEFAULT_HITS) -> list[CorpusHit]:
+        """The ``k`` chunks that best match ``query`` by BM25, best first, each with a snippet around the query terms."""
+        terms = list(dict.fromkeys(content_words(query)))
+        with self._lock:
+            if not terms or not self.chunks:
+                return []
+            # tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average length)), with the constant parts hoisted.
+            base = BM25_K1 * (1 - BM25_B)
+            scale = BM25_K1 * BM25_B * self.chunks / self.tokens if self.tokens else 0.0
+            scores: dict[int, dict[int, float]] = {}
+            for term in terms:
+                rows = self._conn.execute("SELECT segment, offset, df FROM terms WHERE term = ?", (term,)).fetchall()
+                df = sum(row[2] for row in rows)
+                # Postings of dead chunks still count towards df until their segment is merged.
+                idf = math.log(1 + (max(self.chunks - df, 0) + 0.5) / (df + 0.5))
+                weight = idf * (BM25_K1 + 1)
+                for segment, offset, count in rows:
+                    ids, tfs = self._segments[segment].postings(offset, count)
+                    lengths = self._segments[segment].lengths()
+                    accumulated = scores.setdefault(segment, {})
+                    get = accumulated.get
+                    for local, tf in zip(ids, tfs):
+                        accumulated[local] = get(local, 0.0) + weight * tf / (tf + base + scale * lengths[local])
+
+            live = self._live
+            dead = self.stored_chunks > self.chunks
+            candidates = []
+            for segment, accumulated in scores.items():
+                docs = self._segments[segment].docs()
+                candidates += (
+                    (score, segment, local)
+                    for local, score in accumulated.items()
+                    if not dead or docs[local] in live
+                )
+            top = heapq.nlargest(k, candidates)
+
+            hits = []
+            wanted = set(terms)
+            for score, segment, local in top:
+                doc = self._segments[segment].docs()[local]
+                path, first = self._conn.execute("SELECT path, first_chunk FROM documents WHERE id = ?", (doc,)).fetchone()
+                text = self._segments[segment].text(local)
+                hits.append(CorpusHit(path, local - first, round(score, 4), text, make_snippet(text, wanted)))
+            return hits
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "documents": len(self._live),
+                "chunks": self.chunks,
+                "stored_chunks": self.stored_chunks,
+                "segments": len(self._segments),
+                "terms": self._conn.execute("SELECT COUNT(DISTINCT term) FROM terms").fetchone()[0],
+                "bytes": sum(
+                    os.path.getsize(os.path.join(self.directory, name)) for name in os.listdir(self.directory)
+                ),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+            self._conn.close()
+
+
+_default_index: CorpusIndex | None = None
+
+
+def default_corpus_index() -> CorpusIndex:
+    """Return the process-wide corpus index, opened on first use."""
+    global _default_index
+    if _default_index is None:
+        _default_index = CorpusIndex()
+    return _default_index
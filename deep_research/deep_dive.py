@@ -0,0 +1,215 @@
+import asyncio
+import os
+from dataclasses import dataclass, field
+
+from novelty import NoveltyTracker
+from scheduler import DEFAULT_OUTPUT_TOKENS, result_tokens
+from search_cache import normalize_query
+from search_dedup import query_similarity
+
+DEFAULT_BREADTH = 3
+DEFAULT_DEPTH = 2
+DEFAULT_BRANCH_CONCURRENCY = 3
+DEFAULT_DEEP_DIVE_TOKEN_BUDGET = int(os.getenv("DEEP_DIVE_TOKEN_BUDGET", "150000"))
+DEFAULT_DEEP_DIVE_TIME_BUDGET = float(os.getenv("DEEP_DIVE_TIME_BUDGET", "900"))
+# Output tokens set aside for the consolidated report on top of its evidence pack.
+CONSOLIDATION_OUTPUT_TOKENS = 4 * DEFAULT_OUTPUT_TOKENS
+
+
+class TokenMeter:
+    """
+    Wraps an AgentScheduler and counts the tokens of every call made through
+    it, so one research tree can be held to its own budget while sharing the
+    process-wide scheduler and its rate limits.
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.tokens = 0
+
+    async def run(self, agent, input, **kwargs):
+        result = await self.scheduler.run(agent, input, **kwargs)
+        input_tokens, output_tokens = result_tokens(result)
+        self.tokens += input_tokens + output_tokens
+        return result
+
+    async def run_streamed(self, agent, input, **kwargs):
+        # The last item of the stream is the completed result carrying the usage.
+        result = None
+        async for result in self.scheduler.run_streamed(agent, input, **kwargs):
+            yield result
+        input_tokens, output_tokens = result_tokens(result)
+        self.tokens += input_tokens + output_tokens
+
+    def __getattr__(self, name):
+        return getattr(self.scheduler, name)
+
+
+@dataclass
+class Branch:
+    question: str
+    depth: int
+    parent: str | None = None
+    results: list[dict] = field(default_factory=list)
+    follow_up_questions: list[str] = field(default_factory=list)
+    tokens: int = 0
+    seconds: float = 0.0
+
+
+class DeepDive:
+    """
+    Recursive research over the writer's follow-up questions.
+
+    The query is researched as the root of a tree, and each branch's
+    ``follow_up_questions`` become child branches, at most ``breadth`` per
+    branch and ``depth`` levels below the root. Branches run ``concurrency`` at
+    a time, the most novel pending question against everything gathered so far
+    first. A branch only starts while the tree's token and wall-clock budgets
+    can still cover it and the final report. Searches are shared across the
+    tree: a search term matching one already made or in flight reuses its
+    result. Everything found is merged into one consolidated report.
+    """
+
+    def __init__(
+        self,
+        manager,
+        breadth: int = DEFAULT_BREADTH,
+        depth: int = DEFAULT_DEPTH,
+        token_budget: int = DEFAULT_DEEP_DIVE_TOKEN_BUDGET,
+        time_budget: float = DEFAULT_DEEP_DIVE_TIME_BUDGET,
+        concurrency: int = DEFAULT_BRANCH_CONCURRENCY,
+    ):
+        self.manager = manager
+        self.meter = TokenMeter(manager.scheduler)
+        manager.scheduler = self.meter
+        self.breadth = breadth
+        self.depth = depth
+        self.token_budget = token_budget
+        self.time_budget = time_budget
+        self.concurrency = concurrency
+        self.branches: list[Branch] = []
+        self.report = None
+        self._searches: dict[str, asyncio.Task] = {}
+
+    @property
+    def metrics(self):
+        return self.manager.metrics
+
+    async def run(self, query: str):
+        """Yield status updates while exploring the tree, then the consolidated markdown report."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.time_budget
+        tracker = NoveltyTracker()
+        frontier = [Branch(query, depth=0)]
+        running: dict[asyncio.Task, Branch] = {}
+        seen_questions = [query]
+        yield f"Deep dive: up to {self.depth} levels of {self.breadth} follow-up questions"
+
+        try:
+            while frontier or running:
+                while (
+                    frontier
+                    and len(running) < self.concurrency
+                    and self._can_start(len(running), deadline - loop.time())
+                ):
+                    # Pending questions are re-ranked as the tree learns more.
+                    branch = max(frontier, key=lambda b: (tracker.novelty(b.question), -b.depth))
+                    frontier.remove(branch)
+                    running[asyncio.create_task(self.explore(branch))] = branch
+                if not running:
+                    yield f"Budget spent, skipping {len(frontier)} follow-up questions"
+                    break
+
+                timeout = max(0.0, deadline - loop.time())
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    yield f"Time budget spent, stopping {len(running)} branches"
+                    break
+                for task in done:
+                    branch = running.pop(task)
+                    if task.exception() is not None:
+                        print(f"Branch '{branch.question}' failed: {task.exception()}")
+                        continue
+                    self.branches.append(branch)
+                    for result in branch.results:
+                        tracker.add(result["summary"])
+                    yield (
+                        f"Explored '{branch.question}' (depth {branch.depth}): "
+                        f"{len(branch.results)} summaries, {self.meter.tokens} tokens used"
+                    )
+                    for question in branch.follow_up_questions[: self.breadth]:
+                        if all(query_similarity(question, seen) < self.manager.dedup_threshold for seen in seen_questions):
+                            seen_questions.append(question)
+                            frontier.append(Branch(question, depth=branch.depth + 1, parent=branch.question))
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            for task in self._searches.values():
+                task.cancel()
+            await asyncio.gather(*self._searches.values(), return_exceptions=True)
+
+        if not any(branch.results for branch in self.branches):
+            raise RuntimeError("Deep dive found no search results")
+        yield f"Explored {len(self.branches)} questions, writing the consolidated report..."
+        self.report = await self.consolidate(query)
+        self.metrics.observe("deep_dive_branches", len(self.branches))
+        self.metrics.observe("deep_dive_tokens", self.meter.tokens)
+        await self.manager.send_email(self.report)
+        yield self.report.markdown_report
+
+    def _can_start(self, running: int, remaining_seconds: float) -> bool:
+        """Whether the budgets still cover one more branch, the running ones and the final report."""
+        if not self.branches:
+            return running == 0
+        per_branch_tokens = sum(b.tokens for b in self.branches) / len(self.branches)
+        per_branch_seconds = sum(b.seconds for b in self.branches) / len(self.branches)
+        reserve = self.manager.evidence_token_budget + CONSOLIDATION_OUTPUT_TOKENS
+        tokens_needed = self.meter.tokens + (running + 1) * per_branch_tokens + reserve
+        # Leave about as long again as a branch takes for writing the final report.
+        return tokens_needed <= self.token_budget and 2 * per_branch_seconds <= remaining_seconds
+
+    async def explore(self, branch: Branch) -> Branch:
+        """Search one question, and write it up for follow-up questions unless it is a leaf."""
+        loop = asyncio.get_running_loop()
+        started, tokens = loop.time(), self.meter.tokens
+        with self.metrics.span("deep_dive_branch", depth=str(branch.depth)):
+            search_plan = self.manager.dedupe_searches(await self.manager.plan_searches(branch.question))
+            results = await asyncio.gather(*(self.shared_search(item) for item in search_plan.searches))
+            branch.results = [result for result in results if result is not None]
+            if branch.depth < self.depth and branch.results:
+                report = await self.manager.write_report(branch.question, branch.results)
+                branch.follow_up_questions = list(report.follow_up_questions)
+        # Concurrent branches share the meter, so this is an estimate for budgeting.
+        branch.tokens = self.meter.tokens - tokens
+        branch.seconds = loop.time() - started
+        return branch
+
+    async def shared_search(self, item) -> dict | None:
+        """Search ``item`` once per tree: a matching search already made or in flight is reused."""
+        key = normalize_query(item.query)
+        task = self._searches.get(key)
+        if task is None:
+            task = next(
+                (t for k, t in self._searches.items() if query_similarity(key, k) >= self.manager.dedup_threshold),
+                None,
+            )
+        if task is None:
+            task = self._searches[key] = asyncio.create_task(self.manager.search_result(item))
+        else:
+            self.metrics.inc("deep_dive_shared_searches_total")
+        # Shielded so a branch stopped at the deadline does not cancel a search other branches await.
+        return await asyncio.shield(task)
+
+    async def consolidate(self, query: str):
+        """Write one report from the search results of every explored branch."""
+        results, queries = [], set()
+        for branch in self.branches:
+            for result in branch.results:
+                if result["query"] not in queries:
+                    queries.add(result["query"])
+                    results.append(result)
+        explored = "\n".join(f"- {branch.question}" for branch in self.branches[1:])
+        if explored:
+            query = f"{query}\n\nFollow-up questions researched:\n{explored}"
+        return await self.manager.write_report(query, results)
@@ -1,23 +1,75 @@
+import os
+
 import gradio as gr
 from dotenv import load_dotenv
 from research_manager import ResearchManager
+from metrics import default_metrics, start_metrics_server
+from coalesce import ResearchCoalescer
+from deep_dive import DeepDive
+from service_client import stream_research
 
 load_dotenv(override=True)
 
+from trace_export import configure_tracing
+
+configure_tracing("ui")
+
+if os.getenv("METRICS_PORT"):
+    start_metrics_server(int(os.getenv("METRICS_PORT")))
+
+
+# Identical queries submitted while one is already running share that run.
+coalescer = ResearchCoalescer(lambda: ResearchManager(stream_report=True), metrics=default_metrics())
 
-async def run(query: str):
-    async for chunk in ResearchManager().run(query):
-        yield chunk
+
+async def run(query: str, run_id: str = "", clarify: bool = False, deep_dive: bool = False):
+    service_url = os.getenv("RESEARCH_SERVICE_URL")
+    manager = None
+    if deep_dive and (clarify or run_id.strip()):
+        raise gr.Error("A deep dive always starts fresh runs: clear the run ID and the clarifying questions option.")
+    if service_url and clarify:
+        raise gr.Error("Clarifying questions are not available through the research service.")
+    if deep_dive:
+        updates = DeepDive(ResearchManager()).run(query)
+    elif service_url:
+        updates = stream_research(service_url, query, run_id=run_id.strip() or None)
+    elif run_id.strip() or clarify:
+        # Clarifying runs take this session's answers, so they are never shared.
+        manager = ResearchManager(stream_report=True, clarify=clarify)
+        updates = manager.run(query, run_id=run_id.strip() or None)
+    else:
+        updates = coalescer.run(query)
+    async for chunk in updates:
+        # The report pane only shows the latest update, so the run ID also goes
+        # into the resume box where it stays visible and ready to resume from.
+        run_id_update = chunk.removeprefix("Run ID: ") if chunk.startswith("Run ID: ") else gr.skip()
+        yield chunk, manager, run_id_update
+
+
+def send_answers(answers: str, manager: ResearchManager | None):
+    if manager is not None and answers.strip():
+        manager.answer(answers)
+    return ""
 
 
 with gr.Blocks(theme=gr.themes.Default(primary_hue="sky")) as ui:
     gr.Markdown("# Deep Research")
     query_textbox = gr.Textbox(label="What topic would you like to research?")
+    run_id_textbox = gr.Textbox(label="Run ID to resume (optional)")
+    clarify_checkbox = gr.Checkbox(label="Ask clarifying questions (research starts while you answer)")
+    deep_dive_checkbox = gr.Checkbox(label="Deep dive: also research the follow-up questions (slower, one consolidated report)")
     run_button = gr.Button("Run", variant="primary")
+    answers_textbox = gr.Textbox(label="Answers to the clarifying questions")
+    answers_button = gr.Button("Send answers")
     report = gr.Markdown(label="Report")
-    
-    run_button.click(fn=run, inputs=query_textbox, outputs=report)
-    query_textbox.submit(fn=run, inputs=query_textbox, outputs=report)
+    manager_state = gr.State()
+
+    inputs = [query_textbox, run_id_textbox, clarify_checkbox, deep_dive_checkbox]
+    run_button.click(fn=run, inputs=inputs, outputs=[report, manager_state, run_id_textbox])
+    query_textbox.submit(fn=run, inputs=inputs, outputs=[report, manager_state, run_id_textbox])
+    answers_button.click(fn=send_answers, inputs=[answers_textbox, manager_state], outputs=answers_textbox)
+    answers_textbox.submit(fn=send_answers, inputs=[answers_textbox, manager_state], outputs=answers_textbox)
 
-ui.launch(inbrowser=True)
+if __name__ == "__main__":
+    ui.launch(inbrowser=True)
 
@@ -2,42 +2,43 @@ from agents import Agent, WebSearchTool, trace, Runner, gen_trace_id, function_t
 from agents.model_settings import ModelSettings
 from dotenv import load_dotenv
 import asyncio
+import functools
 import os
-import brevo_python
-from brevo_python.rest import ApiException
 
-@function_tool
-def send_email_via_brevo_sdk(
-    subject:str ="No Subject",
-    html_content:str ="",
-    text_content:str ="No content provided."
-):
+@functools.cache
+def transactional_emails_api():
     """
-    Send an email using Brevo's official Python SDK (Transactional Emails).
-    Send out an email with the given subject and HTML body
-
-    Parameters:
-    - subject (str): Email subject.
-    - html_content (str): HTML body.
-
-    Returns:
-    - API response (dict) or error message.
+    Build the Brevo API client once per process. The underlying urllib3 pool
+    is thread-safe, so every send reuses its connections. The Brevo SDK is only
+    imported once the first email is sent.
     """
-    api_key = os.getenv("BREVO_API_KEY")
-    sender_email = os.getenv("SENDER_EMAIL")
-    sender_name = "Shailesh"
-    receiver_email = os.getenv("RECEIVER_EMAIL")
-    receiver_name = "Friend"
+    import brevo_python
 
     # Configure API client with API key
     configuration = brevo_python.Configuration()
-    configuration.api_key['api-key'] = api_key
+    configuration.api_key['api-key'] = os.getenv("BREVO_API_KEY")
 
     # Create an API client
-    api_instance = brevo_python.TransactionalEmailsApi(
+    return brevo_python.TransactionalEmailsApi(
         brevo_python.ApiClient(configuration)
     )
 
+
+def send_email(subject: str, html_content: str, text_content: str) -> dict:
+    """
+    Send an email through Brevo's Transactional Emails API to the configured receiver.
+    Returns the API response as a dict, or {"error": ...} if the API call failed.
+    """
+    import brevo_python
+    from brevo_python.rest import ApiException
+
+    sender_email = os.getenv("SENDER_EMAIL")
+    sender_name = "Shailesh"
+    receiver_email = os.getenv("RECEIVER_EMAIL")
+    receiver_name = "Friend"
+
+    api_instance = transactional_emails_api()
+
     # Prepare the email payload
     send_smtp_email = brevo_python.SendSmtpEmail(
         sender={
@@ -64,6 +65,26 @@ def send_email_via_brevo_sdk(
     except ApiException as e:
         print("Exception when calling TransactionalEmailsApi->send_transac_email: %s\n" % e)
         return {"error": str(e)}
+
+
+@function_tool
+def send_email_via_brevo_sdk(
+    subject:str ="No Subject",
+    html_content:str ="",
+    text_content:str ="No content provided."
+):
+    """
+    Send an email using Brevo's official Python SDK (Transactional Emails).
+    Send out an email with the given subject and HTML body
+
+    Parameters:
+    - subject (str): Email subject.
+    - html_content (str): HTML body.
+
+    Returns:
+    - API response (dict) or error message.
+    """
+    return send_email(subject, html_content, text_content)
     
 INSTRUCTIONS = """You are able to send a nicely formatted HTML email based on a detailed report.
 You will be provided with a detailed report. You should use your tool to send one email, providing the 
@@ -0,0 +1,268 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+DEFAULT_OUTBOX_PATH = os.getenv("EMAIL_OUTBOX_PATH", ".cache/email_outbox.sqlite")
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 30.0
+DEFAULT_MAX_DELAY = 30 * 60.0
+DEFAULT_LEASE_SECONDS = 5 * 60.0
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+DEAD = "dead"
+
+
+class EmailOutbox:
+    """
+    Durable queue of outgoing emails backed by SQLite.
+
+    ``enqueue`` only writes a row, so callers never wait on the email provider.
+    A background worker drains due rows through ``sender`` on a thread pool,
+    retrying failures with jittered exponential backoff and moving an email to
+    the dead letter state once it has failed ``max_attempts`` times. While the
+    worker waits out a backoff, ``ensure_worker`` wakes it to send new emails.
+    Database calls made from the event loop run on a thread.
+
+    Several processes may share one outbox file. Rows are claimed atomically
+    under a lease, so each email is sent by one worker at a time, and a row
+    whose lease expires (its worker crashed mid-send) is claimed again.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_OUTBOX_PATH,
+        sender: Callable[[str, str, str], dict] | None = None,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        max_workers: int = 2,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    ):
+        self.path = path
+        self.sender = sender
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_workers = max_workers
+        self.lease_seconds = lease_seconds
+        self._executor: ThreadPoolExecutor | None = None
+        self._worker: asyncio.Task | None = None
+        self._wake: asyncio.Event | None = None
+        self._inflight: set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode, so claims can open their own BEGIN IMMEDIATE transaction.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, subject TEXT NOT NULL, "
+            "html_content TEXT NOT NULL, text_content TEXT NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_attempt_at REAL NOT NULL, last_error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        if "claimed_by" not in columns:
+            self._conn.execute("ALTER TABLE outbox ADD COLUMN claimed_by TEXT")
+        if "lease_expires_at" not in columns:
+            self._conn.execute("ALTER TABLE outbox ADD COLUMN lease_expires_at REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+
+    def enqueue(self, subject: str, html_content: str, text_content: str) -> int:
+        """Queue an email for delivery and return its outbox ID."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (subject, html_content, text_content, status, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (subject, html_content, text_content, PENDING, now, now, now),
+            )
+            return cursor.lastrowid
+
+    def _claim_due(self, limit: int) -> list[tuple]:
+        """
+        Atomically claim up to ``limit`` due emails under a fresh lease. Expired
+        leases are released first so emails stranded by a crashed worker are due again.
+        """
+        now = time.time()
+        claim = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE outbox SET status = ?, claimed_by = NULL, lease_expires_at = NULL "
+                    "WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                    (PENDING, SENDING, now),
+                )
+                self._conn.execute(
+                    "UPDATE outbox SET status = ?, claimed_by = ?, lease_expires_at = ?, updated_at = ? "
+                    "WHERE id IN (SELECT id FROM outbox WHERE status = ? AND next_attempt_at <= ? "
+                    "ORDER BY next_attempt_at LIMIT ?) AND status = ?",
+                    (SENDING, claim, now + self.lease_seconds, now, PENDING, now, limit, PENDING),
+                )
+                rows = self._conn.execute(
+                    "SELECT id, subject, html_content, text_content, attempts, claimed_by FROM outbox "
+                    "WHERE claimed_by = ? AND status = ?",
+                    (claim, SENDING),
+                ).fetchall()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return rows
+
+    def _next_due_in(self) -> float | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?", (PENDING,)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def _record(self, email_id: int, claim: str, attempts: int, error: str | None) -> None:
+        now = time.time()
+        # Only the holder of the claim may settle the row; a stale worker whose
+        # lease expired must not overwrite the outcome of the current holder.
+        with self._lock:
+            if error is None:
+                self._conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, last_error = NULL, claimed_by = NULL, "
+                    "lease_expires_at = NULL, updated_at = ? WHERE id = ? AND claimed_by = ?",
+                    (SENT, attempts, now, email_id, claim),
+                )
+            elif attempts >= self.max_attempts:
+                print(f"Email {email_id} moved to dead letters after {attempts} attempts: {error}")
+                self._conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, claimed_by = NULL, "
+                    "lease_expires_at = NULL, updated_at = ? WHERE id = ? AND claimed_by = ?",
+                    (DEAD, attempts, error, now, email_id, claim),
+                )
+            else:
+                delay = random.uniform(0.5, 1.0) * min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                self._conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ?, "
+                    "claimed_by = NULL, lease_expires_at = NULL, updated_at = ? WHERE id = ? AND claimed_by = ?",
+                    (PENDING, attempts, error, now + delay, now, email_id, claim),
+                )
+
+    def _send(self, subject: str, html_content: str, text_content: str) -> str | None:
+        """Send one email on a worker thread, returning an error message on failure."""
+        sender = self.sender
+        if sender is None:
+            from email_agent import send_email as sender
+        try:
+            response = sender(subject, html_content, text_content)
+        except Exception as e:
+            return str(e) or type(e).__name__
+        if isinstance(response, dict) and response.get("error"):
+            return str(response["error"])
+        return None
+
+    async def drain_once(self) -> int:
+        """Send every email that is currently due and return how many were attempted."""
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="email-outbox")
+        rows = await asyncio.to_thread(self._claim_due, self.max_workers * 4)
+        if not rows:
+            return 0
+
+        async def deliver(row):
+            email_id, subject, html_content, text_content, attempts, claim = row
+            error = await loop.run_in_executor(self._executor, self._send, subject, html_content, text_content)
+            await asyncio.to_thread(self._record, email_id, claim, attempts + 1, error)
+
+        tasks = [loop.create_task(deliver(row)) for row in rows]
+        self._inflight.update(tasks)
+        for task in tasks:
+            task.add_done_callback(self._inflight.discard)
+        await asyncio.gather(*tasks)
+        return len(rows)
+
+    async def flush(self, wait_for_retries: bool = False, wake: asyncio.Event | None = None) -> None:
+        """
+        Drain the queue, optionally also waiting out scheduled retries. Setting
+        ``wake`` cuts a retry wait short, so newly queued emails go out at once.
+        Deliveries another drain already has in flight are awaited too.
+        """
+        while True:
+            if wake is not None:
+                wake.clear()
+            while await self.drain_once():
+                pass
+            if self._inflight:
+                await asyncio.gather(*self._inflight, return_exceptions=True)
+            delay = await asyncio.to_thread(self._next_due_in)
+            woken = wake is not None and wake.is_set()
+            if not wait_for_retries or (delay is None and not woken):
+                return
+            if woken:
+                continue
+            if wake is None:
+                await asyncio.sleep(delay)
+                continue
+            try:
+                await asyncio.wait_for(wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def ensure_worker(self) -> asyncio.Task:
+        """
+        Start the background drain task on the running loop if it is not
+        already running, or wake it if it is waiting out a retry.
+        """
+        if self._worker is None or self._worker.done():
+            self._wake = asyncio.Event()
+            self._worker = asyncio.get_running_loop().create_task(
+                self.flush(wait_for_retries=True, wake=self._wake)
+            )
+        else:
+            self._wake.set()
+        return self._worker
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        counts = {PENDING: 0, SENDING: 0, SENT: 0, DEAD: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def dead_letters(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, subject, attempts, last_error, created_at FROM outbox WHERE status = ? ORDER BY id",
+                (DEAD,),
+            ).fetchall()
+        return [
+            {"id": row[0], "subject": row[1], "attempts": row[2], "last_error": row[3], "created_at": row[4]}
+            for row in rows
+        ]
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            self._conn.close()
+
+
+_default_outbox: EmailOutbox | None = None
+
+
+def default_email_outbox() -> EmailOutbox:
+    """Return the process-wide outbox shared by every ResearchManager."""
+    global _default_outbox
+    if _default_outbox is None:
+        _default_outbox = EmailOutbox()
+    return _default_outbox
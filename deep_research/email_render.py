@@ -0,0 +1,235 @@
+import html
+import re
+from dataclasses import dataclass
+
+SUBJECT_MAX_CHARS = 90
+
+LINK_PATTERN = re.compile(r"\[([^\]]+)\]\(((?:[^()\s]|\([^()\s]*\))+)\)")
+SAFE_URL_SCHEMES = ("http://", "https://", "mailto:")
+
+STYLES = {
+    "h1": "font-size:24px;margin:24px 0 12px;color:#0c4a6e;",
+    "h2": "font-size:20px;margin:20px 0 10px;color:#0c4a6e;",
+    "h3": "font-size:17px;margin:18px 0 8px;color:#0c4a6e;",
+    "h4": "font-size:15px;margin:16px 0 6px;color:#0c4a6e;",
+    "h5": "font-size:14px;margin:14px 0 6px;color:#0c4a6e;",
+    "h6": "font-size:13px;margin:12px 0 6px;color:#0c4a6e;",
+    "p": "margin:0 0 12px;",
+    "ul": "margin:0 0 12px;padding-left:24px;",
+    "ol": "margin:0 0 12px;padding-left:24px;",
+    "li": "margin:0 0 4px;",
+    "blockquote": "margin:0 0 12px;padding:4px 12px;border-left:4px solid #bae6fd;color:#475569;",
+    "pre": "margin:0 0 12px;padding:12px;background:#f1f5f9;border-radius:4px;overflow:auto;",
+    "code": "font-family:Menlo,Consolas,monospace;font-size:13px;background:#f1f5f9;",
+    "hr": "border:none;border-top:1px solid #e2e8f0;margin:20px 0;",
+    "table": "border-collapse:collapse;margin:0 0 12px;",
+    "th": "border:1px solid #cbd5e1;padding:6px 10px;background:#f1f5f9;text-align:left;",
+    "td": "border:1px solid #cbd5e1;padding:6px 10px;",
+    "a": "color:#0284c7;",
+}
+
+EMAIL_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>{title}</title></head>
+<body style="margin:0;padding:0;background:#f8fafc;">
+<div style="max-width:720px;margin:0 auto;padding:24px;background:#ffffff;font-family:Helvetica,Arial,sans-serif;font-size:15px;line-height:1.6;color:#1e293b;">
+<p style="margin:0 0 16px;padding:12px;background:#f0f9ff;border-radius:4px;">{summary}</p>
+{body}
+</div>
+</body>
+</html>
+"""
+
+
+@dataclass
+class RenderedEmail:
+    subject: str
+    html_content: str
+    text_content: str
+
+
+def _open(tag: str) -> str:
+    return f'<{tag} style="{STYLES[tag]}">'
+
+
+def _render_emphasis(text: str) -> str:
+    text = html.escape(text, quote=False)
+    text = re.sub(r"(\*\*|__)(.+?)\1", r"<strong>\2</strong>", text)
+    text = re.sub(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])", r"<em>\1</em>", text)
+    text = re.sub(r"(?<![\w_])_(?!\s)(.+?)(?<!\s)_(?![\w_])", r"<em>\1</em>", text)
+    return text
+
+
+def _render_links(text: str) -> str:
+    rendered = []
+    position = 0
+    for match in LINK_PATTERN.finditer(text):
+        rendered.append(_render_emphasis(text[position:match.start()]))
+        label, url = match.group(1), match.group(2)
+        if url.lower().startswith(SAFE_URL_SCHEMES):
+            rendered.append(f'<a href="{html.escape(url)}" style="{STYLES["a"]}">{_render_emphasis(label)}</a>')
+        else:
+            rendered.append(_render_emphasis(label))
+        position = match.end()
+    rendered.append(_render_emphasis(text[position:]))
+    return "".join(rendered)
+
+
+def render_inline(text: str) -> str:
+    """
+    Escape text and convert inline markdown (code, links, bold, italic).
+    Links are only kept for http(s) and mailto URLs.
+    """
+    parts = re.split(r"(`[^`]+`)", text)
+    rendered = []
+    for part in parts:
+        if len(part) > 1 and part.startswith("`") and part.endswith("`"):
+            rendered.append(f"{_open('code')}{html.escape(part[1:-1])}</code>")
+        else:
+            rendered.append(_render_links(part))
+    return "".join(rendered)
+
+
+def _table_cells(line: str) -> list[str]:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def markdown_to_html(markdown: str) -> str:
+    """
+    Convert the subset of markdown the writer agent produces into HTML with
+    inline styles, which is what most email clients render reliably.
+    """
+    lines = markdown.strip("\n").splitlines()
+    out = []
+    paragraph: list[str] = []
+    i = 0
+
+    def flush_paragraph():
+        if paragraph:
+            out.append(f"{_open('p')}{render_inline(' '.join(paragraph))}</p>")
+            paragraph.clear()
+
+    while i < len(lines):
+        line = lines[i].strip()
+
+        if not line:
+            flush_paragraph()
+            i += 1
+            continue
+
+        if line.startswith("```"):
+            flush_paragraph()
+            code = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith("```"):
+                code.append(lines[i])
+                i += 1
+            out.append(f"{_open('pre')}{_open('code')}{html.escape(chr(10).join(code))}</code></pre>")
+            i += 1
+            continue
+
+        heading = re.match(r"(#{1,6})\s+(.*?)\s*#*$", line)
+        if heading:
+            flush_paragraph()
+            tag = f"h{len(heading.group(1))}"
+            out.append(f"{_open(tag)}{render_inline(heading.group(2))}</{tag}>")
+            i += 1
+            continue
+
+        if re.fullmatch(r"(-{3,}|\*{3,}|_{3,})", line):
+            flush_paragraph()
+            out.append(f'<hr style="{STYLES["hr"]}">')
+            i += 1
+            continue
+
+        if line.startswith(">"):
+            flush_paragraph()
+            quote = []
+            while i < len(lines) and lines[i].strip().startswith(">"):
+                quote.append(lines[i].strip()[1:].strip())
+                i += 1
+            out.append(f"{_open('blockquote')}{render_inline(' '.join(quote))}</blockquote>")
+            continue
+
+        if line.startswith("|") and i + 1 < len(lines) and re.fullmatch(r"\|?[\s:|-]+\|?", lines[i + 1].strip()):
+            flush_paragraph()
+            header = _table_cells(line)
+            rows = []
+            i += 2
+            while i < len(lines) and lines[i].strip().startswith("|"):
+                rows.append(_table_cells(lines[i]))
+                i += 1
+            table = [_open("table"), "<tr>"]
+            table += [f"{_open('th')}{render_inline(cell)}</th>" for cell in header]
+            table.append("</tr>")
+            for row in rows:
+                table.append("<tr>")
+                table += [f"{_open('td')}{render_inline(cell)}</td>" for cell in row]
+                table.append("</tr>")
+            table.append("</table>")
+            out.append("".join(table))
+            continue
+
+        list_item = re.match(r"([-*+]|\d+[.)])\s+(.*)", line)
+        if list_item:
+            flush_paragraph()
+            tag = "ol" if list_item.group(1)[0].isdigit() else "ul"
+            items = []
+            while i < len(lines):
+                item = re.match(r"\s*([-*+]|\d+[.)])\s+(.*)", lines[i])
+                if item and item.group(1)[0].isdigit() != (tag == "ol"):
+                    # A change of marker type starts a new list.
+                    break
+                if item:
+                    items.append(item.group(2))
+                elif lines[i].strip() and items and lines[i].startswith((" ", "\t")):
+                    items[-1] += " " + lines[i].strip()
+                else:
+                    break
+                i += 1
+            body = "".join(f"{_open('li')}{render_inline(item)}</li>" for item in items)
+            out.append(f"{_open(tag)}{body}</{tag}>")
+            continue
+
+        paragraph.append(line)
+        i += 1
+
+    flush_paragraph()
+    return "\n".join(out)
+
+
+def _strip_emphasis(text: str) -> str:
+    text = re.sub(r"(\*\*|__)(.+?)\1", r"\2", text)
+    text = re.sub(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])", r"\1", text)
+    text = re.sub(r"(?<![\w_])_(?!\s)(.+?)(?<!\s)_(?![\w_])", r"\1", text)
+    return re.sub(r"`([^`]+)`", r"\1", text)
+
+
+def markdown_to_text(markdown: str) -> str:
+    """Plain-text alternative: markdown with inline markup and heading markers removed."""
+    text = re.sub(r"^#{1,6}\s+(.*?)\s*#*$", lambda m: m.group(1).upper(), markdown, flags=re.MULTILINE)
+    text = LINK_PATTERN.sub(r"\1 (\2)", text)
+    return _strip_emphasis(text).strip() + "\n"
+
+
+def email_subject(short_summary: str) -> str:
+    """First sentence of the summary as plain text, trimmed to a subject-line length."""
+    summary = " ".join(_strip_emphasis(LINK_PATTERN.sub(r"\1", short_summary)).split())
+    if not summary:
+        return "Research report"
+    first = re.split(r"(?<=[.!?])\s", summary, maxsplit=1)[0].rstrip(".")
+    if len(first) <= SUBJECT_MAX_CHARS:
+        return first
+    return first[:SUBJECT_MAX_CHARS - 1].rsplit(" ", 1)[0] + "…"
+
+
+def render_report_email(short_summary: str, markdown_report: str) -> RenderedEmail:
+    """Render a report into a subject, an inline-CSS HTML body and a plain-text body."""
+    subject = email_subject(short_summary)
+    body = EMAIL_TEMPLATE.format(
+        title=html.escape(subject),
+        summary=render_inline(short_summary),
+        body=markdown_to_html(markdown_report),
+    )
+    text = f"{short_summary.strip()}\n\n{markdown_to_text(markdown_report)}"
+    return RenderedEmail(subject=subject, html_content=body, text_content=text)
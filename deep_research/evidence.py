@@ -0,0 +1,94 @@
+import os
+import re
+from dataclasses import dataclass, field
+
+from scheduler import estimate_tokens
+from search_dedup import query_similarity, query_tokens
+
+DEFAULT_EVIDENCE_TOKEN_BUDGET = int(os.getenv("EVIDENCE_TOKEN_BUDGET", "3000"))
+DEFAULT_CLAIM_THRESHOLD = 0.6
+MIN_CLAIM_WORDS = 4
+
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+
+
+@dataclass
+class Claim:
+    text: str
+    sources: list[int]
+    position: int
+    score: float = 0.0
+    tokens: int = field(init=False)
+
+    def __post_init__(self):
+        self.tokens = estimate_tokens(self.text)
+
+
+def split_sentences(summary: str) -> list[str]:
+    """Split a search summary into sentences, treating bullet and line breaks as boundaries."""
+    sentences = []
+    for line in summary.splitlines():
+        line = BULLET.sub("", line).strip().lstrip("#").strip()
+        for sentence in SENTENCE_BREAK.split(line):
+            sentence = sentence.strip()
+            if len(sentence.split()) >= MIN_CLAIM_WORDS:
+                sentences.append(sentence)
+    return sentences
+
+
+def _score(claim: Claim, query_words: set[str], search_words: set[str]) -> float:
+    words = query_tokens(claim.text)
+    query_overlap = len(words & query_words) / len(query_words) if query_words else 0.0
+    search_overlap = len(words & search_words) / len(search_words) if search_words else 0.0
+    # Search agents lead with their main points, so earlier sentences get a small boost.
+    return query_overlap + 0.5 * search_overlap + 0.5 / (1 + claim.position)
+
+
+def build_evidence_pack(
+    query: str,
+    search_results: list[dict],
+    token_budget: int = DEFAULT_EVIDENCE_TOKEN_BUDGET,
+    threshold: float = DEFAULT_CLAIM_THRESHOLD,
+) -> str:
+    """
+    Assemble the writer's evidence from ``{"query", "summary"}`` search results.
+
+    Summaries are split into sentences and near-duplicate claims across
+    summaries are merged, keeping every source that made them. Claims are
+    ranked by overlap with the original query and their search term, and the
+    best are packed into ``token_budget`` estimated tokens. The pack lists each
+    search as a numbered source and tags every claim with its sources.
+    """
+    query_words = query_tokens(query)
+    claims: list[Claim] = []
+    for number, result in enumerate(search_results, start=1):
+        search_words = query_tokens(result["query"])
+        for position, sentence in enumerate(split_sentences(result["summary"])):
+            claim = Claim(text=sentence, sources=[number], position=position)
+            claim.score = _score(claim, query_words, search_words)
+            claims.append(claim)
+
+    kept: list[Claim] = []
+    for claim in sorted(claims, key=lambda c: c.score, reverse=True):
+        duplicate = next((k for k in kept if query_similarity(claim.text, k.text) >= threshold), None)
+        if duplicate is None:
+            kept.append(claim)
+        elif claim.sources[0] not in duplicate.sources:
+            duplicate.sources.append(claim.sources[0])
+            # Claims corroborated by several searches are worth more of the budget.
+            duplicate.score += 0.25
+
+    header = ["Sources:"] + [f"[S{n}] {result['query']}" for n, result in enumerate(search_results, start=1)]
+    used = estimate_tokens("\n".join(header)) + 10
+    packed = []
+    for claim in sorted(kept, key=lambda c: c.score, reverse=True):
+        if used + claim.tokens + 3 > token_budget:
+            continue
+        packed.append(claim)
+        used += claim.tokens + 3
+
+    packed.sort(key=lambda c: (c.sources[0], c.position))
+    lines = header + ["", "Evidence:"]
+    lines += [f"- [{', '.join(f'S{n}' for n in sorted(claim.sources))}] {claim.text}" for claim in packed]
+    return "\n".join(lines)
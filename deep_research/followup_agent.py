@@ -13,12 +13,12 @@ class FollowUpQuestion(BaseModel):
 
 class FollowUpQuestions(BaseModel):
     questions: List[FollowUpQuestion] = Field(
-        description="A list of three follow-up research questions"
+        description="A list of follow-up research questions"
     )
 
 # Revised instructions
 INSTRUCTIONS = (
-    """You are an expert research assistant. 
+    f"""You are an expert research assistant. 
     Given a user's research topic, generate up to {QUESTION_COUNT} follow-up questions.
     Ask follow-up questions when the initial query has:
         Ambiguous scope - "research AI" could mean technical implementation, business impact, ethics, etc.
@@ -0,0 +1,148 @@
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+from metrics import quantile
+
+T = TypeVar("T")
+
+DEFAULT_WINDOW = 200
+DEFAULT_MIN_SAMPLES = 20
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies, used to decide when a call is slow enough to hedge."""
+
+    def __init__(self, window: int = DEFAULT_WINDOW, min_samples: int = DEFAULT_MIN_SAMPLES):
+        self.min_samples = min_samples
+        self.samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        """The ``q`` quantile of recent latencies, or None until ``min_samples`` are recorded."""
+        if len(self.samples) < self.min_samples:
+            return None
+        return quantile(list(self.samples), q)
+
+
+async def _cancel(tasks: Iterable[asyncio.Future]) -> None:
+    tasks = list(tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def hedged(
+    call: Callable[[], Awaitable[T]],
+    hedge_after: float | None = None,
+    timeout: float | None = None,
+    on_hedge: Callable[[], None] | None = None,
+    dispatched: asyncio.Event | None = None,
+) -> T:
+    """
+    Await ``call()``, starting one duplicate if the first attempt has not finished
+    after ``hedge_after`` seconds and returning whichever succeeds first. The other
+    attempt is cancelled. Raises TimeoutError once ``timeout`` seconds pass without
+    a result, or the last error if every attempt fails. When ``dispatched`` is
+    given, both clocks start once it is set rather than when the call is made,
+    so time spent queued before the call is dispatched counts toward neither.
+    """
+    loop = asyncio.get_running_loop()
+    pending = {asyncio.ensure_future(call())}
+    dispatch = None
+    if dispatched is not None and not dispatched.is_set():
+        dispatch = asyncio.ensure_future(dispatched.wait())
+    started = None if dispatch is not None else loop.time()
+    can_hedge = hedge_after is not None
+    error: BaseException | None = None
+    try:
+        while True:
+            if started is None and dispatch.done():
+                started = loop.time()
+            wait = None
+            waiting = set(pending)
+            if started is None:
+                waiting.add(dispatch)
+            else:
+                elapsed = loop.time() - started
+                waits = []
+                if timeout is not None:
+                    waits.append(timeout - elapsed)
+                if can_hedge:
+                    waits.append(hedge_after - elapsed)
+                wait = max(0.0, min(waits)) if waits else None
+
+            done, _ = await asyncio.wait(waiting, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+            done.discard(dispatch)
+            pending -= done
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+            if not pending:
+                raise error
+            if started is None:
+                continue
+
+            elapsed = loop.time() - started
+            if timeout is not None and elapsed >= timeout:
+                raise TimeoutError(f"No result after {timeout:g}s")
+            if can_hedge and elapsed >= hedge_after:
+                can_hedge = False
+                if on_hedge is not None:
+                    on_hedge()
+                pending.add(asyncio.ensure_future(call()))
+    finally:
+        if dispatch is not None:
+            pending.add(dispatch)
+        await _cancel(pending)
+
+
+async def gather_quorum(
+    tasks: Iterable[Awaitable[T | None]],
+    quorum: int | None = None,
+    budget: float | None = None,
+) -> tuple[list[T], int]:
+    """
+    Collect the non-None results of ``tasks`` in completion order. Stops early
+    once ``quorum`` results are in, or once ``budget`` seconds have passed and at
+    least one result is in. Tasks still running are cancelled and awaited, and
+    their count is returned alongside the results.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    pending = {asyncio.ensure_future(task) for task in tasks}
+    results: list[T] = []
+    try:
+        while pending:
+            timeout = None
+            if budget is not None:
+                remaining = budget - (loop.time() - started)
+                # Once the budget is spent with nothing in, wait for the first result.
+                timeout = remaining if remaining > 0 else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result is not None:
+                    results.append(result)
+            if quorum is not None and len(results) >= quorum:
+                break
+            if budget is not None and results and loop.time() - started >= budget:
+                break
+        cancelled = len(pending)
+    finally:
+        await _cancel(pending)
+    return results, cancelled
+
+
+_default_tracker: LatencyTracker | None = None
+
+
+def default_search_latencies() -> LatencyTracker:
+    """Return the process-wide history of search latencies shared by every ResearchManager."""
+    global _default_tracker
+    if _default_tracker is None:
+        _default_tracker = LatencyTracker()
+    return _default_tracker
@@ -0,0 +1,238 @@
+import asyncio
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_METRICS_JSONL_PATH = os.getenv("METRICS_JSONL_PATH")
+# Loopback by default; set METRICS_HOST=0.0.0.0 to let a remote Prometheus scrape.
+DEFAULT_METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+RESERVOIR_SIZE = 2048
+JSONL_FLUSH_INTERVAL = 1.0
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def quantile(samples: list[float], q: float) -> float:
+    """Nearest-rank quantile of ``samples``; 0.0 when there are none."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Histogram:
+    """Count, sum and a window of the most recent samples for quantile estimates."""
+
+    def __init__(self, reservoir_size: int = RESERVOIR_SIZE):
+        self.count = 0
+        self.total = 0.0
+        self.samples: deque[float] = deque(maxlen=reservoir_size)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def quantiles(self) -> dict[float, float]:
+        samples = list(self.samples)
+        return {q: quantile(samples, q) for q in QUANTILES}
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """
+    In-process counters, gauges and histograms for the research pipeline.
+
+    Every observation can also be appended to a JSON lines file for offline
+    analysis. Records are buffered in memory and written by a background
+    thread every ``flush_interval`` seconds, so recording a metric never
+    waits on disk; ``flush`` writes them out at once. ``render_prometheus`` exposes the current values in the
+    Prometheus text format, with histograms reported as p50/p95/p99 summaries.
+    """
+
+    def __init__(self, jsonl_path: str | None = DEFAULT_METRICS_JSONL_PATH, flush_interval: float = JSONL_FLUSH_INTERVAL):
+        self.jsonl_path = jsonl_path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._gauges: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, Histogram]] = {}
+        self._pending: list[dict] = []
+        if jsonl_path:
+            directory = os.path.dirname(jsonl_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True).start()
+            atexit.register(self.flush)
+
+    def _emit(self, kind: str, name: str, value: float, labels: dict) -> None:
+        if self.jsonl_path:
+            self._pending.append(
+                {"ts": round(time.time(), 6), "type": kind, "name": name, "value": value, "labels": labels}
+            )
+
+    def _write_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self) -> None:
+        """Append the buffered JSON lines records to ``jsonl_path``."""
+        with self._write_lock:
+            with self._lock:
+                records, self._pending = self._pending, []
+            if not records:
+                return
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(record) + "\n" for record in records))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+            self._emit("counter", name, value, labels)
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+            self._emit("gauge", name, value, labels)
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _label_key(labels)
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+            self._emit("histogram", name, value, labels)
+
+    @contextmanager
+    def span(self, stage: str, **labels):
+        """
+        Time a pipeline stage into ``stage_duration_seconds``, counting failures
+        in ``stage_errors_total``. Cancellation is not a failure of the stage.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            self.inc("stage_errors_total", stage=stage, error=type(e).__name__, **labels)
+            raise
+        finally:
+            self.observe("stage_duration_seconds", time.perf_counter() - started, stage=stage, **labels)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def histogram(self, name: str, **labels) -> Histogram | None:
+        with self._lock:
+            return self._histograms.get(name, {}).get(_label_key(labels))
+
+    def snapshot(self) -> dict:
+        """Current values as plain JSON-serializable data."""
+        with self._lock:
+            return {
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self._counters.items()
+                },
+                "gauges": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self._gauges.items()
+                },
+                "histograms": {
+                    name: [
+                        {
+                            "labels": dict(key),
+                            "count": histogram.count,
+                            "sum": histogram.total,
+                            **{f"p{int(q * 100)}": value for q, value in histogram.quantiles().items()},
+                        }
+                        for key, histogram in series.items()
+                    ]
+                    for name, series in self._histograms.items()
+                },
+            }
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                lines += [f"{name}{_format_labels(key)} {value:g}" for key, value in sorted(series.items())]
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                lines += [f"{name}{_format_labels(key)} {value:g}" for key, value in sorted(series.items())]
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} summary")
+                for key, histogram in sorted(series.items()):
+                    for q, value in histogram.quantiles().items():
+                        lines.append(f"{name}{_format_labels(key, (('quantile', q),))} {value:g}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.total:g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(port: int, registry: MetricsRegistry | None = None, host: str = DEFAULT_METRICS_HOST) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` (Prometheus text) and ``/metrics.json`` from a daemon thread."""
+    registry = registry if registry is not None else default_metrics()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = registry.render_prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = json.dumps(registry.snapshot()), "application/json"
+            else:
+                self.send_error(404)
+                return
+            payload = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+_default_metrics: MetricsRegistry | None = None
+
+
+def default_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    global _default_metrics
+    if _default_metrics is None:
+        _default_metrics = MetricsRegistry()
+    return _default_metrics
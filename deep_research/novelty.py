@@ -0,0 +1,40 @@
+import re
+
+from search_dedup import STOPWORDS
+
+DEFAULT_NOVELTY_THRESHOLD = 0.35
+
+
+def content_words(text: str) -> list[str]:
+    """Lowercase words of ``text`` in order, without stopwords."""
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS]
+
+
+def word_bigrams(text: str) -> set[tuple[str, str]]:
+    words = content_words(text)
+    if len(words) == 1:
+        return {(words[0], "")}
+    return set(zip(words, words[1:]))
+
+
+class NoveltyTracker:
+    """
+    Measures how much new information each search summary adds: the share of
+    its word bigrams that no earlier summary contained.
+    """
+
+    def __init__(self):
+        self.seen: set[tuple[str, str]] = set()
+
+    def novelty(self, text: str) -> float:
+        """Novelty of ``text`` in [0, 1] against everything seen so far, without recording it."""
+        bigrams = word_bigrams(text)
+        if not bigrams:
+            return 0.0
+        return len(bigrams - self.seen) / len(bigrams)
+
+    def add(self, summary: str) -> float:
+        """Record ``summary`` and return its novelty in [0, 1] against everything seen before."""
+        novelty = self.novelty(summary)
+        self.seen |= word_bigrams(summary)
+        return novelty
@@ -0,0 +1,64 @@
+from pydantic import BaseModel, Field
+from agents import Agent, trace, Runner
+import asyncio
+from dotenv import load_dotenv
+
+MIN_SECTIONS = 3
+MAX_SECTIONS = 6
+
+INSTRUCTIONS = (
+    "You are a senior researcher planning a report for a research query. You will be given the "
+    "query and numbered research sources with the evidence gathered from them.\n"
+    f"Outline a cohesive report of {MIN_SECTIONS} to {MAX_SECTIONS} sections, in reading order, that "
+    "together answer the query without overlapping. For each section give its heading, what it must "
+    "cover, and the numbers of the sources whose evidence it should draw on; every source should be "
+    "used by at least one section. Also write the report title, a short 2-3 sentence summary of the "
+    "findings, and suggested topics to research further. Do not write the sections themselves."
+)
+
+
+class OutlineSection(BaseModel):
+    heading: str = Field(description="The section heading, without markdown.")
+
+    focus: str = Field(description="What this section must cover, in one or two sentences.")
+
+    sources: list[int] = Field(description="Numbers of the research sources this section draws on.")
+
+
+class ReportOutline(BaseModel):
+    title: str = Field(description="The report title, without markdown.")
+
+    sections: list[OutlineSection] = Field(description="The report sections in reading order.")
+
+    short_summary: str = Field(description="A short 2-3 sentence summary of the findings.")
+
+    follow_up_questions: list[str] = Field(description="Suggested topics to research further")
+
+
+outline_agent = Agent(
+    name="OutlineAgent",
+    instructions=INSTRUCTIONS,
+    model="gpt-4o-mini",
+    output_type=ReportOutline,
+)
+
+
+async def main(message: str):
+    """Loads environment, runs the outline agent, and prints the outline."""
+    load_dotenv()
+
+    with trace("Outline"):
+        result = await Runner.run(outline_agent, message)
+        print(result.final_output)
+        return result.final_output
+
+
+if __name__ == "__main__":
+    query = (
+        "Original query: What is the future of renewable energy technologies in Europe?\n"
+        "Research evidence, tagged by source search:\n"
+        "Sources:\n[S1] solar capacity europe\n[S2] offshore wind europe\n\n"
+        "Evidence:\n- [S1] Solar capacity in Europe grew 40% last year.\n"
+        "- [S2] Offshore wind auctions stalled on rising costs.\n"
+    )
+    asyncio.run(main(query))
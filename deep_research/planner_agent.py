@@ -9,7 +9,9 @@ import asyncio
 HOW_MANY_SEARCHES = 3
 
 INSTRUCTIONS = f"You are a helpful research assistant. Given a query, come up with a set of web searches \
-to perform to best answer the query. Output {HOW_MANY_SEARCHES} terms to query for."
+to perform to best answer the query. Output {HOW_MANY_SEARCHES} terms to query for, unless a different \
+number of searches is requested. If searches already performed are listed, cover new angles instead of \
+repeating them."
 
 class WebSearchItem(BaseModel):
     reason: str = Field(description="Your reasoning for why this search is important to the query.")
@@ -21,6 +23,17 @@ class WebSearchPlan(BaseModel):
     searches: list[WebSearchItem] = Field(description="A list of web searches to perform to best answer the query.")
 
 
+def planner_input(query: str, how_many: int | None = None, already_searched: list[str] | None = None) -> str:
+    """Build the planner prompt, optionally asking for a number of searches that avoid earlier ones."""
+    lines = [f"Query: {query}"]
+    if how_many is not None:
+        lines.append(f"Number of searches: {how_many}")
+    if already_searched:
+        lines.append("Searches already performed:")
+        lines += [f"- {search}" for search in already_searched]
+    return "\n".join(lines)
+
+
 planner_agent = Agent(
     name="PlannerAgent",
     instructions=INSTRUCTIONS,
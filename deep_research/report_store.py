@@ -0,0 +1,214 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Callable
+
+from search_cache import normalize_query
+from search_dedup import query_similarity, query_tokens
+
+DEFAULT_REPORT_STORE_PATH = os.getenv("REPORT_STORE_PATH", ".cache/reports.sqlite")
+DEFAULT_REPORT_MAX_AGE = float(os.getenv("REPORT_MAX_AGE_SECONDS", str(7 * 24 * 60 * 60)))
+DEFAULT_CANDIDATES = 20
+# Query similarity at which a stored report is returned as is, and at which its
+# search summaries seed a new run.
+DEFAULT_REUSE_THRESHOLD = 0.9
+DEFAULT_SEED_THRESHOLD = 0.6
+
+
+@dataclass
+class StoredReport:
+    id: int
+    query: str
+    short_summary: str
+    markdown_report: str
+    follow_up_questions: list[str]
+    search_results: list[dict]
+    created_at: float
+    score: float = 0.0
+
+    def report_data(self) -> dict:
+        return {
+            "short_summary": self.short_summary,
+            "markdown_report": self.markdown_report,
+            "follow_up_questions": self.follow_up_questions,
+        }
+
+
+def describe_age(seconds: float) -> str:
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= size:
+            count = int(seconds // size)
+            return f"{count} {unit}{'' if count == 1 else 's'} ago"
+    return "just now"
+
+
+def _cosine(a, b) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norms = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norms if norms else 0.0
+
+
+def _match_expressions(query: str) -> list[str]:
+    """
+    FTS5 queries for the content words of ``query``: all of them, then all but
+    any one. A report missing two or more of the words is not similar enough
+    to reuse. Each word is quoted so user text is never FTS syntax, and prefix
+    matched so the light plural stem of query_tokens still finds "batteries".
+    """
+    tokens = [f'"{token}"*' for token in sorted(query_tokens(query))]
+    if len(tokens) <= 1:
+        return tokens
+    all_but_one = [" AND ".join(tokens[:i] + tokens[i + 1:]) for i in range(len(tokens))]
+    return [" AND ".join(tokens), " OR ".join(f"({group})" for group in all_but_one)]
+
+
+class ReportStore:
+    """
+    SQLite store of finished reports, searchable by query.
+
+    Each report is saved with its query, summary, markdown, follow-up questions
+    and the search summaries it was written from. Lookups take the best
+    full-text matches from an FTS5 index over the query and summary, so they
+    stay fast with hundreds of thousands of reports, and rank them by query
+    similarity. Pass ``embed`` (text -> vector, e.g. a local sentence
+    embedding model) to also rank by cosine similarity of embeddings.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_REPORT_STORE_PATH,
+        embed: Callable[[str], list[float]] | None = None,
+        candidates: int = DEFAULT_CANDIDATES,
+    ):
+        self.path = path
+        self.embed = embed
+        self.candidates = candidates
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            "id INTEGER PRIMARY KEY, query TEXT NOT NULL, normalized_query TEXT NOT NULL, "
+            "short_summary TEXT NOT NULL, markdown_report TEXT NOT NULL, follow_up_questions TEXT NOT NULL, "
+            "search_results TEXT NOT NULL, embedding BLOB, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS reports_normalized_query ON reports (normalized_query)")
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5("
+            "query, short_summary, content='reports', content_rowid='id')"
+        )
+        # Rank matches on the query well above matches on the summary.
+        self._conn.execute("INSERT INTO reports_fts (reports_fts, rank) VALUES ('rank', 'bm25(4.0, 1.0)')")
+        self._conn.commit()
+
+    def save(self, query: str, report, search_results: list[dict]) -> int:
+        """Store a finished ReportData for ``query`` with the search results it was written from."""
+        embedding = None
+        if self.embed is not None:
+            embedding = array("f", self.embed(f"{query}\n{report.short_summary}")).tobytes()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO reports (query, normalized_query, short_summary, markdown_report, "
+                "follow_up_questions, search_results, embedding, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    query,
+                    normalize_query(query),
+                    report.short_summary,
+                    report.markdown_report,
+                    json.dumps(list(report.follow_up_questions)),
+                    json.dumps(search_results),
+                    embedding,
+                    time.time(),
+                ),
+            )
+            self._conn.execute(
+                "INSERT INTO reports_fts (rowid, query, short_summary) VALUES (?, ?, ?)",
+                (cursor.lastrowid, query, report.short_summary),
+            )
+            self._conn.commit()
+        return cursor.lastrowid
+
+    def search(self, query: str, max_age: float | None = DEFAULT_REPORT_MAX_AGE) -> list[StoredReport]:
+        """
+        Reports for queries like ``query`` no older than ``max_age`` seconds,
+        best first, each scored in [0, 1] in ``score``.
+        """
+        cutoff = time.time() - max_age if max_age is not None else 0.0
+        with self._lock:
+            ids = [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT id FROM reports WHERE normalized_query = ? AND created_at >= ? ORDER BY created_at DESC LIMIT 1",
+                    (normalize_query(query), cutoff),
+                )
+            ]
+            # Reports matching every word are few and cheap to rank, so the looser match is only the fallback.
+            # The age cutoff applies before the limit, so stale matches cannot crowd out fresh ones.
+            for expression in _match_expressions(query):
+                matched = [
+                    row[0]
+                    for row in self._conn.execute(
+                        "SELECT reports_fts.rowid FROM reports_fts JOIN reports ON reports.id = reports_fts.rowid "
+                        "WHERE reports_fts MATCH ? AND reports.created_at >= ? ORDER BY reports_fts.rank LIMIT ?",
+                        (expression, cutoff, self.candidates),
+                    )
+                ]
+                if matched:
+                    ids += [id for id in matched if id not in ids]
+                    break
+            placeholders = ", ".join("?" * len(ids))
+            rows = self._conn.execute(
+                "SELECT id, query, short_summary, markdown_report, follow_up_questions, search_results, "
+                f"created_at, embedding FROM reports WHERE id IN ({placeholders}) AND created_at >= ?",
+                (*ids, cutoff),
+            ).fetchall()
+
+        query_vector = self.embed(query) if self.embed is not None and rows else None
+        matches = []
+        for row in rows:
+            match = StoredReport(
+                id=row[0],
+                query=row[1],
+                short_summary=row[2],
+                markdown_report=row[3],
+                follow_up_questions=json.loads(row[4]),
+                search_results=json.loads(row[5]),
+                created_at=row[6],
+            )
+            match.score = query_similarity(query, match.query)
+            if query_vector is not None and row[7] is not None:
+                match.score = max(match.score, _cosine(query_vector, array("f", row[7])))
+            matches.append(match)
+        # Newer reports win ties.
+        return sorted(matches, key=lambda m: (m.score, m.created_at), reverse=True)
+
+    def lookup(self, query: str, max_age: float | None = DEFAULT_REPORT_MAX_AGE) -> StoredReport | None:
+        """The most similar fresh report for ``query``, or None."""
+        matches = self.search(query, max_age)
+        return matches[0] if matches else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_store: ReportStore | None = None
+
+
+def default_report_store() -> ReportStore:
+    """Return the process-wide report store shared by every ResearchManager."""
+    global _default_store
+    if _default_store is None:
+        _default_store = ReportStore()
+    return _default_store
@@ -0,0 +1,111 @@
+_END = object()
+
+ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JsonStringFieldParser:
+    """
+    Incrementally extracts one top-level string field from a JSON object that
+    arrives in arbitrary chunks, such as a structured-output model response.
+
+    ``feed`` returns the newly decoded characters of the field's value, so the
+    caller can render the field while the rest of the object is still being
+    generated. Escapes split across chunk boundaries are handled.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.value = ""
+        self.complete = False
+        self._depth = 0
+        self._in_string = False
+        self._escape: str | None = None
+        self._pending_surrogate: int | None = None
+        self._expect_key = False
+        self._key = ""
+        self._current_key: str | None = None
+        self._capturing = False
+        self._collecting_key = False
+
+    def feed(self, chunk: str) -> str:
+        emitted = []
+        for char in chunk:
+            if self._in_string:
+                decoded = self._string_char(char)
+                if decoded is None:
+                    continue
+                if decoded is _END:
+                    self._end_string()
+                    continue
+                if self._collecting_key:
+                    self._key += decoded
+                elif self._capturing:
+                    emitted.append(decoded)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._collecting_key = True
+                    self._key = ""
+                elif self._depth == 1 and self._current_key == self.field and not self.complete:
+                    self._capturing = True
+            elif char in "{[":
+                self._depth += 1
+                self._expect_key = char == "{" and self._depth == 1
+            elif char in "}]":
+                self._depth -= 1
+            elif char == "," and self._depth == 1:
+                self._expect_key = True
+                self._current_key = None
+            elif char == ":" and self._depth == 1:
+                self._expect_key = False
+
+        text = "".join(emitted)
+        self.value += text
+        return text
+
+    def _end_string(self) -> None:
+        self._in_string = False
+        if self._collecting_key:
+            self._collecting_key = False
+            self._current_key = self._key
+        elif self._capturing:
+            self._capturing = False
+            self.complete = True
+
+    def _string_char(self, char: str):
+        if self._escape is None:
+            if char == "\\":
+                self._escape = ""
+                return None
+            if char == '"':
+                return _END
+            return self._join_surrogate(char)
+
+        if self._escape == "":
+            if char == "u":
+                self._escape = "u"
+                return None
+            self._escape = None
+            return self._join_surrogate(ESCAPES.get(char, char))
+
+        self._escape += char
+        if len(self._escape) < 5:
+            return None
+        code = int(self._escape[1:], 16)
+        self._escape = None
+        if 0xD800 <= code < 0xDC00:
+            self._pending_surrogate = code
+            return None
+        if 0xDC00 <= code < 0xE000 and self._pending_surrogate is not None:
+            high, self._pending_surrogate = self._pending_surrogate, None
+            return chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00))
+        return self._join_surrogate(chr(code))
+
+    def _join_surrogate(self, text: str) -> str:
+        if self._pending_surrogate is not None:
+            # A lone high surrogate is invalid JSON text; drop it rather than emit garbage.
+            self._pending_surrogate = None
+        return text
+
@@ -1,84 +1,904 @@
-from agents import Runner, trace, gen_trace_id
-from search_agent import search_agent
-from planner_agent import planner_agent, WebSearchItem, WebSearchPlan
-from writer_agent import writer_agent, ReportData
-from email_agent import email_agent
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from agent_registry import get_agent, get_corpus_search_agent, get_search_agent
+from budget import (
+    DEFAULT_REPORT_WORDS,
+    REPORT_WORD_LIMITS,
+    SEARCH_OUTPUT_TOKENS,
+    SEARCH_TIME_SHARE,
+    TOKENS_PER_WORD,
+    BudgetedScheduler,
+    BudgetExceeded,
+    Estimate,
+    RunBudget,
+    RunPlan,
+    degrade,
+    estimate_call,
+    report_output_tokens,
+)
+from email_outbox import EmailOutbox, default_email_outbox
+from email_render import render_report_email
+from search_cache import SearchCache, default_search_cache
+from search_dedup import DEFAULT_DEDUP_THRESHOLD, dedupe_plan, query_similarity
+from scheduler import INTERACTIVE, AgentScheduler, default_scheduler, estimate_tokens
+from report_stream import JsonStringFieldParser
+from corpus_index import (
+    DEFAULT_LOCAL_RECALL_THRESHOLD,
+    DEFAULT_SEARCH_BACKEND,
+    SEARCH_BACKENDS,
+    CorpusIndex,
+    default_corpus_index,
+    format_hits,
+    local_recall,
+)
+from checkpoints import CLARIFICATION, EMAIL, PLAN, REPORT, SEARCH_RESULTS, CheckpointStore, default_checkpoint_store
+from metrics import MetricsRegistry, default_metrics
+from hedging import LatencyTracker, default_search_latencies, gather_quorum, hedged
+from evidence import DEFAULT_EVIDENCE_TOKEN_BUDGET, build_evidence_pack
+from novelty import DEFAULT_NOVELTY_THRESHOLD, NoveltyTracker
+from report_store import (
+    DEFAULT_REPORT_MAX_AGE,
+    DEFAULT_REUSE_THRESHOLD,
+    DEFAULT_SEED_THRESHOLD,
+    ReportStore,
+    default_report_store,
+    describe_age,
+)
 import asyncio
+import math
+import time
+from contextlib import contextmanager
+
+if TYPE_CHECKING:
+    from planner_agent import WebSearchItem, WebSearchPlan
+    from writer_agent import ReportData
+
+STREAM_MIN_CHARS = 80
+DEFAULT_SEARCH_TIMEOUT = 60.0
+DEFAULT_HEDGE_QUANTILE = 0.95
+DEFAULT_INITIAL_SEARCHES = 2
+DEFAULT_SEARCHES_PER_ROUND = 2
+DEFAULT_MAX_SEARCHES = 8
+DEFAULT_CLARIFICATION_TIMEOUT = 300.0
+OUTLINE_OUTPUT_TOKENS = 600
+
+EMAIL_STATUS = {
+    "render": "Email queued, research complete",
+    "agent": "Email sent, research complete",
+    "none": "Research complete",
+}
+
+
+@contextmanager
+def failure_span():
+    """Record an exception escaping a research run as an errored span, so tail sampling keeps its trace."""
+    try:
+        yield
+    except Exception as e:
+        from agents import SpanError, custom_span
+
+        with custom_span("research_failed", {"error": type(e).__name__}) as span:
+            span.set_error(SpanError(message=str(e) or type(e).__name__, data=None))
+        raise
+
+
+def clarified_query(query: str, questions: list[str], answers: str) -> str:
+    """Fold the clarifying questions and the user's answers into the research query."""
+    numbered = "\n".join(f"{n}. {question}" for n, question in enumerate(questions, start=1))
+    return f"{query}\n\nClarifying questions:\n{numbered}\n\nAnswers: {answers}"
+
 
 class ResearchManager:
 
-    async def run(self, query: str):
-        """ Run the deep research process, yielding the status updates and the final report"""
+    def __init__(
+        self,
+        search_cache: SearchCache | None = None,
+        dedup_threshold: float = DEFAULT_DEDUP_THRESHOLD,
+        scheduler: AgentScheduler | None = None,
+        priority: int = INTERACTIVE,
+        stream_report: bool = False,
+        email_mode: str = "render",
+        email_outbox: EmailOutbox | None = None,
+        checkpoints: CheckpointStore | None = None,
+        metrics: MetricsRegistry | None = None,
+        search_timeout: float | None = DEFAULT_SEARCH_TIMEOUT,
+        hedge_quantile: float | None = DEFAULT_HEDGE_QUANTILE,
+        search_quorum: int | None = None,
+        search_budget: float | None = None,
+        search_latencies: LatencyTracker | None = None,
+        evidence_token_budget: int = DEFAULT_EVIDENCE_TOKEN_BUDGET,
+        iterative_search: bool = False,
+        initial_searches: int = DEFAULT_INITIAL_SEARCHES,
+        searches_per_round: int = DEFAULT_SEARCHES_PER_ROUND,
+        max_searches: int = DEFAULT_MAX_SEARCHES,
+        novelty_threshold: float = DEFAULT_NOVELTY_THRESHOLD,
+        clarify: bool = False,
+        clarification_timeout: float | None = DEFAULT_CLARIFICATION_TIMEOUT,
+        report_store: ReportStore | None = None,
+        reuse_threshold: float | None = DEFAULT_REUSE_THRESHOLD,
+        seed_threshold: float | None = DEFAULT_SEED_THRESHOLD,
+        report_max_age: float | None = DEFAULT_REPORT_MAX_AGE,
+        budget: RunBudget | None = None,
+        search_context_size: str = "low",
+        sectioned_report: bool = False,
+        search_backend: str = DEFAULT_SEARCH_BACKEND,
+        corpus_index: CorpusIndex | None = None,
+        local_recall_threshold: float = DEFAULT_LOCAL_RECALL_THRESHOLD,
+    ):
+        self.search_cache = search_cache if search_cache is not None else default_search_cache()
+        self.dedup_threshold = dedup_threshold
+        self.priority = priority
+        self.stream_report = stream_report
+        if email_mode not in EMAIL_STATUS:
+            raise ValueError(f"Unknown email_mode: {email_mode!r}")
+        self.email_mode = email_mode
+        self.email_outbox = email_outbox if email_outbox is not None else default_email_outbox()
+        self.checkpoints = checkpoints if checkpoints is not None else default_checkpoint_store()
+        self.metrics = metrics if metrics is not None else default_metrics()
+        self.budget = budget if budget is not None else RunBudget()
+        scheduler = scheduler if scheduler is not None else default_scheduler()
+        self.scheduler = BudgetedScheduler(scheduler, self.budget, self.metrics)
+        self.search_context_size = search_context_size
+        self.sectioned_report = sectioned_report
+        if search_backend not in SEARCH_BACKENDS:
+            raise ValueError(f"Unknown search_backend: {search_backend!r}")
+        self.search_backend = search_backend
+        # The default index is only opened by runs that search the corpus.
+        self.corpus_index = corpus_index
+        self.local_recall_threshold = local_recall_threshold
+        # Set by the pre-flight budget check of a run.
+        self.run_plan: RunPlan | None = None
+        self.search_limit: int | None = None
+        self._writing_hold = Estimate()
+        self.search_timeout = search_timeout
+        self.hedge_quantile = hedge_quantile
+        self.search_quorum = search_quorum
+        self.search_budget = search_budget
+        self.search_latencies = search_latencies if search_latencies is not None else default_search_latencies()
+        self.evidence_token_budget = evidence_token_budget
+        self.iterative_search = iterative_search
+        self.initial_searches = initial_searches
+        self.searches_per_round = searches_per_round
+        self.max_searches = max_searches
+        self.novelty_threshold = novelty_threshold
+        self.clarify = clarify
+        self.clarification_timeout = clarification_timeout
+        self.report_store = report_store if report_store is not None else default_report_store()
+        self.reuse_threshold = reuse_threshold
+        self.seed_threshold = seed_threshold
+        self.report_max_age = report_max_age
+        self.questions: list[str] = []
+        self.answers: str | None = None
+        self._answered = asyncio.Event()
+        self.run_id: str | None = None
+        self.report: ReportData | None = None
+
+    async def run(self, query: str, run_id: str | None = None):
+        """
+        Run the deep research process, yielding the status updates and the final report.
+        Each stage's output is checkpointed under a run ID; pass ``run_id`` to resume
+        a previous run from its last completed stage.
+
+        A new run first looks for a fresh stored report on a similar query: one
+        at least ``reuse_threshold`` similar is returned as is, and the search
+        summaries of one at least ``seed_threshold`` similar start the research.
+
+        With ``clarify``, clarifying questions are yielded while the first
+        searches already run; deliver the user's reply with ``answer()``.
+
+        Every agent call is charged to ``budget``. Before searching, the run
+        is estimated and scaled down until the budget covers it: fewer
+        searches, a smaller search context, then a shorter report.
+        """
+        try:
+            async for update in self._run(query, run_id):
+                yield update
+        finally:
+            self.release_writing_hold()
+
+    async def _run(self, query: str, run_id: str | None):
+        # The Agents SDK and the agent modules load on the first run, not on import.
+        from agents import gen_trace_id, trace
+        from planner_agent import WebSearchPlan
+        from writer_agent import ReportData
+
+        if run_id:
+            saved = self.checkpoints.load(run_id)
+            stored_query = self.checkpoints.query(run_id)
+            if stored_query is None:
+                raise ValueError(f"Unknown run ID: {run_id}")
+            query = stored_query
+        else:
+            saved = {}
+            run_id = self.checkpoints.create_run(query)
+        self.run_id = run_id
+        self.budget.start()
+        if saved.get(CLARIFICATION, {}).get("answers"):
+            query = clarified_query(query, saved[CLARIFICATION]["questions"], saved[CLARIFICATION]["answers"])
+
         trace_id = gen_trace_id()
-        with trace("Research trace", trace_id=trace_id):
+        with trace("Research trace", trace_id=trace_id), failure_span():
             print(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}")
             yield f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}"
+            yield f"Run ID: {run_id}"
             print("Starting research...")
-            search_plan = await self.plan_searches(query)
-            yield "Searches planned, starting to search..."     
-            search_results = await self.perform_searches(search_plan)
-            yield "Searches complete, writing report..."
-            report = await self.write_report(query, search_results)
-            yield "Report written, sending email..."
-            await self.send_email(report)
-            yield "Email sent, research complete"
+
+            prior = None if saved else self.find_prior_report(query)
+            if REPORT in saved:
+                report = ReportData.model_validate(saved[REPORT])
+                yield "Resuming with the saved report..."
+            elif prior is not None and self.reuse_threshold is not None and prior.score >= self.reuse_threshold:
+                report = ReportData.model_validate(prior.report_data())
+                self.checkpoints.save(run_id, REPORT, report.model_dump())
+                yield f"Reusing the report on '{prior.query}' researched {describe_age(time.time() - prior.created_at)}"
+            else:
+                seed_results = prior.search_results if prior is not None else []
+                if SEARCH_RESULTS in saved:
+                    # Checkpoints written before results carried their search term hold bare summaries.
+                    search_results = [
+                        result if isinstance(result, dict) else {"query": "", "summary": result}
+                        for result in saved[SEARCH_RESULTS]
+                    ]
+                    yield "Resuming with the saved search results, writing report..."
+                else:
+                    started = {}
+                    how_many = self.initial_searches if self.iterative_search else None
+                    scaled_down = self.plan_budget(query)
+                    if scaled_down:
+                        yield scaled_down
+                    if PLAN in saved:
+                        search_plan = WebSearchPlan.model_validate(saved[PLAN])
+                        yield "Resuming with the saved search plan..."
+                    elif self.clarify:
+                        async for update in self.clarify_and_plan(query, how_many):
+                            if isinstance(update, tuple):
+                                query, search_plan, started = update
+                            else:
+                                yield update
+                        self.checkpoints.save(run_id, CLARIFICATION, {"questions": self.questions, "answers": self.answers})
+                        self.checkpoints.save(run_id, PLAN, search_plan.model_dump())
+                    else:
+                        already_searched = [result["query"] for result in seed_results] or None
+                        search_plan = await self.plan_searches(query, how_many=how_many, already_searched=already_searched)
+                        search_plan = self.dedupe_searches(search_plan)
+                        self.checkpoints.save(run_id, PLAN, search_plan.model_dump())
+                    yield "Searches planned, starting to search..."
+                    if self.iterative_search:
+                        async for update in self.iterative_searches(query, search_plan, started):
+                            if isinstance(update, list):
+                                search_results = update
+                            else:
+                                yield update
+                    else:
+                        search_results = await self.perform_searches(search_plan, started)
+                    if seed_results:
+                        searched = {result["query"] for result in search_results}
+                        search_results = [r for r in seed_results if r["query"] not in searched] + search_results
+                    self.checkpoints.save(run_id, SEARCH_RESULTS, search_results)
+                    yield "Searches complete, writing report..."
+                if self.stream_report:
+                    async for partial in self.write_report_streamed(query, search_results):
+                        if isinstance(partial, ReportData):
+                            report = partial
+                        else:
+                            yield partial
+                else:
+                    report = await self.write_report(query, search_results)
+                    yield "Report written, sending email..."
+                self.checkpoints.save(run_id, REPORT, report.model_dump())
+                self.report_store.save(query, report, search_results)
+            self.report = report
+
+            if EMAIL not in saved:
+                await self.send_email(report)
+                self.checkpoints.save(run_id, EMAIL, {"mode": self.email_mode, "status": EMAIL_STATUS[self.email_mode]})
+            spent = self.budget.stats()
+            self.metrics.observe("run_tokens", spent["tokens"])
+            self.metrics.observe("run_cost_usd", spent["cost"])
+            print(f"Budget: {spent}")
+            yield EMAIL_STATUS[self.email_mode]
             yield report.markdown_report
         
 
-    async def plan_searches(self, query: str) -> WebSearchPlan:
+    def find_prior_report(self, query: str):
+        """ The most similar fresh stored report, if it is similar enough to reuse or to seed this run """
+        thresholds = [t for t in (self.reuse_threshold, self.seed_threshold) if t is not None]
+        if not thresholds:
+            return None
+        prior = self.report_store.lookup(query, self.report_max_age)
+        if prior is None or prior.score < min(thresholds):
+            self.metrics.inc("report_store_lookups_total", outcome="miss")
+            return None
+        reused = self.reuse_threshold is not None and prior.score >= self.reuse_threshold
+        self.metrics.inc("report_store_lookups_total", outcome="reused" if reused else "seeded")
+        print(f"Found earlier research on '{prior.query}' (similarity {prior.score:.2f})")
+        return prior
+
+    def plan_budget(self, query: str) -> str | None:
+        """
+        Estimate the run before it starts and scale it down until the budget
+        covers it. The writing estimate is then held, so searches cannot
+        spend what the report needs. Returns a status update if the run was
+        scaled down.
+        """
+        from planner_agent import HOW_MANY_SEARCHES
+
+        self.release_writing_hold()
+        # A manager may run several queries, so nothing carries over from the last plan.
+        self.run_plan = None
+        self.search_limit = None
+        searches = self.max_searches if self.iterative_search else HOW_MANY_SEARCHES
+        planner = estimate_call(get_agent("planner"), query)
+
+        def fits(plan: RunPlan) -> bool:
+            search = estimate_call(get_search_agent(plan.search_context_size), query, SEARCH_OUTPUT_TOKENS)
+            return self.budget.fits(planner + search * plan.searches + self.writing_estimate(query, plan))
+
+        plan, steps = degrade(RunPlan(searches, self.search_context_size), fits)
+        self.run_plan = plan
+        self._writing_hold = self.writing_estimate(query, plan)
+        self.budget.reserve(self._writing_hold, required=True)
+        if not steps:
+            return None
+        for step in steps:
+            self.metrics.inc("budget_degradations_total", step=step)
+        if "searches" in steps:
+            self.search_limit = plan.searches
+        if not fits(plan):
+            print("Even the smallest run is over budget, running it anyway")
+        changes = {
+            "searches": f"{plan.searches} search{'' if plan.searches == 1 else 'es'}",
+            "search_context": f"{plan.search_context_size} search context",
+            "report_length": f"a report under {plan.report_words} words",
+        }
+        return "Scaled down to fit the budget: " + ", ".join(changes[step] for step in dict.fromkeys(steps))
+
+    def writing_estimate(self, query: str, plan: RunPlan) -> Estimate:
+        """ Estimate of writing the report from ``plan.searches`` summaries, and emailing it with the email agent """
+        evidence = min(self.evidence_token_budget, plan.searches * SEARCH_OUTPUT_TOKENS)
+        output_tokens = report_output_tokens(plan.report_words)
+        input_tokens = estimate_tokens(query) + evidence
+        estimate = estimate_call(get_agent("writer"), input_tokens, output_tokens)
+        estimate += estimate_call(get_agent("writer"), input_tokens, 0) * (self.writer_reads() - 1)
+        if self.email_mode == "agent":
+            estimate += estimate_call(get_agent("email"), output_tokens)
+        return estimate
+
+    def release_writing_hold(self) -> None:
+        self.budget.release(self._writing_hold)
+        self._writing_hold = Estimate()
+
+    def writer_reads(self) -> int:
+        """
+        How many calls read a prompt the size of the writer input: one, or in
+        sectioned mode the outline pass and at most one per section.
+        """
+        if not self.sectioned_report:
+            return 1
+        from outline_agent import MAX_SECTIONS
+
+        return 1 + MAX_SECTIONS
+
+    def fit_report_length(self, writer_input: str) -> int | None:
+        """
+        Release the writing hold and return the longest report length, in
+        words, that the budget still covers (None for no limit). Falls back
+        to the shortest length when none fits.
+        """
+        self.release_writing_hold()
+        planned = self.run_plan.report_words if self.run_plan is not None else None
+        lengths = [planned] + [words for words in REPORT_WORD_LIMITS if planned is None or words < planned]
+        writer = get_agent("writer")
+        reading = estimate_call(writer, writer_input, 0) * (self.writer_reads() - 1)
+        for words in lengths:
+            estimate = reading + estimate_call(writer, writer_input, report_output_tokens(words))
+            if self.email_mode == "agent":
+                estimate += estimate_call(get_agent("email"), report_output_tokens(words))
+            if self.budget.fits(estimate):
+                break
+        if words != planned:
+            self.metrics.inc("budget_degradations_total", step="report_length")
+            print(f"Shortening the report to under {words} words to fit the budget")
+        return words
+
+    def search_time_limit(self) -> float | None:
+        """ Seconds searching may take: ``search_budget``, capped by a share of the remaining time budget """
+        remaining = self.budget.remaining_seconds()
+        if math.isinf(remaining):
+            return self.search_budget
+        share = max(0.0, remaining * SEARCH_TIME_SHARE)
+        return share if self.search_budget is None else min(self.search_budget, share)
+
+    async def plan_searches(
+        self,
+        query: str,
+        how_many: int | None = None,
+        already_searched: list[str] | None = None,
+    ) -> WebSearchPlan:
         """ Plan the searches to perform for the query """
+        from planner_agent import WebSearchPlan, planner_input
+
+        if self.search_limit is not None:
+            how_many = min(how_many or self.search_limit, self.search_limit)
         print("Planning searches...")
-        result = await Runner.run(
-            planner_agent,
-            f"Query: {query}",
-        )
-        print(f"Will perform {len(result.final_output.searches)} searches")
-        return result.final_output_as(WebSearchPlan)
+        with self.metrics.span("plan"):
+            result = await self.scheduler.run(
+                get_agent("planner"),
+                planner_input(query, how_many, already_searched),
+                priority=self.priority,
+            )
+        search_plan = result.final_output_as(WebSearchPlan)
+        if how_many is not None and self.search_limit is not None:
+            search_plan = search_plan.model_copy(update={"searches": search_plan.searches[:how_many]})
+        print(f"Will perform {len(search_plan.searches)} searches")
+        return search_plan
 
-    async def perform_searches(self, search_plan: WebSearchPlan) -> list[str]:
-        """ Perform the searches to perform for the query """
-        print("Searching...")
-        num_completed = 0
-        tasks = [asyncio.create_task(self.search(item)) for item in search_plan.searches]
+    def dedupe_searches(self, search_plan: WebSearchPlan) -> WebSearchPlan:
+        """ Collapse near-duplicate searches so each cluster is only searched once """
+        deduped = dedupe_plan(search_plan, self.dedup_threshold)
+        removed = len(search_plan.searches) - len(deduped.searches)
+        if removed:
+            print(f"Collapsed {removed} near-duplicate searches")
+        return deduped
+
+    def answer(self, answers: str) -> None:
+        """ Deliver the user's answers to the clarifying questions of the current run """
+        self.answers = answers
+        self._answered.set()
+
+    async def ask_followup_questions(self, query: str) -> list[str]:
+        """ Ask the follow-up agent for the questions that would disambiguate the query """
+        from followup_agent import FollowUpQuestions
+
+        print("Asking clarifying questions...")
+        try:
+            with self.metrics.span("clarify"):
+                result = await self.scheduler.run(get_agent("followup"), query, priority=self.priority, required=False)
+        except Exception as e:
+            print(f"Clarifying questions failed: {e}")
+            return []
+        return [item.question for item in result.final_output_as(FollowUpQuestions).questions]
+
+    async def clarify_and_plan(self, query: str, how_many: int | None = None):
+        """
+        Ask for clarifying questions and plan the searches concurrently, then
+        search speculatively on the initial plan while waiting for ``answer()``.
+        Once answers arrive the query is replanned with them and the plans are
+        reconciled. Yields status updates and finally a ``(query, search_plan,
+        started)`` tuple, where ``started`` maps search terms to the searches
+        already running for that plan.
+        """
+        started: dict[str, asyncio.Task] = {}
+
+        async def plan_and_search() -> WebSearchPlan:
+            # Searches start as soon as the plan is in, even while the caller is still reading questions.
+            search_plan = self.dedupe_searches(await self.plan_searches(query, how_many=how_many))
+            for item in search_plan.searches:
+                started[item.query] = asyncio.create_task(self.search_result(item))
+            return search_plan
+
+        plan_task = asyncio.create_task(plan_and_search())
+        questions_task = asyncio.create_task(self.ask_followup_questions(query))
+        pending = {plan_task, questions_task}
+        prompt = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if plan_task in done:
+                    search_plan = plan_task.result()
+                    status = f"Searches planned, searching {len(started)} queries while you answer..."
+                    # A UI shows only the latest update, so questions already asked stay in it.
+                    yield status if prompt is None else f"{status}\n\n{prompt}"
+                if questions_task in done:
+                    self.questions = questions_task.result()
+                    if self.questions:
+                        numbered = "\n".join(f"{n}. {question}" for n, question in enumerate(self.questions, start=1))
+                        prompt = f"A few questions to focus the research:\n{numbered}"
+                        yield prompt
+
+            if self.questions:
+                try:
+                    await asyncio.wait_for(self._answered.wait(), self.clarification_timeout)
+                except TimeoutError:
+                    print(f"No answers after {self.clarification_timeout:g}s")
+            answers = (self.answers or "").strip()
+            if not answers:
+                self.answers = None
+                yield "Continuing with the initial search plan..."
+                yield query, search_plan, started
+                return
+
+            self.answers = answers
+            query = clarified_query(query, self.questions, answers)
+            yield "Answers received, updating the search plan..."
+            revised = self.dedupe_searches(await self.plan_searches(query, how_many=how_many))
+            search_plan = self.reconcile_plan(search_plan, revised, started)
+            yield query, search_plan, started
+        except BaseException:
+            for task in [plan_task, questions_task, *started.values()]:
+                task.cancel()
+            raise
+
+    def reconcile_plan(self, speculative: WebSearchPlan, revised: WebSearchPlan, started: dict) -> WebSearchPlan:
+        """
+        Diff the revised plan against the speculative one. Revised searches that
+        match a speculative search keep it and its running task, the rest are
+        new, and speculative searches that no longer match are cancelled and
+        removed from ``started``.
+        """
+        unmatched = list(speculative.searches)
+        kept, fresh = [], []
+        for item in revised.searches:
+            match = max(unmatched, key=lambda s: query_similarity(item.query, s.query), default=None)
+            if match is not None and query_similarity(item.query, match.query) >= self.dedup_threshold:
+                unmatched.remove(match)
+                kept.append(match)
+            else:
+                fresh.append(item)
+        for item in unmatched:
+            started.pop(item.query).cancel()
+        self.metrics.inc("speculative_searches_total", len(kept), outcome="kept")
+        self.metrics.inc("speculative_searches_total", len(unmatched), outcome="cancelled")
+        print(f"Revised plan keeps {len(kept)} speculative searches, adds {len(fresh)}, cancels {len(unmatched)}")
+        return revised.model_copy(update={"searches": kept + fresh})
+
+    async def iterative_searches(self, query: str, search_plan: WebSearchPlan, started: dict | None = None):
+        """
+        Search in rounds, yielding status updates and finally the list of search
+        results. After each round the novelty of its summaries against everything
+        gathered so far is measured, and the planner is only asked for more
+        searches while novelty stays at or above ``novelty_threshold`` and fewer
+        than ``max_searches`` have been made.
+        """
+        tracker = NoveltyTracker()
+        searched = [item.query for item in search_plan.searches]
         results = []
-        for task in asyncio.as_completed(tasks):
-            result = await task
-            if result is not None:
-                results.append(result)
-            num_completed += 1
-            print(f"Searching... {num_completed}/{len(tasks)} completed")
-        print("Finished searching")
+        round_number = 1
+        while True:
+            round_results = await self.perform_searches(search_plan, started)
+            started = None
+            results += round_results
+            novelties = [tracker.add(result["summary"]) for result in round_results]
+            # The very first summary is novel by definition; judge the round by the rest.
+            if len(results) == len(round_results):
+                novelties = novelties[1:]
+            novelty = sum(novelties) / len(novelties) if novelties else 1.0
+            self.metrics.observe("search_round_novelty", novelty)
+            print(f"Search round {round_number}: {len(round_results)} summaries, novelty {novelty:.2f}")
+
+            remaining = min(self.max_searches, self.search_limit or self.max_searches) - len(searched)
+            if novelty < self.novelty_threshold or remaining <= 0:
+                break
+            yield f"Search round {round_number} added {novelty:.0%} new information, planning more searches..."
+            more = await self.plan_searches(query, min(self.searches_per_round, remaining), searched)
+            fresh = [
+                item for item in self.dedupe_searches(more).searches
+                if all(query_similarity(item.query, done) < self.dedup_threshold for done in searched)
+            ][:remaining]
+            if not fresh:
+                break
+            search_plan = more.model_copy(update={"searches": fresh})
+            searched += [item.query for item in fresh]
+            round_number += 1
+
+        self.metrics.observe("search_rounds", round_number)
+        print(f"Stopped after {round_number} search rounds and {len(searched)} searches")
+        yield results
+
+    async def perform_searches(self, search_plan: WebSearchPlan, started: dict | None = None) -> list[dict]:
+        """
+        Perform the searches to perform for the query, returning ``{"query", "summary"}``
+        pairs. Returns once every search has finished, or earlier once ``search_quorum``
+        summaries are in or ``search_budget`` seconds have passed; searches still
+        running then are cancelled. Searches already running in ``started``,
+        keyed by search term, are awaited instead of being started again.
+        """
+        print("Searching...")
+        started = started or {}
+        tasks = [
+            started.pop(item.query, None) or asyncio.create_task(self.search_result(item))
+            for item in search_plan.searches
+        ]
+        results, cancelled = await gather_quorum(tasks, self.search_quorum, self.search_time_limit())
+        print(f"Searching... {len(results)}/{len(tasks)} summaries in")
+        if cancelled:
+            print(f"Cancelled {cancelled} late searches")
+            self.metrics.inc("searches_cancelled_total", cancelled)
+        cache_stats = self.search_cache.stats()
+        self.metrics.set_gauge("search_cache_hit_rate", cache_stats["hit_rate"])
+        print(f"Finished searching (cache: {cache_stats})")
         return results
 
+    async def search_result(self, item: WebSearchItem) -> dict | None:
+        summary = await self.search(item)
+        return None if summary is None else {"query": item.query, "summary": summary}
+
     async def search(self, item: WebSearchItem) -> str | None:
-        """ Perform a search for the query """
+        """ Perform a search for the query, reusing a cached summary when one is fresh """
+        cached = self.search_cache.get(item.query)
+        if cached is not None:
+            self.metrics.inc("search_cache_hits_total")
+            return cached
+        self.metrics.inc("search_cache_misses_total")
         input = f"Search term: {item.query}\nReason for searching: {item.reason}"
+        hedge_after = None
+        if self.hedge_quantile is not None:
+            hedge_after = self.search_latencies.percentile(self.hedge_quantile)
+
+        def on_hedge():
+            print(f"Search for '{item.query}' is slower than {hedge_after:.1f}s, hedging")
+            self.metrics.inc("search_hedges_total")
+
+        # The deadline, the hedge delay and the recorded latency all run from
+        # when the scheduler dispatches the call, not from when it was queued.
+        dispatched = asyncio.Event()
+        started = None
+
+        def on_dispatch():
+            nonlocal started
+            if started is None:
+                started = time.perf_counter()
+                dispatched.set()
+
+        agent, passages = await self.search_agent(item.query)
+        if passages is not None:
+            input += f"\nPassages from the local corpus:\n{passages}"
         try:
-            result = await Runner.run(
-                search_agent,
-                input,
-            )
-            return str(result.final_output)
-        except Exception:
+            with self.metrics.span("search"):
+                result = await hedged(
+                    lambda: self.scheduler.run(
+                        agent,
+                        input,
+                        priority=self.priority,
+                        output_tokens=SEARCH_OUTPUT_TOKENS,
+                        required=False,
+                        on_dispatch=on_dispatch,
+                    ),
+                    hedge_after=hedge_after,
+                    timeout=self.search_timeout,
+                    on_hedge=on_hedge,
+                    dispatched=dispatched,
+                )
+        except BudgetExceeded:
+            print(f"Skipping search for '{item.query}': over budget")
             return None
+        except TimeoutError:
+            print(f"Search for '{item.query}' timed out after {self.search_timeout:g}s")
+            self.metrics.inc("search_timeouts_total")
+            return None
+        except Exception as e:
+            print(f"Search for '{item.query}' failed: {e}")
+            return None
+        if started is not None:
+            self.search_latencies.record(time.perf_counter() - started)
+        summary = str(result.final_output)
+        self.search_cache.set(item.query, summary)
+        return summary
+
+    async def search_agent(self, query: str) -> tuple[object, str | None]:
+        """
+        The agent for one search, and the corpus passages it is to summarize
+        when they were already retrieved. Searches go to the web search agent,
+        or to the corpus search agent when searching locally. In hybrid mode
+        the corpus is queried first: when its best hits contain enough of the
+        search's words they are handed to the corpus summary agent, otherwise
+        the web is searched.
+        """
+        size = self.run_plan.search_context_size if self.run_plan is not None else self.search_context_size
+        if self.search_backend == "web":
+            return get_search_agent(size), None
+        index = self.corpus_index if self.corpus_index is not None else default_corpus_index()
+        if self.search_backend == "local":
+            return get_corpus_search_agent(index), None
+        try:
+            with self.metrics.span("corpus_search"):
+                hits = await asyncio.to_thread(index.search, query)
+        except Exception as e:
+            print(f"Corpus search for '{query}' failed: {e}")
+            hits = []
+        recall = local_recall(query, hits)
+        if recall >= self.local_recall_threshold:
+            self.metrics.inc("search_backend_total", backend="local")
+            return get_agent("corpus_summary"), format_hits(hits)
+        print(f"Local corpus covers {recall:.0%} of '{query}', searching the web")
+        self.metrics.inc("search_backend_total", backend="web")
+        return get_search_agent(size), None
+
+    def writer_input(self, query: str, search_results: list[dict]) -> str:
+        """ Build the writer prompt from a token-budgeted, deduplicated evidence pack """
+        pack = build_evidence_pack(query, search_results, self.evidence_token_budget)
+        self.metrics.observe("evidence_tokens", estimate_tokens(pack))
+        return f"Original query: {query}\nResearch evidence, tagged by source search:\n{pack}"
+
+    def budgeted_writer_input(self, query: str, search_results: list[dict]) -> tuple[str, int | None]:
+        """ The writer prompt, asking for a report short enough for the budget, and that length in words """
+        input = self.writer_input(query, search_results)
+        words = self.fit_report_length(input)
+        if words is not None:
+            input += f"\nKeep the markdown report under {words} words."
+        return input, words
 
-    async def write_report(self, query: str, search_results: list[str]) -> ReportData:
+    async def write_report(self, query: str, search_results: list[dict]) -> ReportData:
         """ Write the report for the query """
+        from writer_agent import ReportData
+
+        if self.sectioned_report:
+            async for update in self.write_report_sectioned(query, search_results):
+                report = update
+            return report
+
         print("Thinking about report...")
-        input = f"Original query: {query}\nSummarized search results: {search_results}"
-        result = await Runner.run(
-            writer_agent,
-            input,
-        )
+        input, words = self.budgeted_writer_input(query, search_results)
+        with self.metrics.span("write"):
+            result = await self.scheduler.run(
+                get_agent("writer"),
+                input,
+                priority=self.priority,
+                output_tokens=report_output_tokens(words),
+            )
 
         print("Finished writing report")
         return result.final_output_as(ReportData)
-    
-    async def send_email(self, report: ReportData) -> None:
-        print("Writing email...")
-        result = await Runner.run(
-            email_agent,
-            report.markdown_report,
+
+    async def write_report_streamed(self, query: str, search_results: list[dict]):
+        """
+        Write the report for the query, yielding the markdown report as it is
+        generated and the final ReportData once the writer has finished
+        """
+        from agents import RunResultStreaming
+        from writer_agent import ReportData
+
+        if self.sectioned_report:
+            async for update in self.write_report_sectioned(query, search_results):
+                yield update
+            return
+
+        print("Thinking about report (streaming)...")
+        input, words = self.budgeted_writer_input(query, search_results)
+        parser = JsonStringFieldParser("markdown_report")
+        last_yielded = 0
+        started = time.perf_counter()
+        first_chunk_at = None
+        async for event in self.scheduler.run_streamed(
+            get_agent("writer"),
+            input,
+            priority=self.priority,
+            output_tokens=report_output_tokens(words),
+        ):
+            if isinstance(event, RunResultStreaming):
+                result = event
+                continue
+            if event.type != "raw_response_event" or getattr(event.data, "type", None) != "response.output_text.delta":
+                continue
+            parser.feed(event.data.delta)
+            if first_chunk_at is None and parser.value:
+                first_chunk_at = time.perf_counter()
+                self.metrics.observe("report_first_chunk_seconds", first_chunk_at - started)
+            if len(parser.value) - last_yielded >= STREAM_MIN_CHARS:
+                last_yielded = len(parser.value)
+                yield parser.value
+
+        if len(parser.value) > last_yielded:
+            yield parser.value
+        self.metrics.observe("stage_duration_seconds", time.perf_counter() - started, stage="write")
+        print("Finished writing report")
+        yield result.final_output_as(ReportData)
+
+    async def write_report_sectioned(self, query: str, search_results: list[dict]):
+        """
+        Write the report section by section. A fast outline pass splits the
+        report into sections and assigns each the search results it draws on,
+        the sections are written concurrently through the shared scheduler,
+        and the report is assembled locally from the outline and sections.
+        Yields the markdown report each time its next section in reading
+        order is done, then the final ReportData.
+
+        The short summary and follow-up questions are the outline's, written
+        from the evidence before any section exists. Deriving them from the
+        finished sections would add a sequential model call after the slowest
+        section, which is the latency this mode removes. The trade-off is
+        that they can miss details only a section turned up, or mention
+        material from a section that failed.
+        """
+        from outline_agent import OutlineSection, ReportOutline
+        from section_agent import section_input
+        from writer_agent import ReportData
+
+        print("Outlining report...")
+        started = time.perf_counter()
+        input = self.writer_input(query, search_results)
+        words = self.fit_report_length(input)
+        with self.metrics.span("outline"):
+            result = await self.scheduler.run(
+                get_agent("outline"),
+                input,
+                priority=self.priority,
+                output_tokens=OUTLINE_OUTPUT_TOKENS,
+            )
+        outline = result.final_output_as(ReportOutline)
+        sections = outline.sections or [OutlineSection(heading=outline.title, focus=query, sources=[])]
+        headings = [section.heading for section in sections]
+        section_words = (words or DEFAULT_REPORT_WORDS) // len(sections)
+        self.metrics.observe("report_sections", len(sections))
+        print(f"Writing {len(sections)} sections...")
+
+        async def write_section(index: int, section: OutlineSection) -> str:
+            sources = [search_results[n - 1] for n in section.sources if 1 <= n <= len(search_results)]
+            evidence = build_evidence_pack(
+                f"{query}\n{section.heading}: {section.focus}", sources or search_results, self.evidence_token_budget
+            )
+            with self.metrics.span("section"):
+                result = await self.scheduler.run(
+                    get_agent("section"),
+                    section_input(query, outline.title, headings, index, section.focus, evidence, section_words),
+                    priority=self.priority,
+                    output_tokens=int(section_words * TOKENS_PER_WORD),
+                )
+            return f"## {section.heading}\n\n{str(result.final_output).strip()}"
+
+        tasks = {asyncio.create_task(write_section(i, section)): i for i, section in enumerate(sections)}
+        bodies: list[str | None] = [None] * len(sections)
+        assembled = 0
+
+        def markdown() -> str:
+            return "\n\n".join([f"# {outline.title}", *(body for body in bodies[:assembled] if body)])
+
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        print(f"Section '{headings[tasks[task]]}' failed: {task.exception()}")
+                        self.metrics.inc("report_section_failures_total")
+                        bodies[tasks[task]] = ""
+                    else:
+                        bodies[tasks[task]] = task.result()
+                ready = assembled
+                while assembled < len(bodies) and bodies[assembled] is not None:
+                    assembled += 1
+                if assembled > ready:
+                    yield markdown()
+        finally:
+            for task in tasks:
+                task.cancel()
+        if not any(bodies):
+            raise RuntimeError("Every report section failed")
+
+        self.metrics.observe("stage_duration_seconds", time.perf_counter() - started, stage="write")
+        print("Finished writing report")
+        yield ReportData(
+            short_summary=outline.short_summary,
+            markdown_report=markdown(),
+            follow_up_questions=outline.follow_up_questions,
         )
-        print("Email sent")
-        return report
\ No newline at end of file
+
+    async def send_email(self, report: ReportData) -> None:
+        """ Email the report: render it locally and queue it on the outbox, unless the email agent mode is selected """
+        if self.email_mode == "none":
+            return report
+        mode = self.email_mode
+        if mode == "agent" and not self.budget.fits(estimate_call(get_agent("email"), report.markdown_report)):
+            print("The email agent is over budget, rendering the email locally instead")
+            mode = "render"
+        with self.metrics.span("email", mode=mode):
+            if mode == "agent":
+                print("Writing email...")
+                result = await self.scheduler.run(
+                    get_agent("email"),
+                    report.markdown_report,
+                    priority=self.priority,
+                )
+                print("Email sent")
+                return report
+
+            print("Rendering email...")
+            email = render_report_email(report.short_summary, report.markdown_report)
+            email_id = await asyncio.to_thread(
+                self.email_outbox.enqueue, email.subject, email.html_content, email.text_content
+            )
+            self.email_outbox.ensure_worker()
+        print(f"Email {email_id} queued")
+        return report
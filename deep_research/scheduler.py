@@ -0,0 +1,293 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Callable
+
+
+INTERACTIVE = 0
+BATCH = 1
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("AGENT_MAX_CONCURRENCY", "8"))
+DEFAULT_REQUESTS_PER_MINUTE = float(os.getenv("AGENT_REQUESTS_PER_MINUTE", "500"))
+DEFAULT_TOKENS_PER_MINUTE = float(os.getenv("AGENT_TOKENS_PER_MINUTE", "200000"))
+DEFAULT_OUTPUT_TOKENS = 1000
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate, good enough for rate-limit accounting."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def result_tokens(result) -> tuple[int, int]:
+    """Sum input and output tokens over the model responses of a Runner result."""
+    input_tokens = output_tokens = 0
+    for response in getattr(result, "raw_responses", None) or []:
+        usage = getattr(response, "usage", None)
+        input_tokens += getattr(usage, "input_tokens", 0) or 0
+        output_tokens += getattr(usage, "output_tokens", 0) or 0
+    return input_tokens, output_tokens
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    from openai import APIStatusError, RateLimitError
+
+    if isinstance(error, RateLimitError):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code == 429
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at ``per_minute`` units per minute.
+    ``reserve`` always debits immediately and returns how long the caller must
+    wait for the debt to be repaid, so concurrent callers queue up fairly.
+    """
+
+    def __init__(self, per_minute: float, capacity: float | None = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, amount: float) -> float:
+        self._refill()
+        self.level -= amount
+        if self.level >= 0 or self.rate <= 0:
+            return 0.0
+        return -self.level / self.rate
+
+    def adjust(self, amount: float) -> None:
+        """Charge (positive) or refund (negative) the difference from an earlier estimate."""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+class AgentScheduler:
+    """
+    Shared gate in front of every ``Runner.run`` call.
+
+    Calls first wait on request and token buckets sized to the account's
+    per-minute quota, then take one of ``max_concurrency`` slots, handed out
+    to the interactive lane before the batch lane. Rate-limit errors are retried with
+    jittered exponential backoff instead of being surfaced to the caller.
+    ``run_config`` is passed to every call that does not bring its own.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        metrics=None,
+        run_config=None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = metrics
+        self.run_config = run_config
+        self.active = 0
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    async def _acquire(self, priority: int) -> None:
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                self._waiters = [entry for entry in self._waiters if entry[2] is not waiter]
+                heapq.heapify(self._waiters)
+            raise
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                # The slot passes straight to the next waiter; ``active`` is unchanged.
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = INTERACTIVE, estimated_tokens: int = DEFAULT_OUTPUT_TOKENS):
+        """
+        Reserve request and token quota for one call, then hold a concurrency
+        slot for it. Waiting out quota debt happens before a slot is taken, so
+        throttled calls never block other lanes from the slots.
+        """
+        delay = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def record_usage(self, result, estimated_tokens: int, agent=None, latency: float | None = None) -> None:
+        input_tokens, output_tokens = result_tokens(result)
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        if input_tokens or output_tokens:
+            self.tokens.adjust(input_tokens + output_tokens - estimated_tokens)
+        if self.metrics is not None and agent is not None:
+            self.metrics.inc("agent_calls_total", agent=agent.name)
+            self.metrics.inc("agent_input_tokens_total", input_tokens, agent=agent.name)
+            self.metrics.inc("agent_output_tokens_total", output_tokens, agent=agent.name)
+            self.metrics.observe("agent_input_tokens", input_tokens, agent=agent.name)
+            self.metrics.observe("agent_output_tokens", output_tokens, agent=agent.name)
+            if latency is not None:
+                self.metrics.observe("agent_latency_seconds", latency, agent=agent.name)
+
+    def _record_failure(self, agent, error: BaseException, retrying: bool) -> None:
+        if self.metrics is None:
+            return
+        if retrying:
+            self.metrics.inc("agent_retries_total", agent=agent.name)
+        else:
+            self.metrics.inc("agent_errors_total", agent=agent.name, error=type(error).__name__)
+
+    async def run(
+        self,
+        agent,
+        input,
+        priority: int = INTERACTIVE,
+        estimated_tokens: int | None = None,
+        on_dispatch: Callable[[], None] | None = None,
+        **kwargs,
+    ):
+        """
+        Run ``agent`` through ``Runner.run`` under the shared limits, retrying
+        rate-limit errors. ``on_dispatch`` is called each time the call leaves
+        the queue, so callers can time the call itself rather than the wait.
+        """
+        if estimated_tokens is None:
+            estimated_tokens = estimate_tokens(str(input)) + DEFAULT_OUTPUT_TOKENS
+        # Imported here so the SDK only loads once an agent actually runs.
+        from agents import Runner
+
+        if self.run_config is not None:
+            kwargs.setdefault("run_config", self.run_config)
+        attempt = 0
+        while True:
+            try:
+                async with self.slot(priority, estimated_tokens):
+                    self.calls += 1
+                    if on_dispatch is not None:
+                        on_dispatch()
+                    started = time.perf_counter()
+                    result = await Runner.run(agent, input, **kwargs)
+                    latency = time.perf_counter() - started
+                self.record_usage(result, estimated_tokens, agent, latency)
+                return result
+            except Exception as e:
+                self.tokens.adjust(-estimated_tokens)
+                if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                    self.failures += 1
+                    self._record_failure(agent, e, retrying=False)
+                    raise
+                self._record_failure(agent, e, retrying=True)
+                delay = self.backoff_delay(attempt)
+                attempt += 1
+                self.retries += 1
+                print(f"Rate limited on {agent.name}, retrying in {delay:.1f}s (attempt {attempt}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+    async def run_streamed(self, agent, input, priority: int = INTERACTIVE, estimated_tokens: int | None = None, **kwargs):
+        """
+        Stream ``agent`` through ``Runner.run_streamed`` under the shared limits,
+        yielding SDK stream events and finally the completed streaming result.
+        Rate-limit errors are only retried until the model has produced output:
+        events the SDK emits before calling the model, such as the agent
+        update, are not output.
+        """
+        if estimated_tokens is None:
+            estimated_tokens = estimate_tokens(str(input)) + DEFAULT_OUTPUT_TOKENS
+        from agents import Runner
+
+        if self.run_config is not None:
+            kwargs.setdefault("run_config", self.run_config)
+        attempt = 0
+        while True:
+            started = False
+            try:
+                async with self.slot(priority, estimated_tokens):
+                    self.calls += 1
+                    call_started = time.perf_counter()
+                    result = Runner.run_streamed(agent, input, **kwargs)
+                    async for event in result.stream_events():
+                        started = started or getattr(event, "type", None) == "raw_response_event"
+                        yield event
+                    latency = time.perf_counter() - call_started
+                self.record_usage(result, estimated_tokens, agent, latency)
+                yield result
+                return
+            except Exception as e:
+                # A failed attempt's usage is unknown; a retry reserves its estimate again.
+                self.tokens.adjust(-estimated_tokens)
+                if started or not is_rate_limit_error(e) or attempt >= self.max_retries:
+                    self.failures += 1
+                    self._record_failure(agent, e, retrying=False)
+                    raise
+                self._record_failure(agent, e, retrying=True)
+                delay = self.backoff_delay(attempt)
+                attempt += 1
+                self.retries += 1
+                print(f"Rate limited on {agent.name}, retrying in {delay:.1f}s (attempt {attempt}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": sum(1 for _, _, waiter in self._waiters if not waiter.done()),
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+        }
+
+
+_default_scheduler: AgentScheduler | None = None
+
+
+def default_scheduler() -> AgentScheduler:
+    """Return the process-wide scheduler shared by every ResearchManager."""
+    global _default_scheduler
+    if _default_scheduler is None:
+        from metrics import default_metrics
+
+        _default_scheduler = AgentScheduler(metrics=default_metrics())
+    return _default_scheduler
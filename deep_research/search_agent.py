@@ -3,6 +3,8 @@ from agents.model_settings import ModelSettings
 import asyncio
 from dotenv import load_dotenv
 
+from corpus_index import CorpusIndex, default_corpus_index, format_hits
+
 INSTRUCTIONS = "You are a research assistant. Given a search term, you search the web for that term and \
 produce a concise summary of the results. The summary must 2-3 paragraphs and less than 300 \
 words. Capture the main points. Write succintly, no need to have complete sentences or good \
@@ -17,6 +19,51 @@ search_agent = Agent(
     model_settings=ModelSettings(tool_choice="required"),
 )
 
+CORPUS_INSTRUCTIONS = "You are a research assistant. Given a search term, you search our local document \
+corpus for that term with the search_corpus tool and produce a concise summary of the passages it returns. \
+The summary must 2-3 paragraphs and less than 300 words. Capture the main points and name the source files. \
+Write succintly, no need to have complete sentences or good grammar. This will be consumed by someone \
+synthesizing a report, so it's vital you capture the essence and ignore any fluff. Do not include any \
+additional commentary other than the summary itself."
+
+
+def corpus_search_tool(index: CorpusIndex | None = None):
+    """A function tool searching ``index``, or the default corpus index when it is first called."""
+
+    def search_corpus(query: str) -> str:
+        """
+        Search the local document corpus and return the best matching passages with their source files.
+
+        Args:
+            query: The search term.
+        """
+        return format_hits((index if index is not None else default_corpus_index()).search(query))
+
+    return function_tool(search_corpus)
+
+
+corpus_search_agent = Agent(
+    name="Corpus search agent",
+    instructions=CORPUS_INSTRUCTIONS,
+    tools=[corpus_search_tool()],
+    model="gpt-4o-mini",
+    model_settings=ModelSettings(tool_choice="required"),
+)
+
+CORPUS_SUMMARY_INSTRUCTIONS = "You are a research assistant. Given a search term and the passages our local \
+document corpus returned for it, you produce a concise summary of those passages. The summary must 2-3 \
+paragraphs and less than 300 words. Capture the main points and name the source files. Write succintly, no \
+need to have complete sentences or good grammar. This will be consumed by someone synthesizing a report, so \
+it's vital you capture the essence and ignore any fluff. Do not include any additional commentary other than \
+the summary itself."
+
+# Hybrid search has already queried the corpus, so this agent summarizes the hits it is given.
+corpus_summary_agent = Agent(
+    name="Corpus summary agent",
+    instructions=CORPUS_SUMMARY_INSTRUCTIONS,
+    model="gpt-4o-mini",
+)
+
 
 async def main(message: str):
     """Loads environment, runs the search agent, and prints the result."""
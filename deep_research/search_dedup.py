@@ -0,0 +1,104 @@
+import re
+
+DEFAULT_DEDUP_THRESHOLD = 0.7
+SHINGLE_SIZE = 3
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is",
+    "it", "of", "on", "or", "the", "to", "vs", "what", "which", "with",
+}
+
+
+def _normalize_word(word: str) -> str:
+    word = word.lower()
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+    return word
+
+
+def query_tokens(query: str) -> set[str]:
+    """Lowercase content words of a query, with a light plural stem."""
+    return {
+        _normalize_word(word)
+        for word in re.findall(r"[A-Za-z0-9]+", query)
+        if word.lower() not in STOPWORDS
+    }
+
+
+def key_tokens(query: str) -> set[str]:
+    """
+    Tokens that pin a query to something specific: numbers such as years and
+    capitalized words such as countries or organisations.
+    """
+    return {
+        _normalize_word(word)
+        for word in re.findall(r"[A-Za-z0-9]+", query)
+        if any(c.isdigit() or c.isupper() for c in word) and word.lower() not in STOPWORDS
+    }
+
+
+def query_shingles(query: str, size: int = SHINGLE_SIZE) -> set[str]:
+    """Character shingles over the sorted content words, so word order does not matter."""
+    text = " ".join(sorted(query_tokens(query)))
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _jaccard(a: set[str], b: set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def query_similarity(a: str, b: str) -> float:
+    """
+    Similarity in [0, 1] between two search terms: the larger of the token-set
+    Jaccard and the character-shingle Jaccard. Shingles catch inflections and
+    small spelling differences that exact tokens miss. Queries are never
+    similar if a number or named entity in one is missing from the other, so
+    "EV sales 2023" and "EV sales 2024" stay separate searches.
+    """
+    tokens_a, tokens_b = query_tokens(a), query_tokens(b)
+    if not key_tokens(a) <= tokens_b or not key_tokens(b) <= tokens_a:
+        return 0.0
+    return max(
+        _jaccard(tokens_a, tokens_b),
+        _jaccard(query_shingles(a), query_shingles(b)),
+    )
+
+
+def cluster_queries(queries: list[str], threshold: float = DEFAULT_DEDUP_THRESHOLD) -> list[list[int]]:
+    """
+    Group query indexes into clusters of near-duplicates. Each query joins the
+    first cluster whose members it is at least ``threshold`` similar to, so the
+    first query of a cluster is the one that gets dispatched.
+    """
+    clusters: list[list[int]] = []
+    for index, query in enumerate(queries):
+        for cluster in clusters:
+            if any(query_similarity(query, queries[member]) >= threshold for member in cluster):
+                cluster.append(index)
+                break
+        else:
+            clusters.append([index])
+    return clusters
+
+
+def dedupe_plan(search_plan, threshold: float = DEFAULT_DEDUP_THRESHOLD):
+    """
+    Return a copy of a WebSearchPlan with one search per near-duplicate cluster.
+    The kept search carries the reasons of every search merged into it.
+    """
+    searches = search_plan.searches
+    clusters = cluster_queries([item.query for item in searches], threshold)
+    merged = []
+    for cluster in clusters:
+        first = searches[cluster[0]]
+        reasons = []
+        for member in cluster:
+            reason = searches[member].reason.strip()
+            if reason and reason not in reasons:
+                reasons.append(reason)
+        merged.append(first.model_copy(update={"reason": " ".join(reasons)}))
+    return search_plan.model_copy(update={"searches": merged})
@@ -0,0 +1,68 @@
+from agents import Agent, trace, Runner
+import asyncio
+from dotenv import load_dotenv
+
+DEFAULT_SECTION_WORDS = 350
+
+INSTRUCTIONS = (
+    "You are a senior researcher writing one section of a report for a research query. You will be "
+    "given the query, the report title, the full outline so you know what other sections cover, the "
+    "heading and focus of your section, and the research evidence for it.\n"
+    "Write only the body of your section in markdown: no section heading, no introduction or "
+    "conclusion for the whole report, and nothing that belongs to another section. Use ### for any "
+    "sub-headings. Be detailed and specific, and ground every point in the evidence."
+)
+
+
+def section_input(
+    query: str,
+    title: str,
+    headings: list[str],
+    index: int,
+    focus: str,
+    evidence: str,
+    words: int = DEFAULT_SECTION_WORDS,
+) -> str:
+    """Build the prompt for writing section ``index`` of the outline ``headings``."""
+    outline = "\n".join(
+        f"{number}. {heading}{'  <- your section' if number - 1 == index else ''}"
+        for number, heading in enumerate(headings, start=1)
+    )
+    return (
+        f"Original query: {query}\n"
+        f"Report title: {title}\n"
+        f"Outline:\n{outline}\n"
+        f"Your section: {headings[index]}\n"
+        f"Focus: {focus}\n"
+        f"Length: about {words} words\n"
+        f"Research evidence, tagged by source search:\n{evidence}"
+    )
+
+
+section_agent = Agent(
+    name="SectionWriterAgent",
+    instructions=INSTRUCTIONS,
+    model="gpt-4o-mini",
+)
+
+
+async def main(message: str):
+    """Loads environment, runs the section writer, and prints the section."""
+    load_dotenv()
+
+    with trace("Section"):
+        result = await Runner.run(section_agent, message)
+        print(result.final_output)
+        return result.final_output
+
+
+if __name__ == "__main__":
+    message = section_input(
+        "What is the future of renewable energy technologies in Europe?",
+        "Renewables in Europe",
+        ["Solar growth", "Offshore wind"],
+        0,
+        "How fast solar capacity is growing and why.",
+        "Sources:\n[S1] solar capacity europe\n\nEvidence:\n- [S1] Solar capacity in Europe grew 40% last year.",
+    )
+    asyncio.run(main(message))
@@ -0,0 +1,330 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Callable
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from search_cache import normalize_query
+
+DEFAULT_WORKERS = int(os.getenv("SERVICE_WORKERS", str(os.cpu_count() or 1)))
+DEFAULT_JOBS_PER_WORKER = int(os.getenv("SERVICE_JOBS_PER_WORKER", "4"))
+DEFAULT_MAX_QUEUE = int(os.getenv("SERVICE_MAX_QUEUE", "32"))
+MAX_FINISHED_JOBS = 1000
+RETRY_AFTER_SECONDS = 5
+REAP_INTERVAL_SECONDS = 0.5
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def research_manager():
+    """Default manager factory run inside each worker process."""
+    from research_manager import ResearchManager
+
+    return ResearchManager(stream_report=True)
+
+
+async def _run_job(job_id: str, query: str, run_id: str | None, events, manager_factory: Callable) -> None:
+    events.put((job_id, "started", os.getpid()))
+    manager = manager_factory()
+    try:
+        async for update in manager.run(query, run_id=run_id):
+            events.put((job_id, "update", update))
+        events.put((job_id, "report", manager.report.model_dump()))
+    except Exception as e:
+        traceback.print_exc()
+        events.put((job_id, "error", str(e) or type(e).__name__))
+
+
+async def _worker_loop(jobs, events, manager_factory: Callable, concurrency: int) -> None:
+    loop = asyncio.get_running_loop()
+
+    async def consume():
+        while True:
+            job = await loop.run_in_executor(None, jobs.get)
+            if job is None:
+                return
+            await _run_job(*job, events, manager_factory)
+
+    await asyncio.gather(*(consume() for _ in range(concurrency)))
+
+
+def _worker_main(jobs, events, manager_factory: Callable, concurrency: int) -> None:
+    """
+    Entry point of a worker process. One event loop runs up to ``concurrency``
+    jobs at a time and stays up between jobs, so background work such as the
+    email outbox keeps draining.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+    from trace_export import configure_tracing
+
+    configure_tracing("service")
+    asyncio.run(_worker_loop(jobs, events, manager_factory, concurrency))
+
+
+class Job:
+    def __init__(self, query: str, run_id: str | None):
+        self.id = uuid.uuid4().hex[:12]
+        self.query = query
+        self.run_id = run_id
+        self.status = QUEUED
+        self.events: list[tuple[str, object]] = []
+        self.report: dict | None = None
+        self.error: str | None = None
+        self.worker_pid: int | None = None
+        self.created_at = time.time()
+        self.subscribers: set[asyncio.Queue] = set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "query": self.query,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+        }
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class ResearchService:
+    """
+    Headless research service: an ASGI app in front of a pool of worker processes.
+
+    ``POST /jobs`` queues a research job and returns its ID, or 503 with
+    ``Retry-After`` once ``max_queue`` jobs are waiting. ``GET /jobs/{id}/events``
+    streams the job's status updates and partial report as Server-Sent Events,
+    and ``GET /jobs/{id}/report`` returns the final ReportData as JSON. A new
+    query identical to one still queued or running joins that job.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        jobs_per_worker: int = DEFAULT_JOBS_PER_WORKER,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        manager_factory: Callable = research_manager,
+    ):
+        self.workers = workers
+        self.jobs_per_worker = jobs_per_worker
+        self.max_queue = max_queue
+        self.manager_factory = manager_factory
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self._active: dict[str, str] = {}
+        self._context = multiprocessing.get_context("spawn")
+        # Admission is bounded by ``max_queue`` in ``submit``; these only carry accepted work.
+        self._job_queue = self._context.Queue()
+        self._event_queue = self._context.Queue()
+        self._processes: list = []
+        self._reader: threading.Thread | None = None
+        self._stopping = threading.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.app = Starlette(
+            routes=[
+                Route("/jobs", self.submit, methods=["POST"]),
+                Route("/jobs/{job_id}", self.status, methods=["GET"]),
+                Route("/jobs/{job_id}/events", self.events, methods=["GET"]),
+                Route("/jobs/{job_id}/report", self.report, methods=["GET"]),
+                Route("/healthz", self.health, methods=["GET"]),
+            ],
+            lifespan=self.lifespan,
+        )
+
+    @asynccontextmanager
+    async def lifespan(self, app):
+        self.start()
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def _spawn_worker(self):
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self._job_queue, self._event_queue, self.manager_factory, self.jobs_per_worker),
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def start(self) -> None:
+        """Start the worker processes and the thread relaying their events to the event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._processes = [self._spawn_worker() for _ in range(self.workers)]
+        self._stopping.clear()
+        self._reader = threading.Thread(target=self._relay_events, name="research-service-events", daemon=True)
+        self._reader.start()
+        print(f"Research service started {self.workers} workers x {self.jobs_per_worker} jobs")
+
+    def stop(self) -> None:
+        self._stopping.set()
+        for _ in range(len(self._processes) * self.jobs_per_worker):
+            self._job_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        if self._reader is not None:
+            self._reader.join(timeout=5)
+        self._processes = []
+
+    def _relay_events(self) -> None:
+        # Dead workers are reaped on a timer, not only when events stop arriving.
+        next_reap = time.monotonic() + REAP_INTERVAL_SECONDS
+        while not self._stopping.is_set():
+            try:
+                event = self._event_queue.get(timeout=REAP_INTERVAL_SECONDS)
+            except queue.Empty:
+                event = None
+            if event is not None:
+                self._loop.call_soon_threadsafe(self._apply, *event)
+            if time.monotonic() >= next_reap:
+                self._loop.call_soon_threadsafe(self._reap_workers)
+                next_reap = time.monotonic() + REAP_INTERVAL_SECONDS
+
+    def _reap_workers(self) -> None:
+        """Fail the jobs of worker processes that died and replace them."""
+        if self._stopping.is_set():
+            return
+        for index, process in enumerate(self._processes):
+            if process.is_alive():
+                continue
+            print(f"Worker {process.pid} exited with code {process.exitcode}, restarting")
+            for job in self.jobs.values():
+                if job.status == RUNNING and job.worker_pid == process.pid:
+                    self._apply(job.id, "error", f"Worker process exited with code {process.exitcode}")
+            self._processes[index] = self._spawn_worker()
+
+    def _apply(self, job_id: str, kind: str, payload) -> None:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        if kind == "started":
+            job.status = RUNNING
+            job.worker_pid = payload
+        elif kind == "report":
+            job.status = DONE
+            job.report = payload
+        elif kind == "error":
+            job.status = FAILED
+            job.error = payload
+        # Streamed reports arrive as cumulative partials, so an update that
+        # extends the previous one replaces it and replay stays linear in size.
+        previous = job.events[-1] if job.events else None
+        if kind == "update" and previous and previous[0] == "update" and str(payload).startswith(str(previous[1])):
+            job.events[-1] = (kind, payload)
+        else:
+            job.events.append((kind, payload))
+        for subscriber in job.subscribers:
+            subscriber.put_nowait((kind, payload))
+        if job.finished:
+            # Late subscribers only need the outcome; the report is kept on the job.
+            job.events = [(kind, payload)]
+            if self._active.get(normalize_query(job.query)) == job.id:
+                del self._active[normalize_query(job.query)]
+            self._evict_finished()
+
+    def _evict_finished(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def queued(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.status == QUEUED)
+
+    async def submit(self, request: Request) -> JSONResponse:
+        try:
+            body = await request.json()
+        except ValueError:
+            return JSONResponse({"error": "Body must be JSON"}, status_code=400)
+        if not isinstance(body, dict):
+            return JSONResponse({"error": "Body must be a JSON object"}, status_code=400)
+        query = str(body.get("query") or "").strip()
+        run_id = body.get("run_id") or None
+        if not query and not run_id:
+            return JSONResponse({"error": "A query or run_id is required"}, status_code=400)
+
+        if not run_id:
+            active = self.jobs.get(self._active.get(normalize_query(query), ""))
+            if active is not None and not active.finished:
+                return JSONResponse(active.to_dict() | {"coalesced": True}, status_code=200)
+
+        if self.queued() >= self.max_queue:
+            return JSONResponse(
+                {"error": "Too many queued jobs, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+        job = Job(query, run_id)
+        self.jobs[job.id] = job
+        if not run_id:
+            self._active[normalize_query(query)] = job.id
+        self._job_queue.put((job.id, query, run_id))
+        return JSONResponse(job.to_dict(), status_code=202)
+
+    async def status(self, request: Request) -> JSONResponse:
+        job = self.jobs.get(request.path_params["job_id"])
+        if job is None:
+            return JSONResponse({"error": "Unknown job"}, status_code=404)
+        return JSONResponse(job.to_dict())
+
+    async def report(self, request: Request) -> JSONResponse:
+        job = self.jobs.get(request.path_params["job_id"])
+        if job is None:
+            return JSONResponse({"error": "Unknown job"}, status_code=404)
+        if job.status == FAILED:
+            return JSONResponse(job.to_dict(), status_code=500)
+        if job.status != DONE:
+            return JSONResponse(job.to_dict(), status_code=409)
+        return JSONResponse(job.report)
+
+    async def events(self, request: Request):
+        job = self.jobs.get(request.path_params["job_id"])
+        if job is None:
+            return JSONResponse({"error": "Unknown job"}, status_code=404)
+
+        async def stream():
+            subscriber: asyncio.Queue = asyncio.Queue()
+            for event in job.events:
+                subscriber.put_nowait(event)
+            job.subscribers.add(subscriber)
+            try:
+                while True:
+                    kind, payload = await subscriber.get()
+                    yield _sse(kind, payload)
+                    if kind in ("report", "error"):
+                        return
+            finally:
+                job.subscribers.discard(subscriber)
+
+        return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    async def health(self, request: Request) -> JSONResponse:
+        return JSONResponse({
+            "workers": sum(1 for process in self._processes if process.is_alive()),
+            "queued": self.queued(),
+            "running": sum(1 for job in self.jobs.values() if job.status == RUNNING),
+            "max_queue": self.max_queue,
+        })
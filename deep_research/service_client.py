@@ -0,0 +1,33 @@
+import json
+import os
+
+import httpx
+
+DEFAULT_SERVICE_URL = os.getenv("RESEARCH_SERVICE_URL")
+
+
+async def stream_research(base_url: str, query: str, run_id: str | None = None):
+    """
+    Submit a research job to the research service and yield its status updates
+    and partial reports as they arrive over Server-Sent Events.
+    """
+    async with httpx.AsyncClient(base_url=base_url, timeout=httpx.Timeout(30.0, read=None)) as client:
+        response = await client.post("/jobs", json={"query": query, "run_id": run_id})
+        if response.status_code == 503:
+            raise RuntimeError(f"Research service is busy, retry in {response.headers.get('Retry-After', '?')}s")
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+
+        async with client.stream("GET", f"/jobs/{job_id}/events") as events:
+            event = None
+            async for line in events.aiter_lines():
+                if line.startswith("event: "):
+                    event = line.removeprefix("event: ")
+                elif line.startswith("data: "):
+                    data = json.loads(line.removeprefix("data: "))
+                    if event == "update":
+                        yield data
+                    elif event == "error":
+                        raise RuntimeError(f"Research job {job_id} failed: {data}")
+                    elif event == "report":
+                        return
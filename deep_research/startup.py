@@ -0,0 +1,97 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+ROOT_DIR = APP_DIR.parent
+
+# Target name -> (directory to import from, module to import). Each is what a
+# process of that kind imports before doing any work.
+STARTUP_TARGETS = {
+    "cli": (ROOT_DIR, "main"),
+    "research_manager": (APP_DIR, "research_manager"),
+    "batch": (APP_DIR, "batch"),
+    "service": (APP_DIR, "service"),
+}
+
+# Dependencies that cost hundreds of milliseconds to import and must only
+# load once the feature that needs them runs.
+HEAVY_MODULES = ("agents", "openai", "gradio", "brevo_python")
+
+NOISE_FLOOR_MS = 20.0
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s*(\d+) \|\s*(\d+) \| (\s*)(\S+)$")
+
+
+def parse_importtime(output: str) -> dict[str, tuple[int, int]]:
+    """Parse ``python -X importtime`` output into module -> (nesting level, cumulative microseconds)."""
+    modules = {}
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = (len(match.group(3)) // 2, int(match.group(2)))
+    return modules
+
+
+def measure_import(directory: Path, module: str) -> tuple[float, list[str]]:
+    """
+    Import ``module`` in a fresh interpreter under ``-X importtime``. Returns its
+    cumulative import time in milliseconds and the heavy modules it loaded.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=directory,
+        env=os.environ | {"PYTHONWARNINGS": "ignore"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = parse_importtime(completed.stderr)
+    _, cumulative = modules.get(module, (0, 0))
+    heavy = [name for name in HEAVY_MODULES if name in modules]
+    return cumulative / 1000, heavy
+
+
+def run_startup_benchmark(runs: int = 5, targets: dict | None = None) -> dict:
+    """Measure the median import time of every startup target over ``runs`` fresh interpreters."""
+    targets = targets if targets is not None else STARTUP_TARGETS
+    results = {"runs": runs, "python": sys.version.split()[0], "targets": {}}
+    for name, (directory, module) in targets.items():
+        samples = []
+        for _ in range(runs):
+            milliseconds, heavy = measure_import(directory, module)
+            samples.append(milliseconds)
+        results["targets"][name] = {
+            "import_ms": round(statistics.median(samples), 1),
+            "heavy_modules": heavy,
+        }
+    return results
+
+
+def compare_startup(results: dict, baseline: dict, tolerance: float = 0.5) -> list[str]:
+    """
+    List the targets that import a heavy module, or whose import time is more
+    than ``tolerance`` worse than the baseline. Differences under
+    ``NOISE_FLOOR_MS`` are ignored.
+    """
+    regressions = []
+    for name, target in results["targets"].items():
+        for module in target["heavy_modules"]:
+            regressions.append(f"{name} imports {module} at startup")
+        previous = baseline.get("targets", {}).get(name)
+        if previous is None:
+            continue
+        current, before = target["import_ms"], previous["import_ms"]
+        if current > before * (1 + tolerance) and current - before > NOISE_FLOOR_MS:
+            regressions.append(f"{name} import time {current:.1f}ms vs baseline {before:.1f}ms")
+    return regressions
+
+
+def print_startup_results(results: dict) -> None:
+    print(f"Import time, median of {results['runs']} runs (Python {results['python']}):")
+    for name, target in results["targets"].items():
+        heavy = f"  loads {', '.join(target['heavy_modules'])}" if target["heavy_modules"] else ""
+        print(f"  {name:<18} {target['import_ms']:8.1f} ms{heavy}")
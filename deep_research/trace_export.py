@@ -0,0 +1,364 @@
+import glob
+import gzip
+import json
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+from agents.tracing import TracingProcessor
+
+from metrics import QUANTILES, quantile
+
+DEFAULT_TRACE_EXPORT = os.getenv("TRACE_EXPORT", "hosted")
+DEFAULT_TRACE_DIR = os.getenv("TRACE_DIR", ".cache/traces")
+DEFAULT_SLOW_TRACE_SECONDS = float(os.getenv("TRACE_SLOW_SECONDS", "300"))
+# Head sampling rate of each entry point; TRACE_SAMPLE_RATE overrides it.
+ENTRY_POINT_SAMPLE_RATES = {"research": 1.0, "ui": 1.0, "batch": 0.1, "service": 0.1}
+# Spans held per unsampled trace while its tail sampling decision is pending.
+MAX_BUFFERED_SPANS = 500
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_FLUSH_INTERVAL = 5.0
+DEFAULT_MAX_QUEUE = 10_000
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """Parse ``"Research trace=0.1,Search=0"`` into workflow name -> sample rate."""
+    rates = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = entry.rpartition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+class _PendingTrace:
+    __slots__ = ("trace", "sampled", "started", "spans", "errored", "dropped")
+
+    def __init__(self, trace, sampled: bool):
+        self.trace = trace
+        self.sampled = sampled
+        self.started = time.monotonic()
+        self.spans = []
+        self.errored = False
+        self.dropped = 0
+
+
+class SamplingProcessor(TracingProcessor):
+    """
+    Trace processor that forwards a sample of traces to ``processors``.
+
+    Head sampling keeps each trace with the rate for its workflow name
+    (``rates``, else ``default_rate``) and streams it through as it runs.
+    The spans of every other trace are held until it ends, and the trace is
+    still forwarded if any span recorded an error or it took at least
+    ``slow_seconds`` (tail sampling). The rest are dropped without ever
+    reaching an exporter.
+    """
+
+    def __init__(
+        self,
+        processors: list,
+        default_rate: float = 1.0,
+        rates: dict[str, float] | None = None,
+        slow_seconds: float = DEFAULT_SLOW_TRACE_SECONDS,
+        metrics=None,
+        seed: int | None = None,
+    ):
+        self.processors = processors
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self.slow_seconds = slow_seconds
+        self.metrics = metrics
+        self._random = random.Random(seed)
+        self._pending: dict[str, _PendingTrace] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, decision: str) -> None:
+        if self.metrics is not None:
+            self.metrics.inc("traces_total", decision=decision)
+
+    def on_trace_start(self, trace) -> None:
+        rate = self.rates.get(trace.name, self.default_rate)
+        with self._lock:
+            pending = self._pending[trace.trace_id] = _PendingTrace(trace, self._random.random() < rate)
+        if pending.sampled:
+            for processor in self.processors:
+                processor.on_trace_start(trace)
+
+    def on_trace_end(self, trace) -> None:
+        with self._lock:
+            pending = self._pending.pop(trace.trace_id, None)
+        if pending is None:
+            return
+        if pending.sampled:
+            decision = "sampled"
+        elif pending.errored:
+            decision = "kept_error"
+        elif time.monotonic() - pending.started >= self.slow_seconds:
+            decision = "kept_slow"
+        else:
+            self._count("dropped")
+            return
+        self._count(decision)
+        for processor in self.processors:
+            if not pending.sampled:
+                processor.on_trace_start(trace)
+                for span in pending.spans:
+                    processor.on_span_start(span)
+                    processor.on_span_end(span)
+            processor.on_trace_end(trace)
+        if pending.dropped and self.metrics is not None:
+            self.metrics.inc("trace_spans_dropped_total", pending.dropped)
+
+    def on_span_start(self, span) -> None:
+        pending = self._pending.get(span.trace_id)
+        if pending is not None and pending.sampled:
+            for processor in self.processors:
+                processor.on_span_start(span)
+
+    def on_span_end(self, span) -> None:
+        with self._lock:
+            pending = self._pending.get(span.trace_id)
+            if pending is not None and not pending.sampled:
+                pending.errored = pending.errored or span.error is not None
+                if len(pending.spans) < MAX_BUFFERED_SPANS:
+                    pending.spans.append(span)
+                else:
+                    pending.dropped += 1
+                return
+        # Spans outside any trace this processor saw start are forwarded as they are.
+        for processor in self.processors:
+            processor.on_span_end(span)
+
+    def shutdown(self) -> None:
+        for processor in self.processors:
+            processor.shutdown()
+
+    def force_flush(self) -> None:
+        for processor in self.processors:
+            processor.force_flush()
+
+
+class LocalTraceExporter(TracingProcessor):
+    """
+    Trace processor that writes traces and finished spans as gzip-compressed
+    JSON lines under ``directory``, one file per batch. Callers only put the
+    trace or span on a bounded queue; a background thread serializes and
+    writes a batch once ``batch_size`` items are queued or ``flush_interval``
+    seconds have passed. When the queue is full, items are dropped rather
+    than blocking the run.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_TRACE_DIR,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+    ):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.files = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._write_lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._queue.qsize() >= self.batch_size:
+            self._flush_requested.set()
+
+    def on_trace_start(self, trace) -> None:
+        self._put(trace)
+
+    def on_trace_end(self, trace) -> None:
+        pass
+
+    def on_span_start(self, span) -> None:
+        pass
+
+    def on_span_end(self, span) -> None:
+        self._put(span)
+
+    def _loop(self) -> None:
+        while not self._stopped.is_set():
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            self._write_batches()
+
+    def _write_batches(self) -> None:
+        with self._write_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                self._write(batch)
+
+    def _write(self, batch: list) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(self.directory, f"traces-{stamp}-{os.getpid()}-{self.files:05d}.jsonl.gz")
+        self.files += 1
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            for item in batch:
+                record = item.export()
+                if record is not None:
+                    file.write(json.dumps(record, default=str) + "\n")
+
+    def force_flush(self) -> None:
+        self._write_batches()
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._flush_requested.set()
+        self._thread.join(timeout=5)
+        self._write_batches()
+
+
+def configure_tracing(
+    entry_point: str,
+    export: str = DEFAULT_TRACE_EXPORT,
+    directory: str = DEFAULT_TRACE_DIR,
+    metrics=None,
+) -> SamplingProcessor | None:
+    """
+    Install the sampling processor for this process. ``export`` is "hosted"
+    (the OpenAI trace backend), "local" (gzip JSONL files in ``directory``),
+    "both", or "none" to disable tracing. The head sampling rate is the
+    entry point's, unless TRACE_SAMPLE_RATE is set; TRACE_SAMPLE_RATES sets
+    rates per workflow name.
+    """
+    from agents import set_trace_processors, set_tracing_disabled
+    from agents.tracing.processors import default_processor
+
+    from metrics import default_metrics
+
+    if export == "none":
+        set_tracing_disabled(True)
+        return None
+    if export not in ("hosted", "local", "both"):
+        raise ValueError(f"Unknown trace export: {export!r}")
+    processors = []
+    if export in ("hosted", "both"):
+        processors.append(default_processor())
+    if export in ("local", "both"):
+        processors.append(LocalTraceExporter(directory))
+    rate = os.getenv("TRACE_SAMPLE_RATE")
+    sampler = SamplingProcessor(
+        processors,
+        default_rate=float(rate) if rate else ENTRY_POINT_SAMPLE_RATES.get(entry_point, 1.0),
+        rates=parse_sample_rates(os.getenv("TRACE_SAMPLE_RATES", "")),
+        metrics=metrics if metrics is not None else default_metrics(),
+    )
+    set_trace_processors([sampler])
+    return sampler
+
+
+def _seconds(record: dict) -> float | None:
+    if not record.get("started_at") or not record.get("ended_at"):
+        return None
+    started = datetime.fromisoformat(record["started_at"])
+    return (datetime.fromisoformat(record["ended_at"]) - started).total_seconds()
+
+
+def read_trace_files(directory: str = DEFAULT_TRACE_DIR) -> list[dict]:
+    records = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.jsonl.gz"))):
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            records += [json.loads(line) for line in file if line.strip()]
+    return records
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    return {f"p{int(q * 100)}": round(quantile(samples, q), 3) for q in QUANTILES}
+
+
+def summarize_traces(records: list[dict]) -> dict:
+    """
+    Per-agent latency breakdown of exported traces: calls, errors and
+    latency percentiles of each agent's spans, split into time waiting on
+    the model and time in tools; plus the duration of each workflow.
+    """
+    spans = [record for record in records if record.get("object") == "trace.span"]
+    children: dict[str, list[dict]] = {}
+    for span in spans:
+        children.setdefault(span.get("parent_id"), []).append(span)
+
+    def nested(span_id: str, kinds: tuple[str, ...]) -> float:
+        total = 0.0
+        for child in children.get(span_id, []):
+            if child["span_data"].get("type") in kinds:
+                total += _seconds(child) or 0.0
+            else:
+                total += nested(child["id"], kinds)
+        return total
+
+    agents: dict[str, dict] = {}
+    for span in spans:
+        data = span["span_data"]
+        seconds = _seconds(span)
+        if data.get("type") != "agent" or seconds is None:
+            continue
+        entry = agents.setdefault(data.get("name") or "?", {"calls": 0, "errors": 0, "seconds": [], "model": 0.0, "tools": 0.0})
+        entry["calls"] += 1
+        entry["errors"] += span.get("error") is not None
+        entry["seconds"].append(seconds)
+        entry["model"] += nested(span["id"], ("response", "generation"))
+        entry["tools"] += nested(span["id"], ("function",))
+
+    workflows: dict[str, list[float]] = {}
+    names = {record["id"]: record.get("workflow_name") or "?" for record in records if record.get("object") == "trace"}
+    bounds: dict[str, list[datetime]] = {}
+    for span in spans:
+        if span.get("started_at") and span.get("ended_at"):
+            times = bounds.setdefault(span["trace_id"], [])
+            times += [datetime.fromisoformat(span["started_at"]), datetime.fromisoformat(span["ended_at"])]
+    for trace_id, times in bounds.items():
+        workflows.setdefault(names.get(trace_id, "?"), []).append((max(times) - min(times)).total_seconds())
+
+    return {
+        "traces": len(names),
+        "spans": len(spans),
+        "agents": {
+            name: {
+                "calls": entry["calls"],
+                "errors": entry["errors"],
+                "seconds": _percentiles(entry["seconds"]),
+                "total_seconds": round(sum(entry["seconds"]), 3),
+                "model_seconds": round(entry["model"], 3),
+                "tool_seconds": round(entry["tools"], 3),
+            }
+            for name, entry in sorted(agents.items())
+        },
+        "workflows": {name: {"count": len(samples), **_percentiles(samples)} for name, samples in sorted(workflows.items())},
+    }
+
+
+def print_trace_summary(summary: dict) -> None:
+    print(f"{summary['traces']} traces, {summary['spans']} spans")
+    print("Agent latency (seconds):")
+    for name, entry in summary["agents"].items():
+        total = entry["total_seconds"] or 1.0
+        print(
+            f"  {name:<22} calls {entry['calls']:>5}  errors {entry['errors']:>3}  {entry['seconds']}  "
+            f"model {entry['model_seconds'] / total:.0%}  tools {entry['tool_seconds'] / total:.0%}"
+        )
+    print("Workflow duration (seconds):")
+    for name, entry in summary["workflows"].items():
+        print(f"  {name:<22} {entry}")
@@ -1,5 +1,312 @@
-def main():
-    print("Hello from openai-deep-research-agent!")
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# The app modules import each other by bare name, as when run from inside deep_research/.
+sys.path.insert(0, str(Path(__file__).resolve().parent / "deep_research"))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description="OpenAI deep research agent")
+    subcommands = parser.add_subparsers(dest="command")
+
+    research = subcommands.add_parser("research", help="Research one query and print the report")
+    research.add_argument("query", nargs="?", default="", help="What to research")
+    research.add_argument("--run-id", help="Resume a previous run from its last completed stage")
+    research.add_argument(
+        "--clarify",
+        action="store_true",
+        help="Answer clarifying questions on stdin while the first searches already run",
+    )
+    research.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Research from scratch instead of reusing or building on stored reports for similar queries",
+    )
+    research.add_argument(
+        "--sectioned",
+        action="store_true",
+        help="Outline the report, then write its sections concurrently",
+    )
+    research.add_argument(
+        "--search-backend",
+        choices=["web", "local", "hybrid"],
+        help="Search the web, the local corpus index, or the corpus first and the web when it has too little "
+        "(default: SEARCH_BACKEND or web)",
+    )
+    research.add_argument(
+        "--deep-dive",
+        action="store_true",
+        help="Also research the report's follow-up questions, recursively, and write one consolidated report",
+    )
+    research.add_argument("--depth", type=int, help="Deep dive levels below the query (default: 2)")
+    research.add_argument("--breadth", type=int, help="Follow-up questions explored per branch (default: 3)")
+    research.add_argument(
+        "--token-budget",
+        type=int,
+        help="Token budget of the run (default: RUN_TOKEN_BUDGET), or of the deep dive (default: DEEP_DIVE_TOKEN_BUDGET)",
+    )
+    research.add_argument("--time-budget", type=float, help="Wall-clock budget of the run or deep dive, in seconds")
+    research.add_argument("--cost-budget", type=float, help="Cost budget of the run in USD (default: RUN_COST_BUDGET)")
+    research.add_argument(
+        "--email",
+        choices=["render", "agent", "none"],
+        default="none",
+        help="Email the report: render it locally, use the email agent, or skip it (default: none)",
+    )
+
+    subcommands.add_parser("ui", help="Launch the Gradio UI")
+
+    batch = subcommands.add_parser("batch", help="Research every query in a JSONL file")
+    batch.add_argument("input", help="JSONL file with one query string or {\"id\", \"query\"} object per line")
+    batch.add_argument("output", help="JSONL file to append one result record per query to")
+    batch.add_argument("--concurrency", type=int, default=4, help="Research pipelines to run at once (default: 4)")
+    batch.add_argument("--send-emails", action="store_true", help="Email each report as it completes")
+    batch.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port while the batch runs")
+
+    benchmark = subcommands.add_parser("benchmark", help="Load-test the pipeline offline against a simulated model")
+    benchmark.add_argument("--pipelines", type=int, default=20, help="Research runs to complete (default: 20)")
+    benchmark.add_argument("--concurrency", type=int, default=10, help="Runs in flight at once (default: 10)")
+    benchmark.add_argument("--searches", type=int, default=5, help="Searches per simulated plan (default: 5)")
+    benchmark.add_argument("--seed", type=int, default=7, help="Seed for simulated latencies and failures")
+    benchmark.add_argument("--stream", action="store_true", help="Stream the report as the Gradio UI does")
+    benchmark.add_argument("--search-quorum", type=int, help="Start writing once this many summaries are in")
+    benchmark.add_argument("--search-budget", type=float, help="Start writing after this many seconds of searching")
+    benchmark.add_argument("--iterative", action="store_true", help="Search in rounds until novelty drops")
+    benchmark.add_argument("--sectioned", action="store_true", help="Write the report section by section")
+    benchmark.add_argument("--output", help="Write the results as JSON to this file")
+    benchmark.add_argument("--baseline", help="Compare against this baseline JSON and exit 1 on a regression")
+    benchmark.add_argument("--save-baseline", help="Save the results as the new baseline JSON")
+    benchmark.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression fraction (default: 0.25)")
+
+    serve = subcommands.add_parser("serve", help="Run the headless research service (HTTP + Server-Sent Events)")
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000)")
+    serve.add_argument("--workers", type=int, help="Worker processes (default: SERVICE_WORKERS or the CPU count)")
+    serve.add_argument("--jobs-per-worker", type=int, help="Jobs each worker runs at once (default: 4)")
+    serve.add_argument("--max-queue", type=int, help="Queued jobs accepted before returning 503 (default: 32)")
+    serve.add_argument("--offline", action="store_true", help="Answer with the simulated model instead of OpenAI")
+
+    traces = subcommands.add_parser("traces", help="Summarize locally exported traces into per-agent latencies")
+    traces.add_argument("--directory", default=".cache/traces", help="Directory of trace files (default: .cache/traces)")
+    traces.add_argument("--json", action="store_true", help="Print the summary as JSON")
+
+    corpus = subcommands.add_parser("corpus", help="Build, query and benchmark the local corpus search index")
+    corpus_commands = corpus.add_subparsers(dest="corpus_command", required=True)
+    corpus_index = corpus_commands.add_parser("index", help="Index new and changed documents, forget deleted ones")
+    corpus_index.add_argument("directory", nargs="?", help="Documents to index (default: CORPUS_DIR or corpus)")
+    corpus_search = corpus_commands.add_parser("search", help="Print the best matching passages for a query")
+    corpus_search.add_argument("query", help="What to search for")
+    corpus_search.add_argument("--hits", type=int, default=5, help="Passages to print (default: 5)")
+    corpus_benchmark = corpus_commands.add_parser("benchmark", help="Time indexing and queries on a synthetic corpus")
+    corpus_benchmark.add_argument("--chunks", type=int, default=1_000_000, help="Chunks to index (default: 1000000)")
+    corpus_benchmark.add_argument("--chunk-words", type=int, default=60, help="Words per chunk (default: 60)")
+    corpus_benchmark.add_argument("--queries", type=int, default=200, help="Queries to time (default: 200)")
+    corpus_benchmark.add_argument("--seed", type=int, default=7, help="Seed for the synthetic corpus and queries")
+    corpus_benchmark.add_argument("--output", help="Write the results as JSON to this file")
+
+    startup = subcommands.add_parser("startup", help="Measure the import time of the CLI and core modules")
+    startup.add_argument("--runs", type=int, default=5, help="Fresh interpreters per target (default: 5)")
+    startup.add_argument("--output", help="Write the results as JSON to this file")
+    startup.add_argument("--baseline", help="Compare against this baseline JSON and exit 1 on a regression")
+    startup.add_argument("--save-baseline", help="Save the results as the new baseline JSON")
+    startup.add_argument("--tolerance", type=float, default=0.5, help="Allowed regression fraction (default: 0.5)")
+    return parser
+
+
+def write_results(results: dict, *paths: str | None) -> None:
+    import json
+
+    for path in paths:
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            Path(path).write_text(json.dumps(results, indent=2) + "\n")
+
+
+def check_baseline(regressions: list[str]) -> None:
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions against the baseline")
+
+
+def main(argv: list[str] | None = None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "research":
+        from dotenv import load_dotenv
+        from budget import RunBudget
+        from research_manager import ResearchManager
+
+        if not args.query and not args.run_id:
+            parser.error("research needs a query or --run-id")
+        if args.deep_dive and args.run_id:
+            parser.error("--run-id cannot be combined with --deep-dive")
+        load_dotenv(override=True)
+        from trace_export import configure_tracing
+
+        configure_tracing("research")
+
+        async def research():
+            import threading
+
+            loop = asyncio.get_running_loop()
+            reuse = {"reuse_threshold": None, "seed_threshold": None} if args.fresh else {}
+            limits = {"cost": args.cost_budget}
+            if not args.deep_dive:
+                limits |= {"tokens": args.token_budget, "seconds": args.time_budget}
+            budget = RunBudget(**{key: value for key, value in limits.items() if value is not None})
+            manager = ResearchManager(
+                email_mode=args.email,
+                clarify=args.clarify,
+                budget=budget,
+                sectioned_report=args.sectioned,
+                **({"search_backend": args.search_backend} if args.search_backend else {}),
+                **reuse,
+            )
+            if args.deep_dive:
+                from deep_dive import DeepDive
+
+                options = {
+                    "depth": args.depth,
+                    "breadth": args.breadth,
+                    "token_budget": args.token_budget,
+                    "time_budget": args.time_budget,
+                }
+                dive = DeepDive(manager, **{key: value for key, value in options.items() if value is not None})
+                updates = dive.run(args.query)
+            else:
+                updates = manager.run(args.query, run_id=args.run_id)
+            reader = None
+            async for update in updates:
+                print(update)
+                if manager.questions and reader is None:
+                    # A daemon thread, so an unanswered prompt never keeps the process alive.
+                    reader = threading.Thread(
+                        target=lambda: loop.call_soon_threadsafe(manager.answer, input("Your answers: ")),
+                        daemon=True,
+                    )
+                    reader.start()
+            if args.email == "render":
+                # One delivery attempt before the event loop closes; a failed email
+                # stays queued for the next run instead of holding the CLI through its backoff.
+                await manager.email_outbox.flush()
+
+        asyncio.run(research())
+        return
+
+    if args.command == "ui":
+        # Gradio is only imported when the UI is asked for.
+        from deep_research import ui
+
+        ui.launch(inbrowser=True)
+        return
+
+    if args.command == "batch":
+        from dotenv import load_dotenv
+        from batch import run_batch
+
+        load_dotenv(override=True)
+        from trace_export import configure_tracing
+
+        configure_tracing("batch")
+        if args.metrics_port:
+            from metrics import start_metrics_server
+
+            start_metrics_server(args.metrics_port)
+        asyncio.run(
+            run_batch(
+                args.input,
+                args.output,
+                concurrency=args.concurrency,
+                send_emails=args.send_emails,
+            )
+        )
+        return
+
+    if args.command == "serve":
+        import uvicorn
+        from dotenv import load_dotenv
+        from service import ResearchService
+
+        load_dotenv(override=True)
+        options = {
+            "workers": args.workers,
+            "jobs_per_worker": args.jobs_per_worker,
+            "max_queue": args.max_queue,
+        }
+        if args.offline:
+            from benchmark import offline_manager
+
+            options["manager_factory"] = offline_manager
+        service = ResearchService(**{key: value for key, value in options.items() if value is not None})
+        uvicorn.run(service.app, host=args.host, port=args.port)
+        return
+
+    if args.command == "benchmark":
+        import json
+        from benchmark import BenchmarkConfig, compare_to_baseline, print_results, run_benchmark
+
+        config = BenchmarkConfig(
+            pipelines=args.pipelines,
+            concurrency=args.concurrency,
+            searches=args.searches,
+            seed=args.seed,
+            stream_report=args.stream,
+            search_quorum=args.search_quorum,
+            search_budget=args.search_budget,
+            iterative_search=args.iterative,
+            sectioned_report=args.sectioned,
+        )
+        results = asyncio.run(run_benchmark(config))
+        print_results(results)
+        write_results(results, args.output, args.save_baseline)
+        if args.baseline:
+            check_baseline(compare_to_baseline(results, json.loads(Path(args.baseline).read_text()), args.tolerance))
+        return
+
+    if args.command == "traces":
+        import json
+        from trace_export import print_trace_summary, read_trace_files, summarize_traces
+
+        summary = summarize_traces(read_trace_files(args.directory))
+        if args.json:
+            print(json.dumps(summary, indent=2))
+        else:
+            print_trace_summary(summary)
+        return
+
+    if args.command == "corpus":
+        from corpus_index import DEFAULT_CORPUS_DIR, default_corpus_index, format_hits
+
+        if args.corpus_command == "index":
+            print(default_corpus_index().update(args.directory or DEFAULT_CORPUS_DIR))
+            print(default_corpus_index().stats())
+        elif args.corpus_command == "search":
+            print(format_hits(default_corpus_index().search(args.query, k=args.hits)))
+        else:
+            from corpus_benchmark import print_corpus_results, run_corpus_benchmark
+
+            results = run_corpus_benchmark(args.chunks, args.chunk_words, args.queries, args.seed)
+            print_corpus_results(results)
+            write_results(results, args.output)
+        return
+
+    if args.command == "startup":
+        import json
+        from startup import compare_startup, print_startup_results, run_startup_benchmark
+
+        results = run_startup_benchmark(args.runs)
+        print_startup_results(results)
+        write_results(results, args.output, args.save_baseline)
+        if args.baseline:
+            check_baseline(compare_startup(results, json.loads(Path(args.baseline).read_text()), args.tolerance))
+        return
+
+    parser.print_help()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,16 @@
+import importlib
+import sys
+from pathlib import Path
+
+# Bind "deep_research" to the package before the app directory joins sys.path,
+# otherwise the Gradio script deep_research/deep_research.py would shadow it.
+import deep_research
+
+APP_DIR = str(Path(__file__).resolve().parents[2] / "deep_research")
+
+
+def import_app_module(name: str):
+    """Import an app module by bare name, the way the app modules import each other."""
+    if APP_DIR not in sys.path:
+        sys.path.append(APP_DIR)
+    return importlib.import_module(name)
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+from unittest.mock import MagicMock
+
+from deep_research.batch import completed_ids, load_queries, query_id, run_batch
+from deep_research.writer_agent import ReportData
+from deep_research.scheduler import AgentScheduler
+
+
+class FakeManager:
+    def __init__(self, fail_on=()):
+        self.fail_on = fail_on
+        self.report = None
+
+    async def run(self, query):
+        yield "working"
+        if query in self.fail_on:
+            raise RuntimeError("search failed")
+        self.report = ReportData(short_summary=f"About {query}", markdown_report="# Report", follow_up_questions=[])
+        yield self.report.markdown_report
+
+
+def write_lines(path, lines):
+    path.write_text("".join(line + "\n" for line in lines))
+
+
+def test_load_queries_accepts_strings_and_objects(tmp_path):
+    """
+    Tests that both JSONL shapes are accepted and IDs are filled in.
+    """
+    path = tmp_path / "queries.jsonl"
+    write_lines(path, ['"solar power"', '{"id": "q2", "query": "wind power"}', ""])
+
+    queries = load_queries(str(path))
+
+    assert queries == [
+        {"query": "solar power", "id": query_id("solar power")},
+        {"id": "q2", "query": "wind power"},
+    ]
+
+
+def test_completed_ids_ignores_errors_and_partial_lines(tmp_path):
+    """
+    Tests that only successful results count as done.
+    """
+    path = tmp_path / "results.jsonl"
+    write_lines(path, ['{"id": "a", "status": "ok"}', '{"id": "b", "status": "error"}', '{"id": "c", "sta'])
+
+    assert completed_ids(str(path)) == {"a"}
+
+
+@pytest.mark.asyncio
+async def test_run_batch_writes_results_and_resumes(tmp_path):
+    """
+    Tests that every query gets a result record, failures are recorded, and
+    a rerun only retries queries without a successful result.
+    """
+    input_path = tmp_path / "queries.jsonl"
+    output_path = tmp_path / "results.jsonl"
+    write_lines(input_path, ['"solar power"', '"wind power"', '"hydro power"'])
+
+    summary = await run_batch(
+        str(input_path),
+        str(output_path),
+        concurrency=2,
+        scheduler=AgentScheduler(),
+        manager_factory=lambda: FakeManager(fail_on={"wind power"}),
+    )
+
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert sorted(record["status"] for record in records) == ["error", "ok", "ok"]
+    assert summary["succeeded"] == 2 and summary["failed"] == 1
+
+    factory = MagicMock(side_effect=lambda: FakeManager())
+    summary = await run_batch(str(input_path), str(output_path), scheduler=AgentScheduler(), manager_factory=factory)
+
+    assert factory.call_count == 1
+    assert summary["skipped"] == 2
+    assert completed_ids(str(output_path)) == {query_id(q) for q in ("solar power", "wind power", "hydro power")}
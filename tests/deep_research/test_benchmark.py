@@ -0,0 +1,71 @@
+import pytest
+
+from tests.deep_research.app_modules import import_app_module
+
+benchmark = import_app_module("benchmark")
+
+
+def fast_config(**kwargs):
+    profiles = {kind: benchmark.AgentProfile(median_latency=0.001) for kind in ("plan", "search", "write", "email")}
+    kwargs.setdefault("profiles", profiles)
+    return benchmark.BenchmarkConfig(pipelines=4, concurrency=2, searches=3, **kwargs)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stream_report", [False, True])
+async def test_benchmark_runs_offline(stream_report):
+    """
+    Tests that full pipelines complete against the fake model provider and
+    every stage, token count and memory figure is reported.
+    """
+    results = await benchmark.run_benchmark(fast_config(stream_report=stream_report))
+
+    assert results["succeeded"] == 4
+    assert results["emails_sent"] == 4
+    assert set(results["stage_seconds"]) == {"plan", "search", "write", "email"}
+    assert set(results["end_to_end_seconds"]) == {"p50", "p95", "p99"}
+    assert results["input_tokens"] > 0 and results["output_tokens"] > 0
+    assert results["peak_memory_mb"] > 0
+
+
+@pytest.mark.asyncio
+async def test_benchmark_retries_simulated_rate_limits():
+    """
+    Tests that simulated 429s go through the scheduler's retry path.
+    """
+    config = fast_config()
+    config.profiles["search"].rate_limit_rate = 0.5
+    results = await benchmark.run_benchmark(config)
+
+    assert results["succeeded"] == 4
+    assert results["retries"] > 0
+
+
+def test_compare_to_baseline():
+    """
+    Tests that only metrics worse than the baseline by more than the tolerance
+    are flagged, and that p99 is ignored when it rests on too few samples.
+    """
+    baseline = {
+        "pipelines_per_minute": 100.0,
+        "end_to_end_seconds": {"p50": 1.0, "p95": 2.0, "p99": 3.0},
+        "stage_seconds": {"write": {"p50": 0.5, "p95": 1.0, "p99": 1.0, "count": 200}},
+        "input_tokens": 1000,
+        "peak_memory_mb": 10.0,
+    }
+    results = {
+        "succeeded": 20,
+        "pipelines_per_minute": 90.0,
+        "end_to_end_seconds": {"p50": 1.1, "p95": 3.0, "p99": 9.0},
+        "stage_seconds": {"write": {"p50": 0.5, "p95": 1.0, "p99": 2.0, "count": 200}},
+        "input_tokens": 1000,
+        "peak_memory_mb": 20.0,
+    }
+
+    regressions = benchmark.compare_to_baseline(results, baseline, tolerance=0.25)
+    assert [line.split(":")[0] for line in regressions] == [
+        "end_to_end_seconds.p95",
+        "stage_seconds.write.p99",
+        "peak_memory_mb",
+    ]
+    assert benchmark.compare_to_baseline(results, results) == []
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from tests.deep_research.app_modules import import_app_module
+
+budget = import_app_module("budget")
+metrics = import_app_module("metrics")
+
+
+def make_agent(model="gpt-4o-mini", context_size=None):
+    tools = [] if context_size is None else [SimpleNamespace(search_context_size=context_size)]
+    return SimpleNamespace(name="Agent", model=model, instructions="Be brief.", tools=tools)
+
+
+def make_result(input_tokens, output_tokens, web_searches=0):
+    return SimpleNamespace(
+        raw_responses=[SimpleNamespace(usage=SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens))],
+        new_items=[SimpleNamespace(raw_item=SimpleNamespace(type="web_search_call"))] * web_searches,
+    )
+
+
+def test_estimates_price_tokens_and_web_searches():
+    """
+    Tests that estimates use the model's price, that unknown models are priced
+    conservatively, and that a larger search context costs more.
+    """
+    plain = budget.estimate_call(make_agent(), "x" * 400, output_tokens=100)
+    assert plain.tokens == budget.estimate_tokens("Be brief.") + 100 + 100
+    assert plain.cost == pytest.approx((102 * 0.15 + 100 * 0.60) / 1_000_000)
+    assert budget.estimate_call(make_agent(model="future-model"), "x" * 400, 100).cost > plain.cost
+
+    low = budget.estimate_call(make_agent(context_size="low"), "query", 500)
+    high = budget.estimate_call(make_agent(context_size="high"), "query", 500)
+    assert low.cost > 0.025
+    assert high.cost > low.cost and high.tokens > low.tokens
+
+
+def test_degrade_drops_searches_then_context_then_report_length():
+    """
+    Tests that a plan is scaled down in order until it fits, and kept as is when it already does.
+    """
+    plan = budget.RunPlan(searches=3, search_context_size="medium")
+    assert budget.degrade(plan, lambda p: True) == (plan, [])
+
+    fitted, steps = budget.degrade(plan, lambda p: p.report_words is not None and p.report_words <= 800)
+    assert steps == ["searches", "searches", "search_context", "report_length", "report_length"]
+    assert fitted == budget.RunPlan(searches=1, search_context_size="low", report_words=800)
+
+    smallest, steps = budget.degrade(plan, lambda p: False)
+    assert smallest.report_words == budget.REPORT_WORD_LIMITS[-1]
+
+
+def test_reservations_are_atomic_across_threads():
+    """
+    Tests that concurrent reservations never jointly exceed the limit, and
+    that settling replaces a reservation with actual usage.
+    """
+    run_budget = budget.RunBudget(tokens=100, cost=None, seconds=None)
+    granted = []
+    barrier = threading.Barrier(20)
+
+    def reserve():
+        barrier.wait()
+        granted.append(run_budget.reserve(budget.Estimate(tokens=10)))
+
+    threads = [threading.Thread(target=reserve) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert granted.count(True) == 10
+    assert run_budget.reserve(budget.Estimate(tokens=10), required=True)
+
+    run_budget.settle(budget.Estimate(tokens=10), budget.Estimate(tokens=4))
+    assert run_budget.stats()["tokens"] == 4
+    assert run_budget.stats()["reserved_tokens"] == 100
+
+
+def test_time_budget_refuses_new_calls_once_spent():
+    """
+    Tests that nothing fits once the wall-clock budget has run out.
+    """
+    run_budget = budget.RunBudget(tokens=None, cost=None, seconds=0.0)
+    run_budget.start()
+    assert not run_budget.fits(budget.Estimate())
+
+
+@pytest.mark.asyncio
+async def test_budgeted_scheduler_charges_actual_usage():
+    """
+    Tests that a call is charged its actual tokens and web searches, and that
+    an optional call the budget cannot cover is refused without running.
+    """
+    scheduler = MagicMock()
+    scheduler.run = AsyncMock(return_value=make_result(1000, 500, web_searches=1))
+    registry = metrics.MetricsRegistry()
+    run_budget = budget.RunBudget(tokens=None, cost=0.04, seconds=None)
+    budgeted = budget.BudgetedScheduler(scheduler, run_budget, registry)
+    agent = make_agent(context_size="low")
+
+    await budgeted.run(agent, "solar", priority=0, output_tokens=500, required=False)
+    assert scheduler.run.await_args.kwargs["estimated_tokens"] > 0
+    assert "output_tokens" not in scheduler.run.await_args.kwargs
+    assert run_budget.stats()["tokens"] == 1500
+    assert run_budget.stats()["cost"] == pytest.approx((1000 * 0.15 + 500 * 0.60) / 1_000_000 + 0.025)
+    assert run_budget.stats()["reserved_cost"] == 0
+
+    with pytest.raises(budget.BudgetExceeded):
+        await budgeted.run(agent, "wind", output_tokens=500, required=False)
+    assert scheduler.run.await_count == 1
+    assert registry.counter("budget_skipped_calls_total", agent="Agent") == 1
+
+    await budgeted.run(agent, "required anyway", output_tokens=500)
+    assert scheduler.run.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_calls_are_charged_their_estimate():
+    """
+    Tests that a call cancelled mid-flight is charged its estimate, since it may still be billed.
+    """
+    scheduler = MagicMock()
+    scheduler.run = AsyncMock(side_effect=asyncio.CancelledError)
+    run_budget = budget.RunBudget(tokens=None, cost=None, seconds=None)
+    budgeted = budget.BudgetedScheduler(scheduler, run_budget)
+
+    with pytest.raises(asyncio.CancelledError):
+        await budgeted.run(make_agent(), "solar", output_tokens=100)
+    stats = run_budget.stats()
+    assert stats["reserved_tokens"] == 0
+    assert stats["tokens"] == budget.estimate_call(make_agent(), "solar", 100).tokens
@@ -0,0 +1,35 @@
+import pytest
+
+from deep_research.checkpoints import CheckpointStore, PLAN, REPORT, SEARCH_RESULTS
+
+
+def test_stages_round_trip_across_instances(tmp_path):
+    """
+    Tests that stage outputs saved by one store are loaded by another.
+    """
+    path = str(tmp_path / "checkpoints.sqlite")
+    store = CheckpointStore(path=path)
+    run_id = store.create_run("solar power")
+    store.save(run_id, PLAN, {"searches": [{"query": "solar", "reason": "r"}]})
+    store.save(run_id, SEARCH_RESULTS, ["summary"])
+
+    other = CheckpointStore(path=path)
+    assert other.query(run_id) == "solar power"
+    assert other.load(run_id) == {
+        PLAN: {"searches": [{"query": "solar", "reason": "r"}]},
+        SEARCH_RESULTS: ["summary"],
+    }
+    assert other.last_completed_stage(run_id) == SEARCH_RESULTS
+
+
+def test_unknown_stage_and_run(tmp_path):
+    """
+    Tests that unknown stages are rejected and unknown runs are empty.
+    """
+    store = CheckpointStore(path=str(tmp_path / "checkpoints.sqlite"))
+    with pytest.raises(ValueError):
+        store.save("run", "outline", {})
+    assert store.query("missing") is None
+    assert store.load("missing") == {}
+    assert store.last_completed_stage("missing") is None
+    store.save(store.create_run("q"), REPORT, {})
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from tests.deep_research.app_modules import import_app_module
+
+coalesce = import_app_module("coalesce")
+
+
+class FakeManager:
+    instances = []
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.cancelled = False
+        FakeManager.instances.append(self)
+
+    async def run(self, query):
+        try:
+            yield f"Planning {query}"
+            await self.release.wait()
+            yield "Report"
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+@pytest.fixture(autouse=True)
+def reset_instances():
+    FakeManager.instances = []
+
+
+async def collect(updates):
+    return [update async for update in updates]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_queries_share_one_pipeline():
+    """
+    Tests that callers with the same normalized query attach to one pipeline
+    and all receive the full stream, including updates sent before they joined.
+    """
+    coalescer = coalesce.ResearchCoalescer(FakeManager)
+    first = asyncio.create_task(collect(coalescer.run("Solar Power")))
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(collect(coalescer.run("  solar power ")))
+    await asyncio.sleep(0.01)
+    assert coalescer.in_flight() == {"solar power": 2}
+
+    FakeManager.instances[0].release.set()
+    assert await first == ["Planning Solar Power", "Report"]
+    assert await second == ["Planning Solar Power", "Report"]
+    assert len(FakeManager.instances) == 1
+    assert coalescer.in_flight() == {}
+
+
+@pytest.mark.asyncio
+async def test_fuzzy_matching_is_optional():
+    """
+    Tests that near-identical queries only share a pipeline when fuzzy matching is enabled.
+    """
+    exact = coalesce.ResearchCoalescer(FakeManager)
+    fuzzy = coalesce.ResearchCoalescer(FakeManager, fuzzy_threshold=0.7)
+    tasks = []
+    for coalescer in (exact, fuzzy):
+        tasks.append(asyncio.create_task(collect(coalescer.run("future of solar power"))))
+        tasks.append(asyncio.create_task(collect(coalescer.run("the future of solar power?"))))
+    await asyncio.sleep(0.01)
+    assert len(FakeManager.instances) == 3
+
+    for manager in FakeManager.instances:
+        manager.release.set()
+    await asyncio.gather(*tasks)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_cancelled_only_when_last_subscriber_leaves():
+    """
+    Tests reference counting: one subscriber leaving keeps the pipeline running,
+    and the last one leaving cancels it.
+    """
+    coalescer = coalesce.ResearchCoalescer(FakeManager)
+    first = asyncio.create_task(collect(coalescer.run("wind power")))
+    second = asyncio.create_task(collect(coalescer.run("wind power")))
+    await asyncio.sleep(0.01)
+    manager = FakeManager.instances[0]
+
+    first.cancel()
+    await asyncio.sleep(0.01)
+    assert not manager.cancelled
+    assert coalescer.in_flight() == {"wind power": 1}
+
+    second.cancel()
+    await asyncio.sleep(0.01)
+    assert manager.cancelled
+    assert coalescer.in_flight() == {}
+
+
+@pytest.mark.asyncio
+async def test_pipeline_errors_reach_every_subscriber():
+    """
+    Tests that a failing pipeline raises in every attached caller.
+    """
+    class FailingManager:
+        async def run(self, query):
+            yield "Planning"
+            await asyncio.sleep(0.01)
+            raise RuntimeError("writer down")
+
+    coalescer = coalesce.ResearchCoalescer(FailingManager)
+    results = await asyncio.gather(
+        collect(coalescer.run("hydro")), collect(coalescer.run("hydro")), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
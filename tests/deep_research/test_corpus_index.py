@@ -0,0 +1,99 @@
+import os
+
+from tests.deep_research.app_modules import import_app_module
+
+corpus_index = import_app_module("corpus_index")
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_chunks_overlap_and_cover_the_whole_text():
+    """
+    Tests that chunks have the requested size, share ``overlap`` words with
+    the previous chunk, and that the last chunk ends the text.
+    """
+    text = " ".join(f"w{n}" for n in range(25))
+    chunks = corpus_index.chunk_text(text, words=10, overlap=2)
+    assert [chunk.split()[0] for chunk in chunks] == ["w0", "w8", "w16"]
+    assert all(len(chunk.split()) == 10 for chunk in chunks[:-1])
+    assert chunks[-1].split()[-1] == "w24"
+    assert corpus_index.chunk_text("") == []
+
+
+def test_search_ranks_chunks_by_bm25_with_snippets(tmp_path):
+    """
+    Tests that the chunk with the most, and rarest, query words ranks first,
+    with its document path, chunk number and a snippet around the matches.
+    """
+    index = corpus_index.CorpusIndex(str(tmp_path / "index"), chunk_words=20, chunk_overlap=0)
+    filler = "general remarks about energy markets and the weather " * 4
+    index.add_documents(
+        [
+            ("energy.md", filler + "geothermal drilling costs in Iceland are falling " + filler),
+            ("wind.md", "offshore wind farms need drilling vessels " * 3),
+        ]
+    )
+
+    hits = index.search("geothermal drilling costs")
+    assert (hits[0].path, hits[0].chunk) == ("energy.md", 1)
+    assert "geothermal drilling costs" in hits[0].snippet
+    assert hits[0].score > hits[1].score
+    assert {hit.path for hit in hits} == {"energy.md", "wind.md"}
+    assert index.search("tidal") == []
+    assert corpus_index.local_recall("geothermal drilling costs", hits[:1]) == 1.0
+    assert corpus_index.local_recall("geothermal tidal", hits[:1]) == 0.5
+
+
+def test_update_indexes_only_new_and_changed_files(tmp_path):
+    """
+    Tests that update() adds new files, replaces changed ones, forgets
+    deleted ones, and that the index reopens from disk as it was left.
+    """
+    corpus, directory = tmp_path / "corpus", str(tmp_path / "index")
+    write(corpus / "a.md", "battery recycling recovers lithium")
+    write(corpus / "notes" / "b.txt", "hydrogen electrolysis efficiency")
+    write(corpus / "image.png", "not indexed")
+    index = corpus_index.CorpusIndex(directory)
+    assert index.update(str(corpus))["added"] == 2
+    assert index.update(str(corpus)) == {"added": 0, "removed": 0, "chunks": 0, "merged": 0}
+
+    write(corpus / "a.md", "battery reuse in grid storage")
+    os.utime(corpus / "a.md", (1, 1))
+    (corpus / "notes" / "b.txt").unlink()
+    assert index.update(str(corpus))["removed"] == 1
+    assert index.search("lithium") == []
+    assert index.search("electrolysis") == []
+    index.close()
+
+    reopened = corpus_index.CorpusIndex(directory)
+    assert [hit.path for hit in reopened.search("grid storage")] == ["a.md"]
+    assert reopened.stats()["documents"] == 1
+
+
+def test_merge_drops_dead_chunks_and_old_segments(tmp_path):
+    """
+    Tests that merging rewrites the live chunks into one segment and removes
+    the files of the segments it replaced.
+    """
+    directory = tmp_path / "index"
+    index = corpus_index.CorpusIndex(str(directory), segment_chunks=2)
+    index.add_documents([("one.md", "solar one"), ("two.md", "solar two"), ("three.md", "solar three")])
+    index.add_documents([("four.md", "solar four")])
+    assert index.stats()["segments"] == 3
+
+    index.merge()
+    assert index.stats()["segments"] == 2
+    assert sorted(hit.path for hit in index.search("solar")) == ["four.md", "one.md", "three.md", "two.md"]
+    assert len(list(directory.glob("*.post"))) == 2
+
+
+def test_format_hits_numbers_passages_with_their_source():
+    """
+    Tests the tool output for hits and for no hits.
+    """
+    hit = corpus_index.CorpusHit(path="a.md", chunk=2, score=1.0, text="t", snippet="…solar prices…")
+    assert corpus_index.format_hits([hit]) == "[1] a.md (part 3)\n…solar prices…"
+    assert corpus_index.format_hits([]) == "No matching documents in the local corpus."
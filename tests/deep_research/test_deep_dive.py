@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+from unittest.mock import MagicMock
+
+from tests.deep_research.app_modules import import_app_module
+
+deep_dive = import_app_module("deep_dive")
+research_manager = import_app_module("research_manager")
+planner_agent = import_app_module("planner_agent")
+writer_agent = import_app_module("writer_agent")
+search_cache = import_app_module("search_cache")
+checkpoints = import_app_module("checkpoints")
+hedging = import_app_module("hedging")
+metrics = import_app_module("metrics")
+report_store = import_app_module("report_store")
+
+
+def make_result(final_output, tokens=100):
+    result = MagicMock()
+    result.final_output = final_output
+    result.final_output_as.return_value = final_output
+    result.raw_responses = [MagicMock(usage=MagicMock(input_tokens=tokens // 2, output_tokens=tokens // 2))]
+    return result
+
+
+def scripted_scheduler(plans, follow_ups, summaries=None):
+    """A scheduler answering each agent from scripts keyed by question, recording search terms and writer inputs."""
+    calls = {"search": [], "writer": []}
+    summaries = summaries or {}
+
+    async def run(agent, input, **kwargs):
+        await asyncio.sleep(0.01)
+        if agent.name == "PlannerAgent":
+            question = input.splitlines()[0].removeprefix("Query: ")
+            return make_result(planner_agent.WebSearchPlan(
+                searches=[planner_agent.WebSearchItem(reason="r", query=q) for q in plans[question]]
+            ))
+        if agent.name == "WriterAgent":
+            calls["writer"].append(input)
+            question = input.splitlines()[0].removeprefix("Original query: ")
+            return make_result(writer_agent.ReportData(
+                short_summary="Summary.",
+                markdown_report=f"# Report on {question}",
+                follow_up_questions=follow_ups.get(question, []),
+            ))
+        term = input.splitlines()[0].removeprefix("Search term: ")
+        calls["search"].append(term)
+        return make_result(summaries.get(term, f"Findings about {term} from several independent sources."))
+
+    scheduler = MagicMock()
+    scheduler.run = run
+    return scheduler, calls
+
+
+def make_dive(tmp_path, scheduler, **kwargs):
+    manager = research_manager.ResearchManager(
+        scheduler=scheduler,
+        search_cache=search_cache.SearchCache(path=None),
+        checkpoints=checkpoints.CheckpointStore(path=str(tmp_path / "checkpoints.sqlite")),
+        search_latencies=hedging.LatencyTracker(),
+        metrics=metrics.MetricsRegistry(),
+        report_store=report_store.ReportStore(path=":memory:"),
+        email_mode="none",
+    )
+    return deep_dive.DeepDive(manager, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_tree_shares_searches_and_consolidates(tmp_path):
+    """
+    Tests that follow-up questions become branches down to the configured
+    depth, overlapping search terms across branches are searched once, and
+    one consolidated report covers every branch.
+    """
+    scheduler, calls = scripted_scheduler(
+        plans={
+            "solar power": ["solar panel costs", "solar subsidy policy"],
+            "Who installs rooftop panels?": ["Solar panel  COSTS", "rooftop installers"],
+            "Is storage needed?": ["home battery storage"],
+        },
+        follow_ups={"solar power": ["Who installs rooftop panels?", "Is storage needed?", "A third question?"]},
+    )
+    dive = make_dive(tmp_path, scheduler, breadth=2, depth=1)
+
+    chunks = [chunk async for chunk in dive.run("solar power")]
+
+    assert [branch.question for branch in dive.branches][0] == "solar power"
+    assert {branch.question for branch in dive.branches[1:]} == {"Who installs rooftop panels?", "Is storage needed?"}
+    assert sorted(calls["search"]) == [
+        "home battery storage", "rooftop installers", "solar panel costs", "solar subsidy policy",
+    ]
+    # Only the root writes for follow-ups; leaves go straight into the consolidated report.
+    assert len(calls["writer"]) == 2
+    consolidated = calls["writer"][-1]
+    assert "Follow-up questions researched:\n- " in consolidated
+    assert "[S4]" in consolidated
+    assert chunks[-1] == "# Report on solar power"
+    assert dive.manager.metrics.counter("deep_dive_shared_searches_total") == 1
+
+
+@pytest.mark.asyncio
+async def test_most_novel_question_is_explored_first(tmp_path):
+    """
+    Tests that with one branch at a time the follow-up question least covered
+    by what was already found is explored before a near-repeat.
+    """
+    scheduler, _ = scripted_scheduler(
+        plans={"wind": ["offshore wind turbines"], "Offshore wind turbines growth?": ["turbine growth"],
+               "Grid interconnector financing?": ["interconnector financing"]},
+        follow_ups={"wind": ["Offshore wind turbines growth?", "Grid interconnector financing?"]},
+        summaries={"offshore wind turbines": "Offshore wind turbines growth was strong in the North Sea."},
+    )
+    dive = make_dive(tmp_path, scheduler, breadth=2, depth=1, concurrency=1)
+
+    [chunk async for chunk in dive.run("wind")]
+
+    assert [branch.question for branch in dive.branches] == [
+        "wind", "Grid interconnector financing?", "Offshore wind turbines growth?",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_token_budget_stops_expansion_but_still_reports(tmp_path):
+    """
+    Tests that branches stop starting once the token budget cannot cover
+    another one plus the consolidated report, and the report is still written.
+    """
+    scheduler, calls = scripted_scheduler(
+        plans={"solar power": ["solar panel costs"], "Next?": ["next topic"]},
+        follow_ups={"solar power": ["Next?"]},
+    )
+    dive = make_dive(tmp_path, scheduler, depth=2)
+    # The root costs 300 tokens; another branch and the report's reserve would not fit.
+    dive.token_budget = 300 + 300 + dive.manager.evidence_token_budget + deep_dive.CONSOLIDATION_OUTPUT_TOKENS - 1
+
+    chunks = [chunk async for chunk in dive.run("solar power")]
+
+    assert [branch.question for branch in dive.branches] == ["solar power"]
+    assert "Budget spent, skipping 1 follow-up questions" in chunks
+    assert calls["search"] == ["solar panel costs"]
+    assert chunks[-1] == "# Report on solar power"
+
+
+@pytest.mark.asyncio
+async def test_token_meter_counts_streamed_calls():
+    """
+    Tests that a streamed call made through the meter is counted from its
+    completed result, and that every event is passed through.
+    """
+    async def run_streamed(agent, input, **kwargs):
+        yield "event"
+        yield make_result("report", tokens=300)
+
+    scheduler = MagicMock()
+    scheduler.run_streamed = run_streamed
+    meter = deep_dive.TokenMeter(scheduler)
+
+    events = [event async for event in meter.run_streamed(MagicMock(), "input")]
+    assert events[0] == "event"
+    assert meter.tokens == 300
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from unittest.mock import MagicMock
+
+from deep_research.email_outbox import EmailOutbox
+
+
+@pytest.mark.asyncio
+async def test_enqueue_and_flush_sends_email(tmp_path):
+    """
+    Tests that queued emails are delivered by the worker and marked sent.
+    """
+    sender = MagicMock(return_value={"message_id": "1"})
+    outbox = EmailOutbox(path=str(tmp_path / "outbox.sqlite"), sender=sender)
+
+    outbox.enqueue("Subject", "<p>html</p>", "text")
+    assert outbox.stats()["pending"] == 1
+
+    await outbox.ensure_worker()
+
+    sender.assert_called_once_with("Subject", "<p>html</p>", "text")
+    assert outbox.stats()["sent"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failures_are_retried_then_dead_lettered(tmp_path):
+    """
+    Tests that error responses and exceptions are retried with backoff and
+    the email is dead-lettered after max_attempts.
+    """
+    sender = MagicMock(side_effect=[{"error": "bad gateway"}, RuntimeError("timeout"), {"error": "still down"}])
+    outbox = EmailOutbox(path=str(tmp_path / "outbox.sqlite"), sender=sender, max_attempts=3, base_delay=0.0)
+
+    outbox.enqueue("Subject", "<p>html</p>", "text")
+    await outbox.flush(wait_for_retries=True)
+
+    assert sender.call_count == 3
+    assert outbox.stats()["dead"] == 1
+    dead = outbox.dead_letters()
+    assert dead[0]["attempts"] == 3
+    assert dead[0]["last_error"] == "still down"
+
+
+@pytest.mark.asyncio
+async def test_retry_succeeds_after_transient_failure(tmp_path):
+    """
+    Tests that a transient failure is retried and then delivered.
+    """
+    sender = MagicMock(side_effect=[RuntimeError("timeout"), {"message_id": "1"}])
+    outbox = EmailOutbox(path=str(tmp_path / "outbox.sqlite"), sender=sender, base_delay=0.0)
+
+    outbox.enqueue("Subject", "<p>html</p>", "text")
+    await outbox.flush(wait_for_retries=True)
+
+    assert outbox.stats()["sent"] == 1
+
+
+def test_claims_are_exclusive_across_outbox_instances(tmp_path):
+    """
+    Tests that two processes sharing an outbox file never claim the same
+    email, and that opening the file does not requeue in-flight sends.
+    """
+    path = str(tmp_path / "outbox.sqlite")
+    first = EmailOutbox(path=path)
+    first.enqueue("Subject", "<p>html</p>", "text")
+    assert len(first._claim_due(limit=10)) == 1
+
+    second = EmailOutbox(path=path)
+    assert second.stats()["sending"] == 1
+    assert second._claim_due(limit=10) == []
+
+
+def test_expired_leases_are_reclaimed(tmp_path):
+    """
+    Tests that an email stranded mid-send is claimed again once its lease
+    expires, and the stale claim can no longer settle it.
+    """
+    path = str(tmp_path / "outbox.sqlite")
+    crashed = EmailOutbox(path=path, lease_seconds=-1)
+    crashed.enqueue("Subject", "<p>html</p>", "text")
+    stale_claim = crashed._claim_due(limit=10)[0]
+
+    recovered = EmailOutbox(path=path)
+    rows = recovered._claim_due(limit=10)
+    assert [row[0] for row in rows] == [stale_claim[0]]
+
+    crashed._record(stale_claim[0], stale_claim[5], 1, None)
+    assert recovered.stats()["sending"] == 1
+    recovered._record(rows[0][0], rows[0][5], 1, None)
+    assert recovered.stats()["sent"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ensure_worker_wakes_worker_waiting_on_retry(tmp_path):
+    """
+    Tests that an email queued while the worker waits out a long retry
+    backoff is sent at once instead of after the backoff.
+    """
+    sender = MagicMock(side_effect=lambda subject, html, text: {"error": "down"} if subject == "First" else {})
+    outbox = EmailOutbox(path=str(tmp_path / "outbox.sqlite"), sender=sender, base_delay=600.0)
+
+    outbox.enqueue("First", "<p>html</p>", "text")
+    worker = outbox.ensure_worker()
+    for _ in range(100):
+        if sender.call_count:
+            break
+        await asyncio.sleep(0.01)
+
+    outbox.enqueue("Second", "<p>html</p>", "text")
+    assert outbox.ensure_worker() is worker
+    for _ in range(100):
+        if outbox.stats()["sent"]:
+            break
+        await asyncio.sleep(0.01)
+
+    assert outbox.stats() == {"pending": 1, "sending": 0, "sent": 1, "dead": 0}
+    worker.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await worker
+    outbox.close()
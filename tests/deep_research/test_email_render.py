@@ -0,0 +1,101 @@
+from deep_research.email_render import (
+    email_subject,
+    markdown_to_html,
+    markdown_to_text,
+    render_report_email,
+)
+
+
+def test_markdown_to_html_block_elements():
+    """
+    Tests headings, paragraphs, lists, quotes, code blocks and tables.
+    """
+    markdown = (
+        "# Report\n\n"
+        "First line\ncontinues here.\n\n"
+        "- one\n- two\n\n"
+        "1. first\n2. second\n\n"
+        "> quoted\n\n"
+        "```\nx < 1\n```\n\n"
+        "| A | B |\n|---|---|\n| 1 | 2 |\n\n"
+        "---"
+    )
+    html = markdown_to_html(markdown)
+
+    assert '<h1 style="' in html and ">Report</h1>" in html
+    assert ">First line continues here.</p>" in html
+    assert html.count("<li ") == 4
+    assert "<ul " in html and "<ol " in html
+    assert ">quoted</blockquote>" in html
+    assert "x &lt; 1" in html
+    assert ">A</th>" in html and ">2</td>" in html
+    assert "<hr " in html
+
+
+def test_adjacent_lists_of_different_types_are_separate():
+    """
+    Tests that a numbered list right after a bulleted one starts a new list.
+    """
+    html = markdown_to_html("- one\n- two\n1. first\n2. second")
+    assert html.count("<ul ") == 1 and html.count("<ol ") == 1
+    assert html.index("</ul>") < html.index("<ol ")
+    assert html.count("<li ") == 4
+
+
+def test_markdown_to_html_inline_elements_are_escaped():
+    """
+    Tests inline formatting and that raw HTML in the report is escaped.
+    """
+    html = markdown_to_html("**bold** and *italic* with `a<b>` and [link](https://example.com) <script>")
+
+    assert "<strong>bold</strong>" in html
+    assert "<em>italic</em>" in html
+    assert "a&lt;b&gt;</code>" in html
+    assert 'href="https://example.com"' in html
+    assert "<script>" not in html
+
+
+def test_markdown_to_text():
+    """
+    Tests that the plain-text alternative drops markdown markup.
+    """
+    text = markdown_to_text("## Findings\n**Solar** is [cheap](https://example.com).")
+    assert text == "FINDINGS\nSolar is cheap (https://example.com).\n"
+
+
+def test_email_subject_uses_first_sentence():
+    """
+    Tests that the subject is the first summary sentence, trimmed to length.
+    """
+    assert email_subject("Solar is growing fast. Wind too.") == "Solar is growing fast"
+    assert email_subject("") == "Research report"
+    assert email_subject("The **EU** leads, per [IEA](https://iea.org) and `data`. More.") == "The EU leads, per IEA and data"
+    long_subject = email_subject("word " * 40)
+    assert len(long_subject) <= 90 and long_subject.endswith("…")
+
+
+def test_render_report_email():
+    """
+    Tests that the rendered email contains the summary and report.
+    """
+    email = render_report_email("Short summary.", "# Title\n\nBody")
+    assert email.subject == "Short summary"
+    assert "Short summary." in email.html_content
+    assert ">Title</h1>" in email.html_content
+    assert email.text_content.startswith("Short summary.\n\nTITLE")
+
+
+def test_link_urls_are_escaped_once_and_schemes_are_checked():
+    """
+    Tests that query strings and parentheses survive in hrefs and that
+    unsafe schemes are rendered as plain text.
+    """
+    html = markdown_to_html(
+        "[report](https://a.com/?q=1&r=2) and [wiki](https://en.wikipedia.org/wiki/Solar_(disambiguation)) "
+        "and [bad](javascript:alert(1))"
+    )
+
+    assert 'href="https://a.com/?q=1&amp;r=2"' in html
+    assert 'href="https://en.wikipedia.org/wiki/Solar_(disambiguation)"' in html
+    assert "javascript" not in html
+    assert "bad" in html
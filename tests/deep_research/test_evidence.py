@@ -0,0 +1,55 @@
+from tests.deep_research.app_modules import import_app_module
+
+evidence = import_app_module("evidence")
+
+
+def test_split_sentences_handles_bullets_and_fragments():
+    """
+    Tests that bullets and sentence breaks split claims and short fragments are dropped.
+    """
+    summary = (
+        "Key points:\n"
+        "- Solar capacity in Germany doubled since 2019. Costs fell by half over the decade.\n"
+        "2. Wind output reached record highs in 2024.\n"
+        "Ok."
+    )
+    assert evidence.split_sentences(summary) == [
+        "Solar capacity in Germany doubled since 2019.",
+        "Costs fell by half over the decade.",
+        "Wind output reached record highs in 2024.",
+    ]
+
+
+def test_duplicate_claims_are_merged_with_every_source():
+    """
+    Tests that a claim repeated across summaries appears once, tagged with both sources,
+    while claims about different years stay separate.
+    """
+    results = [
+        {"query": "solar Germany", "summary": "Solar capacity in Germany doubled since 2019. Rooftop systems led growth."},
+        {"query": "German solar growth", "summary": "Germany's solar capacity doubled since 2019. Imports fell in 2023."},
+        {"query": "solar imports", "summary": "Imports fell in 2024."},
+    ]
+    pack = evidence.build_evidence_pack("solar power in Germany", results)
+
+    assert pack.count("capacity") == 1
+    assert "- [S1, S2] Solar capacity in Germany doubled since 2019." in pack
+    assert "- [S2] Imports fell in 2023." in pack
+    assert "- [S3] Imports fell in 2024." in pack
+    assert "[S1] solar Germany" in pack
+
+
+def test_pack_respects_token_budget_and_prefers_relevant_claims():
+    """
+    Tests that the pack stays within its token budget and keeps the claims
+    closest to the query when it cannot fit everything.
+    """
+    filler = " ".join(f"Unrelated filler sentence number {i} about gardening tips." for i in range(200))
+    results = [
+        {"query": "battery storage", "summary": "Battery storage costs dropped sharply in Europe. " + filler},
+    ]
+    pack = evidence.build_evidence_pack("battery storage costs in Europe", results, token_budget=200)
+
+    assert evidence.estimate_tokens(pack) <= 200
+    assert "Battery storage costs dropped sharply in Europe." in pack
+    assert pack.count("filler") < 200
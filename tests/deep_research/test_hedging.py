@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from tests.deep_research.app_modules import import_app_module
+
+hedging = import_app_module("hedging")
+
+
+async def hedged_call(call, **kwargs):
+    return await asyncio.wait_for(hedging.hedged(call, **kwargs), timeout=5)
+
+
+def test_latency_tracker_needs_history():
+    """
+    Tests that no hedging delay is suggested until enough latencies are recorded.
+    """
+    tracker = hedging.LatencyTracker(window=10, min_samples=3)
+    tracker.record(1.0)
+    tracker.record(2.0)
+    assert tracker.percentile(0.95) is None
+    tracker.record(3.0)
+    assert tracker.percentile(0.95) == 3.0
+    assert tracker.percentile(0.5) == 2.0
+
+
+@pytest.mark.asyncio
+async def test_hedged_returns_faster_duplicate_and_cancels_original():
+    """
+    Tests that a slow first attempt is hedged, the duplicate's result wins and
+    the original attempt is cancelled.
+    """
+    attempts = []
+    cancelled = []
+    hedges = []
+
+    async def call():
+        attempt = len(attempts)
+        attempts.append(attempt)
+        try:
+            await asyncio.sleep(10 if attempt == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(attempt)
+            raise
+        return f"attempt {attempt}"
+
+    result = await hedged_call(call, hedge_after=0.02, on_hedge=lambda: hedges.append(True))
+    assert result == "attempt 1"
+    assert hedges == [True]
+    assert cancelled == [0]
+
+
+@pytest.mark.asyncio
+async def test_hedged_does_not_hedge_fast_calls():
+    """
+    Tests that a call finishing before the hedging delay runs only once.
+    """
+    calls = []
+
+    async def call():
+        calls.append(True)
+        return "done"
+
+    assert await hedged_call(call, hedge_after=1.0) == "done"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_timeout_and_errors():
+    """
+    Tests that the deadline raises TimeoutError and that errors surface once no attempt is left.
+    """
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def broken():
+        raise ValueError("boom")
+
+    with pytest.raises(TimeoutError):
+        await hedged_call(slow, timeout=0.02)
+    with pytest.raises(ValueError):
+        await hedged_call(broken, hedge_after=1.0)
+
+
+@pytest.mark.asyncio
+async def test_hedged_clocks_start_at_dispatch():
+    """
+    Tests that neither the deadline nor the hedge delay runs while the call
+    waits to be dispatched.
+    """
+    dispatched = asyncio.Event()
+    calls = []
+
+    async def call():
+        calls.append(True)
+        await asyncio.sleep(0.1)
+        dispatched.set()
+        await asyncio.sleep(0.01)
+        return "done"
+
+    assert await hedged_call(call, hedge_after=0.05, timeout=0.05, dispatched=dispatched) == "done"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_gather_quorum_and_budget():
+    """
+    Tests that collection stops at the quorum or the time budget and late tasks are cancelled.
+    """
+    async def result(value, delay):
+        await asyncio.sleep(delay)
+        return value
+
+    results, cancelled = await hedging.gather_quorum(
+        [result("a", 0.01), result(None, 0.01), result("b", 0.02), result("c", 10)], quorum=2
+    )
+    assert results == ["a", "b"]
+    assert cancelled == 1
+
+    results, cancelled = await hedging.gather_quorum([result("a", 0.01), result("b", 10)], budget=0.05)
+    assert results == ["a"]
+    assert cancelled == 1
+
+    results, cancelled = await hedging.gather_quorum([result("a", 0.01), result("b", 0.02)])
+    assert results == ["a", "b"]
+    assert cancelled == 0
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import urllib.request
+
+import pytest
+
+from deep_research.metrics import Histogram, MetricsRegistry, quantile, start_metrics_server
+
+
+def test_quantile_nearest_rank():
+    """
+    Tests nearest-rank quantiles, including the empty case.
+    """
+    samples = [float(i) for i in range(1, 101)]
+    assert quantile(samples, 0.5) == 50.0
+    assert quantile(samples, 0.95) == 95.0
+    assert quantile(samples, 0.99) == 99.0
+    assert quantile([], 0.5) == 0.0
+
+
+def test_histogram_keeps_recent_window():
+    """
+    Tests that the histogram counts every observation but only keeps a bounded window of samples.
+    """
+    histogram = Histogram(reservoir_size=3)
+    for value in (1, 2, 3, 4):
+        histogram.observe(value)
+    assert histogram.count == 4
+    assert histogram.total == 10
+    assert list(histogram.samples) == [2, 3, 4]
+
+
+def test_span_records_duration_and_errors():
+    """
+    Tests that a span always records its duration and counts failures by exception type.
+    """
+    registry = MetricsRegistry(jsonl_path=None)
+    with registry.span("plan"):
+        pass
+    with pytest.raises(RuntimeError):
+        with registry.span("plan"):
+            raise RuntimeError("boom")
+
+    assert registry.histogram("stage_duration_seconds", stage="plan").count == 2
+    assert registry.counter("stage_errors_total", stage="plan", error="RuntimeError") == 1
+
+
+def test_span_does_not_count_cancellation_as_error():
+    """
+    Tests that a cancelled stage records its duration but no error.
+    """
+    registry = MetricsRegistry(jsonl_path=None)
+    with pytest.raises(asyncio.CancelledError):
+        with registry.span("search"):
+            raise asyncio.CancelledError()
+
+    assert registry.histogram("stage_duration_seconds", stage="search").count == 1
+    assert registry.counter("stage_errors_total", stage="search", error="CancelledError") == 0
+
+
+def test_prometheus_rendering():
+    """
+    Tests counters, gauges and histogram summaries in the Prometheus text format.
+    """
+    registry = MetricsRegistry(jsonl_path=None)
+    registry.inc("agent_calls_total", agent="Planner")
+    registry.inc("agent_calls_total", agent="Planner")
+    registry.set_gauge("search_cache_hit_rate", 0.5)
+    registry.observe("agent_latency_seconds", 2.0, agent='Say "hi"')
+
+    text = registry.render_prometheus()
+    assert "# TYPE agent_calls_total counter" in text
+    assert 'agent_calls_total{agent="Planner"} 2' in text
+    assert "search_cache_hit_rate 0.5" in text
+    assert 'agent_latency_seconds{agent="Say \\"hi\\"",quantile="0.95"} 2' in text
+    assert 'agent_latency_seconds_count{agent="Say \\"hi\\""} 1' in text
+
+
+def test_jsonl_export(tmp_path):
+    """
+    Tests that every observation is appended to the JSON lines file.
+    """
+    path = tmp_path / "metrics" / "events.jsonl"
+    registry = MetricsRegistry(jsonl_path=str(path))
+    registry.inc("search_cache_hits_total")
+    registry.observe("stage_duration_seconds", 0.25, stage="search")
+    registry.flush()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["name"] for record in records] == ["search_cache_hits_total", "stage_duration_seconds"]
+    assert records[1]["labels"] == {"stage": "search"}
+    assert records[1]["value"] == 0.25
+
+
+def test_metrics_server():
+    """
+    Tests that the HTTP endpoint serves the registry in both formats.
+    """
+    registry = MetricsRegistry(jsonl_path=None)
+    registry.inc("agent_calls_total", agent="Writer")
+    server = start_metrics_server(0, registry)
+    assert server.server_address[0] == "127.0.0.1"
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{base}/metrics") as response:
+            assert 'agent_calls_total{agent="Writer"} 1' in response.read().decode()
+        with urllib.request.urlopen(f"{base}/metrics.json") as response:
+            assert json.loads(response.read())["counters"]["agent_calls_total"][0]["value"] == 1
+    finally:
+        server.shutdown()
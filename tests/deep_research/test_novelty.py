@@ -0,0 +1,34 @@
+from tests.deep_research.app_modules import import_app_module
+
+novelty = import_app_module("novelty")
+
+
+def test_novelty_of_repeated_and_new_summaries():
+    """
+    Tests that a repeated summary adds nothing and an unrelated one is fully novel.
+    """
+    tracker = novelty.NoveltyTracker()
+    assert tracker.add("Solar capacity in Europe doubled since 2019") == 1.0
+    assert tracker.add("Solar capacity in Europe doubled since 2019") == 0.0
+    assert tracker.add("Offshore wind auctions were undersubscribed this year") == 1.0
+
+
+def test_partial_overlap_and_empty_summaries():
+    """
+    Tests that partial overlap yields a fraction and empty summaries add nothing.
+    """
+    tracker = novelty.NoveltyTracker()
+    tracker.add("grid storage costs fell sharply")
+    assert 0.0 < tracker.add("grid storage costs rose in Spain") < 1.0
+    assert tracker.add("") == 0.0
+
+
+def test_novelty_peek_does_not_record():
+    """
+    Tests that novelty() scores text without adding it to what was seen.
+    """
+    tracker = novelty.NoveltyTracker()
+    tracker.add("grid storage costs fell sharply")
+    assert tracker.novelty("grid storage costs fell sharply") == 0.0
+    assert tracker.novelty("hydrogen electrolyser orders") == 1.0
+    assert tracker.add("hydrogen electrolyser orders") == 1.0
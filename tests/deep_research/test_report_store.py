@@ -0,0 +1,108 @@
+from unittest.mock import patch
+
+from tests.deep_research.app_modules import import_app_module
+
+report_store = import_app_module("report_store")
+writer_agent = import_app_module("writer_agent")
+
+
+def make_report(summary="summary"):
+    return writer_agent.ReportData(
+        short_summary=summary, markdown_report=f"# {summary}", follow_up_questions=["next?"]
+    )
+
+
+def test_save_and_lookup_round_trip(tmp_path):
+    """
+    Tests that a saved report is found again, by a second store on the same
+    file, with its search results and a full score for the same query.
+    """
+    path = str(tmp_path / "reports.sqlite")
+    store = report_store.ReportStore(path=path)
+    results = [{"query": "solar panel prices", "summary": "falling"}]
+    store.save("Solar panel prices in Europe", make_report("Prices fell"), results)
+
+    match = report_store.ReportStore(path=path).lookup("solar  panel prices in europe")
+    assert match.query == "Solar panel prices in Europe"
+    assert match.score == 1.0
+    assert match.search_results == results
+    assert match.report_data() == make_report("Prices fell").model_dump()
+
+
+def test_lookup_ranks_the_most_similar_query_first():
+    """
+    Tests that matches are ranked by query similarity, that reports sharing
+    all but one word are found when none share every word, and that
+    unrelated reports are not returned.
+    """
+    store = report_store.ReportStore(path=":memory:")
+    store.save("history of wind turbines", make_report(), [])
+    store.save("solar panel prices outlook europe", make_report(), [])
+    store.save("solar panel prices europe", make_report(), [])
+
+    matches = store.search("solar panel prices in europe")
+    assert [m.query for m in matches] == ["solar panel prices europe", "solar panel prices outlook europe"]
+    assert matches[0].score > matches[1].score
+    assert [m.query for m in store.search("cheap solar panel prices in europe")][0] == "solar panel prices europe"
+    assert store.lookup("deep sea mining") is None
+
+
+def test_reports_older_than_max_age_are_skipped():
+    """
+    Tests that only reports within ``max_age`` seconds are returned.
+    """
+    store = report_store.ReportStore(path=":memory:")
+    with patch.object(report_store.time, "time", return_value=1000.0):
+        store.save("battery recycling", make_report(), [])
+    with patch.object(report_store.time, "time", return_value=1000.0 + 3600):
+        assert store.lookup("battery recycling", max_age=7200) is not None
+        assert store.lookup("battery recycling", max_age=60) is None
+        assert store.lookup("battery recycling", max_age=None) is not None
+
+
+def test_embeddings_match_reports_by_meaning():
+    """
+    Tests that with an embed function, a report with few words in common is
+    scored by the cosine similarity of the embeddings.
+    """
+    vectors = {"ev battery recycling": [1.0, 0.0], "ev battery reuse\nsummary": [0.9, 0.1]}
+    store = report_store.ReportStore(path=":memory:", embed=lambda text: vectors.get(text, [0.0, 1.0]))
+    store.save("ev battery reuse", make_report(), [])
+
+    match = store.lookup("ev battery recycling")
+    assert match.score > 0.99
+
+
+def test_query_text_is_never_fts_syntax():
+    """
+    Tests that quotes, operators and parentheses in the query are matched as text.
+    """
+    store = report_store.ReportStore(path=":memory:")
+    store.save('what is "NEAR" AND (OR) pricing', make_report(), [])
+    assert store.lookup('"NEAR" AND (OR) pricing*') is not None
+    assert store.lookup('")(*') is None
+
+
+def test_describe_age():
+    """
+    Tests that ages are described in their largest whole unit.
+    """
+    assert report_store.describe_age(30) == "just now"
+    assert report_store.describe_age(60) == "1 minute ago"
+    assert report_store.describe_age(3 * 86400 + 5) == "3 days ago"
+
+
+def test_stale_matches_do_not_crowd_out_a_fresh_one():
+    """
+    Tests that the age cutoff is applied before the candidate limit, so more
+    stale matches than candidates cannot hide a fresh, lower-ranked one.
+    """
+    store = report_store.ReportStore(path=":memory:")
+    with patch.object(report_store.time, "time", return_value=1000.0):
+        for _ in range(store.candidates + 5):
+            store.save("battery recycling", make_report(), [])
+    with patch.object(report_store.time, "time", return_value=1000.0 + 3600):
+        store.save("battery recycling plants across europe", make_report("fresh"), [])
+        matches = store.search("battery recycling", max_age=60)
+
+    assert [m.query for m in matches] == ["battery recycling plants across europe"]
@@ -0,0 +1,51 @@
+import json
+
+from deep_research.report_stream import JsonStringFieldParser
+from deep_research.writer_agent import ReportData
+
+
+def feed_in_chunks(parser, text, size):
+    emitted = []
+    for start in range(0, len(text), size):
+        emitted.append(parser.feed(text[start:start + size]))
+    return "".join(emitted)
+
+
+def test_extracts_markdown_report_across_chunk_boundaries():
+    """
+    Tests that the field value is decoded identically for any chunking,
+    including escapes and surrogate pairs split between chunks.
+    """
+    report = ReportData(
+        short_summary='A "quoted" summary mentioning markdown_report.',
+        markdown_report='# Title\n\nLine with "quotes", a \\ backslash, tabs\tand emoji 🌍 é.',
+        follow_up_questions=["markdown_report?", "Next"],
+    )
+    payload = json.dumps(report.model_dump())
+
+    for size in (1, 2, 3, 7, len(payload)):
+        parser = JsonStringFieldParser("markdown_report")
+        assert feed_in_chunks(parser, payload, size) == report.markdown_report
+        assert parser.value == report.markdown_report
+        assert parser.complete
+
+
+def test_ignores_nested_fields_with_the_same_name():
+    """
+    Tests that only the top-level field is captured.
+    """
+    parser = JsonStringFieldParser("markdown_report")
+    parser.feed('{"nested": {"markdown_report": "no"}, "items": ["markdown_report"], ')
+    assert parser.value == ""
+    parser.feed('"markdown_report": "yes"}')
+    assert parser.value == "yes"
+
+
+def test_partial_value_is_available_before_completion():
+    """
+    Tests that text is emitted before the closing quote arrives.
+    """
+    parser = JsonStringFieldParser("markdown_report")
+    assert parser.feed('{"short_summary": "s", "markdown_report": "# Head') == "# Head"
+    assert not parser.complete
+    assert parser.feed('ing\\nBody') == "ing\nBody"
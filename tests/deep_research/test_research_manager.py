@@ -0,0 +1,599 @@
+import asyncio
+
+import agents
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from tests.deep_research.app_modules import import_app_module
+
+research_manager = import_app_module("research_manager")
+planner_agent = import_app_module("planner_agent")
+search_cache = import_app_module("search_cache")
+email_outbox = import_app_module("email_outbox")
+checkpoints = import_app_module("checkpoints")
+hedging = import_app_module("hedging")
+writer_agent = import_app_module("writer_agent")
+report_store = import_app_module("report_store")
+budget = import_app_module("budget")
+metrics = import_app_module("metrics")
+outline_agent = import_app_module("outline_agent")
+corpus_index = import_app_module("corpus_index")
+scheduler_module = import_app_module("scheduler")
+
+
+def make_result(final_output):
+    result = MagicMock()
+    result.final_output = final_output
+    result.final_output_as.return_value = final_output
+    return result
+
+
+def make_manager(tmp_path, **kwargs):
+    scheduler = kwargs.pop("scheduler", None)
+    if scheduler is None:
+        scheduler = MagicMock()
+        scheduler.run = AsyncMock()
+    kwargs.setdefault("search_cache", search_cache.SearchCache(path=None))
+    kwargs.setdefault("email_outbox", email_outbox.EmailOutbox(path=str(tmp_path / "outbox.sqlite"), sender=MagicMock()))
+    kwargs.setdefault("checkpoints", checkpoints.CheckpointStore(path=str(tmp_path / "checkpoints.sqlite")))
+    kwargs.setdefault("search_latencies", hedging.LatencyTracker())
+    kwargs.setdefault("report_store", report_store.ReportStore(path=":memory:"))
+    return research_manager.ResearchManager(scheduler=scheduler, **kwargs), scheduler
+
+
+@pytest.mark.asyncio
+async def test_search_cache_hit_skips_the_scheduler(tmp_path):
+    """
+    Tests that a cached summary is returned without running the search agent.
+    """
+    manager, scheduler = make_manager(tmp_path)
+    manager.search_cache.set("Solar Power", "cached summary")
+
+    item = planner_agent.WebSearchItem(reason="r", query="solar  power")
+    assert await manager.search(item) == "cached summary"
+    scheduler.run.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_search_stores_successful_results(tmp_path):
+    """
+    Tests that a fresh search result is cached for the next lookup.
+    """
+    manager, scheduler = make_manager(tmp_path)
+    scheduler.run.return_value = make_result("fresh summary")
+    item = planner_agent.WebSearchItem(reason="r", query="wind power")
+
+    assert await manager.search(item) == "fresh summary"
+    assert await manager.search(item) == "fresh summary"
+    assert scheduler.run.await_count == 1
+    assert manager.search_cache.get("wind power") == "fresh summary"
+
+
+@pytest.mark.asyncio
+async def test_search_failures_are_not_cached(tmp_path):
+    """
+    Tests that a failed search returns None and is retried next time.
+    """
+    manager, scheduler = make_manager(tmp_path)
+    scheduler.run.side_effect = [RuntimeError("boom"), make_result("second try")]
+    item = planner_agent.WebSearchItem(reason="r", query="hydro power")
+
+    assert await manager.search(item) is None
+    assert manager.search_cache.get("hydro power") is None
+    assert await manager.search(item) == "second try"
+
+
+@pytest.mark.asyncio
+async def test_perform_searches_stops_at_quorum(tmp_path):
+    """
+    Tests that searches return once the quorum is met and the slow search is cancelled.
+    """
+    manager, scheduler = make_manager(tmp_path, search_quorum=2)
+    slow_cancelled = asyncio.Event()
+
+    async def run(agent, input, **kwargs):
+        if "slow" in input:
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                slow_cancelled.set()
+                raise
+        return make_result(f"summary of {input.splitlines()[0].removeprefix('Search term: ')}")
+
+    scheduler.run.side_effect = run
+    plan = planner_agent.WebSearchPlan(searches=[
+        planner_agent.WebSearchItem(reason="r", query=query) for query in ("fast one", "slow one", "fast two")
+    ])
+
+    results = await asyncio.wait_for(manager.perform_searches(plan), timeout=5)
+    assert sorted(results, key=lambda result: result["query"]) == [
+        {"query": "fast one", "summary": "summary of fast one"},
+        {"query": "fast two", "summary": "summary of fast two"},
+    ]
+    assert slow_cancelled.is_set()
+    assert manager.search_cache.get("slow one") is None
+
+
+@pytest.mark.asyncio
+async def test_search_timeout_returns_none(tmp_path):
+    """
+    Tests that a search past its deadline is abandoned rather than holding up the run.
+    """
+    manager, scheduler = make_manager(tmp_path, search_timeout=0.05)
+
+    async def run(agent, input, on_dispatch, **kwargs):
+        on_dispatch()
+        await asyncio.sleep(60)
+
+    scheduler.run.side_effect = run
+    item = planner_agent.WebSearchItem(reason="r", query="stuck search")
+    assert await asyncio.wait_for(manager.search(item), timeout=5) is None
+
+
+@pytest.mark.asyncio
+async def test_search_deadline_starts_when_the_scheduler_dispatches(tmp_path):
+    """
+    Tests that time queued behind a saturated scheduler does not count
+    toward the search deadline or the recorded search latency.
+    """
+    saturated = scheduler_module.AgentScheduler(
+        max_concurrency=1, requests_per_minute=10_000, tokens_per_minute=10_000_000
+    )
+    manager, _ = make_manager(tmp_path, scheduler=saturated, search_timeout=0.1, search_backend="web")
+    release = asyncio.Event()
+
+    async def hold():
+        async with saturated.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    item = planner_agent.WebSearchItem(reason="r", query="queued search")
+    with patch("agents.Runner.run", new_callable=AsyncMock, return_value=make_result("queued summary")):
+        search = asyncio.create_task(manager.search(item))
+        await asyncio.sleep(0.3)
+        assert not search.done()
+        release.set()
+        assert await asyncio.wait_for(search, timeout=5) == "queued summary"
+    await holder
+
+    assert list(manager.search_latencies.samples)[0] < 0.1
+
+
+def plan_of(*queries):
+    return planner_agent.WebSearchPlan(searches=[planner_agent.WebSearchItem(reason="r", query=q) for q in queries])
+
+
+@pytest.mark.asyncio
+async def test_iterative_search_stops_when_novelty_drops(tmp_path):
+    """
+    Tests that a round of summaries repeating what is known ends the search early.
+    """
+    manager, scheduler = make_manager(tmp_path, iterative_search=True, max_searches=8)
+    repeated = "Solar capacity in Europe doubled since 2019 driven by rooftop installations"
+    scheduler.run.side_effect = [make_result(repeated), make_result(repeated)]
+
+    updates = [update async for update in manager.iterative_searches("solar", plan_of("solar europe", "solar growth"))]
+
+    assert scheduler.run.await_count == 2
+    assert sorted(result["query"] for result in updates[-1]) == ["solar europe", "solar growth"]
+
+
+@pytest.mark.asyncio
+async def test_iterative_search_expands_while_novel_up_to_budget(tmp_path):
+    """
+    Tests that novel rounds ask the planner for more searches, passing the searches
+    already made, until the search budget is used up.
+    """
+    manager, scheduler = make_manager(tmp_path, iterative_search=True, max_searches=4, searches_per_round=2)
+    summaries = iter([
+        "Solar capacity in Europe doubled since 2019",
+        "Offshore wind auctions were undersubscribed this year",
+        "Battery storage prices fell by forty percent",
+        "Grid interconnectors between Spain and France are delayed",
+    ])
+
+    async def run(agent, input, **kwargs):
+        if agent is planner_agent.planner_agent:
+            return make_result(plan_of("battery storage prices", "grid interconnectors"))
+        return make_result(next(summaries))
+
+    scheduler.run.side_effect = run
+    updates = [update async for update in manager.iterative_searches("energy", plan_of("solar europe", "offshore wind"))]
+
+    planner_input = next(call.args[1] for call in scheduler.run.await_args_list if call.args[0] is planner_agent.planner_agent)
+    assert "Number of searches: 2" in planner_input
+    assert "- solar europe" in planner_input and "- offshore wind" in planner_input
+    assert len(updates[-1]) == 4
+    assert scheduler.run.await_count == 5
+
+
+class FakeStreamResult:
+    def __init__(self, report):
+        self.report = report
+
+    def final_output_as(self, cls):
+        return self.report
+
+
+def text_delta(delta):
+    event = MagicMock()
+    event.type = "raw_response_event"
+    event.data.type = "response.output_text.delta"
+    event.data.delta = delta
+    return event
+
+
+@pytest.mark.asyncio
+async def test_streaming_run_yields_partial_report_before_email(tmp_path, monkeypatch):
+    """
+    Tests that stream_report mode yields the markdown report progressively,
+    including a final short chunk, before the email is queued and the email
+    status is yielded.
+    """
+    report = writer_agent.ReportData(
+        short_summary="Summary.",
+        markdown_report="# Report\n\n" + "evidence " * 20 + "end",
+        follow_up_questions=["Next?"],
+    )
+    payload = report.model_dump_json()
+    monkeypatch.setattr(agents, "RunResultStreaming", FakeStreamResult)
+
+    manager, scheduler = make_manager(tmp_path, stream_report=True)
+    plan = planner_agent.WebSearchPlan(searches=[planner_agent.WebSearchItem(reason="r", query="solar")])
+    scheduler.run.side_effect = [make_result(plan), make_result("summary")]
+
+    async def run_streamed(agent, input, **kwargs):
+        for start in range(0, len(payload), 7):
+            yield text_delta(payload[start:start + 7])
+        yield FakeStreamResult(report)
+
+    scheduler.run_streamed = run_streamed
+    manager.send_email = AsyncMock(side_effect=lambda r: r)
+
+    chunks = [chunk async for chunk in manager.run("solar")]
+
+    partials = [chunk for chunk in chunks if chunk.startswith("# Report")]
+    assert len(partials) >= 3
+    assert all(report.markdown_report.startswith(partial) for partial in partials)
+    assert chunks[-3] == report.markdown_report
+    assert chunks[-2] == research_manager.EMAIL_STATUS["render"]
+    assert chunks[-1] == report.markdown_report
+    manager.send_email.assert_awaited_once_with(report)
+    assert manager.report == report
+
+
+@pytest.mark.asyncio
+async def test_sectioned_report_writes_sections_concurrently_in_outline_order(tmp_path):
+    """
+    Tests that sectioned mode writes every outlined section concurrently from
+    its assigned evidence, streams the report in reading order as sections
+    finish, skips a failed section, and assembles the ReportData locally.
+    """
+    manager, scheduler = make_manager(tmp_path, stream_report=True, sectioned_report=True, email_mode="none")
+    results = [
+        {"query": "solar capacity", "summary": "Solar capacity in Europe grew quickly last year."},
+        {"query": "wind auctions", "summary": "Offshore wind auctions stalled on rising turbine costs."},
+    ]
+    outline = outline_agent.ReportOutline(
+        title="Renewables in Europe",
+        sections=[
+            outline_agent.OutlineSection(heading="Solar", focus="Solar growth", sources=[1]),
+            outline_agent.OutlineSection(heading="Wind", focus="Wind costs", sources=[2]),
+            outline_agent.OutlineSection(heading="Storage", focus="Batteries", sources=[]),
+        ],
+        short_summary="Solar is growing, wind is stalling.",
+        follow_up_questions=["What about storage?"],
+    )
+    in_flight = 0
+    peak = 0
+    delays = {"Solar": 0.05, "Wind": 0.0}
+
+    async def run(agent, input, **kwargs):
+        nonlocal in_flight, peak
+        if agent is outline_agent.outline_agent:
+            return make_result(outline)
+        heading = input.split("Your section: ")[1].splitlines()[0]
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            await asyncio.sleep(delays.get(heading, 0.02))
+            if heading == "Storage":
+                raise RuntimeError("section writer down")
+        finally:
+            in_flight -= 1
+        evidence = input.split("Research evidence")[1]
+        return make_result(f"{heading} body citing: {evidence.splitlines()[-1]}")
+
+    scheduler.run.side_effect = run
+    updates = [update async for update in manager.write_report_streamed("renewables", results)]
+
+    report = updates[-1]
+    assert peak == 3
+    assert report.short_summary == outline.short_summary
+    assert report.follow_up_questions == outline.follow_up_questions
+    assert report.markdown_report.startswith("# Renewables in Europe\n\n## Solar\n\nSolar body")
+    assert "grew quickly" in report.markdown_report.split("## Wind")[0]
+    assert "stalled" in report.markdown_report.split("## Wind")[1]
+    assert "## Storage" not in report.markdown_report
+    # Wind finishes first but is only streamed once Solar, before it, is done.
+    assert all("## Solar" in partial for partial in updates[:-1])
+    assert updates[-2] == report.markdown_report
+
+
+def make_report():
+    return writer_agent.ReportData(short_summary="Summary.", markdown_report="# Report", follow_up_questions=[])
+
+
+@pytest.mark.asyncio
+async def test_failed_run_resumes_from_last_completed_stage(tmp_path):
+    """
+    Tests that a run which failed while writing resumes from its saved
+    search results without planning or searching again.
+    """
+    manager, scheduler = make_manager(tmp_path, email_mode="none")
+    plan = planner_agent.WebSearchPlan(searches=[planner_agent.WebSearchItem(reason="r", query="solar")])
+    summary = "Solar capacity in Europe grew quickly last year."
+    scheduler.run.side_effect = [make_result(plan), make_result(summary), RuntimeError("writer down")]
+
+    with pytest.raises(RuntimeError):
+        async for _ in manager.run("solar power"):
+            pass
+    run_id = manager.run_id
+    assert manager.checkpoints.last_completed_stage(run_id) == checkpoints.SEARCH_RESULTS
+
+    resumed, scheduler = make_manager(tmp_path, email_mode="none", checkpoints=manager.checkpoints)
+    scheduler.run.side_effect = [make_result(make_report())]
+    chunks = [chunk async for chunk in resumed.run("", run_id=run_id)]
+
+    assert scheduler.run.await_count == 1
+    writer_input = scheduler.run.await_args.args[1]
+    assert "solar power" in writer_input
+    assert f"- [S1] {summary}" in writer_input
+    assert chunks[-1] == "# Report"
+    assert resumed.checkpoints.last_completed_stage(run_id) == checkpoints.EMAIL
+
+
+@pytest.mark.asyncio
+async def test_resuming_a_finished_run_makes_no_agent_calls(tmp_path):
+    """
+    Tests that a completed run replays its saved report without any calls.
+    """
+    store = checkpoints.CheckpointStore(path=str(tmp_path / "checkpoints.sqlite"))
+    run_id = store.create_run("solar power")
+    store.save(run_id, checkpoints.REPORT, make_report().model_dump())
+    store.save(run_id, checkpoints.EMAIL, {"mode": "render"})
+
+    manager, scheduler = make_manager(tmp_path, checkpoints=store)
+    manager.send_email = AsyncMock()
+    chunks = [chunk async for chunk in manager.run("", run_id=run_id)]
+
+    scheduler.run.assert_not_awaited()
+    manager.send_email.assert_not_awaited()
+    assert chunks[-1] == "# Report"
+
+
+@pytest.mark.asyncio
+async def test_repeat_query_is_answered_from_the_report_store(tmp_path):
+    """
+    Tests that a query matching a stored report is answered from it without
+    any agent calls, and that the answer is checkpointed like a new report.
+    """
+    manager, scheduler = make_manager(tmp_path, email_mode="none")
+    manager.report_store.save("Solar power in Europe", make_report(), [])
+
+    chunks = [chunk async for chunk in manager.run("solar power  in europe")]
+
+    scheduler.run.assert_not_awaited()
+    assert any("Reusing the report on 'Solar power in Europe'" in chunk for chunk in chunks)
+    assert chunks[-1] == "# Report"
+    assert manager.checkpoints.last_completed_stage(manager.run_id) == checkpoints.EMAIL
+
+
+@pytest.mark.asyncio
+async def test_similar_query_is_seeded_from_a_stored_report(tmp_path):
+    """
+    Tests that a query similar to a stored one plans searches beyond the
+    stored report's, writes from both sets of summaries, and is stored too.
+    """
+    manager, scheduler = make_manager(tmp_path, email_mode="none", reuse_threshold=0.99)
+    prior = [{"query": "solar capacity europe", "summary": "Capacity doubled since 2019."}]
+    manager.report_store.save("solar power in europe", make_report(), prior)
+    plan = planner_agent.WebSearchPlan(searches=[planner_agent.WebSearchItem(reason="r", query="solar subsidies")])
+    scheduler.run.side_effect = [make_result(plan), make_result("Feed-in tariffs for rooftop solar are being phased out."), make_result(make_report())]
+
+    chunks = [chunk async for chunk in manager.run("solar power growth in europe")]
+
+    assert scheduler.run.await_count == 3
+    planner_input = scheduler.run.await_args_list[0].args[1]
+    assert "Searches already performed:\n- solar capacity europe" in planner_input
+    writer_input = scheduler.run.await_args_list[2].args[1]
+    assert "Capacity doubled since 2019." in writer_input
+    assert "Feed-in tariffs for rooftop solar are being phased out." in writer_input
+    assert chunks[-1] == "# Report"
+    assert manager.report_store.count() == 2
+
+
+@pytest.mark.asyncio
+async def test_tight_budget_scales_the_run_down_instead_of_failing(tmp_path):
+    """
+    Tests that a cost budget covering one search asks the planner for one,
+    searches only that one and still writes the report.
+    """
+    run_budget = budget.RunBudget(tokens=None, cost=0.03, seconds=None)
+    manager, scheduler = make_manager(tmp_path, email_mode="none", budget=run_budget, metrics=metrics.MetricsRegistry())
+    plan = planner_agent.WebSearchPlan(
+        searches=[planner_agent.WebSearchItem(reason="r", query=q) for q in ("solar", "wind")]
+    )
+    summary = "Solar capacity in Europe grew quickly last year."
+    scheduler.run.side_effect = [make_result(plan), make_result(summary), make_result(make_report())]
+
+    chunks = [chunk async for chunk in manager.run("renewables in europe")]
+
+    assert "Scaled down to fit the budget: 1 search" in chunks
+    assert scheduler.run.await_count == 3
+    assert "Number of searches: 1" in scheduler.run.await_args_list[0].args[1]
+    assert "Search term: solar" in scheduler.run.await_args_list[1].args[1]
+    assert chunks[-1] == "# Report"
+    assert manager.metrics.counter("budget_degradations_total", step="searches") == 2
+    assert run_budget.stats()["reserved_cost"] == 0
+
+
+def test_plan_budget_does_not_carry_limits_over_to_the_next_query(tmp_path):
+    """
+    Tests that a search limit set by scaling one query down is cleared when
+    the next query is planned with room to spare.
+    """
+    run_budget = budget.RunBudget(tokens=None, cost=0.03, seconds=None)
+    manager, _ = make_manager(tmp_path, email_mode="none", budget=run_budget)
+    assert manager.plan_budget("renewables in europe") is not None
+    assert manager.search_limit == 1
+
+    run_budget.cost = None
+    assert manager.plan_budget("renewables in asia") is None
+    assert manager.search_limit is None
+    assert manager.run_plan.searches > 1
+    manager.release_writing_hold()
+
+
+def test_sectioned_report_length_counts_every_writer_read(tmp_path):
+    """
+    Tests that sectioned mode budgets the outline pass and each section
+    reading the evidence, and so settles on a shorter report than one writer call.
+    """
+    writer_input = "Original query: solar\n" + "evidence " * 4000
+    lengths = {}
+    for sectioned in (False, True):
+        run_budget = budget.RunBudget(tokens=None, cost=None, seconds=None)
+        manager, _ = make_manager(tmp_path, email_mode="none", budget=run_budget, sectioned_report=sectioned)
+        single = budget.estimate_call(writer_agent.writer_agent, writer_input, budget.report_output_tokens(None))
+        run_budget.cost = single.cost * 1.5
+        lengths[sectioned] = manager.fit_report_length(writer_input)
+
+    assert lengths[False] is None
+    assert lengths[True] == budget.REPORT_WORD_LIMITS[-1]
+
+
+@pytest.mark.asyncio
+async def test_unknown_run_id_is_rejected(tmp_path):
+    """
+    Tests that resuming an unknown run ID raises instead of starting over.
+    """
+    manager, _ = make_manager(tmp_path)
+    with pytest.raises(ValueError):
+        async for _ in manager.run("", run_id="missing"):
+            pass
+
+
+def clarifying_agents(plans, questions, slow=()):
+    """Fake scheduler.run answering by agent, recording the searches that ran and were cancelled."""
+    followup_agent = import_app_module("followup_agent")
+    calls = {"search": [], "cancelled": [], "writer": []}
+    plans = iter(plans)
+
+    async def run(agent, input, **kwargs):
+        if agent.name == "FollowupQuestionsAgent":
+            return make_result(followup_agent.FollowUpQuestions(
+                questions=[followup_agent.FollowUpQuestion(question=q) for q in questions]
+            ))
+        if agent.name == "PlannerAgent":
+            await asyncio.sleep(0.01)
+            return make_result(planner_agent.WebSearchPlan(
+                searches=[planner_agent.WebSearchItem(reason="r", query=q) for q in next(plans)]
+            ))
+        if agent.name == "WriterAgent":
+            calls["writer"].append(input)
+            return make_result(make_report())
+        term = input.splitlines()[0].removeprefix("Search term: ")
+        calls["search"].append(term)
+        try:
+            await asyncio.sleep(5 if term in slow else 0.01)
+        except asyncio.CancelledError:
+            calls["cancelled"].append(term)
+            raise
+        return make_result(f"Findings about {term} from several sources.")
+
+    return run, calls
+
+
+@pytest.mark.asyncio
+async def test_clarification_reconciles_speculative_searches_with_answers(tmp_path):
+    """
+    Tests that clarifying questions and the plan run concurrently, searches
+    start before the answers arrive, and the replanned searches keep matching
+    speculative searches, add new ones and cancel obsolete ones.
+    """
+    manager, scheduler = make_manager(tmp_path, email_mode="none", clarify=True)
+    scheduler.run.side_effect, calls = clarifying_agents(
+        plans=[["solar panel costs", "solar subsidy policy"], ["solar panel costs", "rooftop solar installers"]],
+        questions=["Which country?"],
+        slow={"solar subsidy policy"},
+    )
+
+    chunks = []
+    async for chunk in manager.run("solar power"):
+        chunks.append(chunk)
+        if chunk.startswith("A few questions"):
+            assert "1. Which country?" in chunk
+            assert calls["search"] == []
+            await asyncio.sleep(0.05)
+            assert sorted(calls["search"]) == ["solar panel costs", "solar subsidy policy"]
+            manager.answer("Germany, for homeowners")
+
+    assert sorted(calls["search"]) == ["rooftop solar installers", "solar panel costs", "solar subsidy policy"]
+    assert calls["cancelled"] == ["solar subsidy policy"]
+    assert "Answers: Germany, for homeowners" in calls["writer"][0]
+    assert "[S2] rooftop solar installers" in calls["writer"][0]
+    assert chunks[-1] == "# Report"
+    saved = manager.checkpoints.load(manager.run_id)
+    assert saved[checkpoints.CLARIFICATION] == {"questions": ["Which country?"], "answers": "Germany, for homeowners"}
+    assert manager.metrics.counter("speculative_searches_total", outcome="kept") >= 1
+
+
+@pytest.mark.asyncio
+async def test_clarification_without_answers_keeps_the_initial_plan(tmp_path):
+    """
+    Tests that when no answers arrive in time the speculative searches are
+    used as they are, without replanning.
+    """
+    manager, scheduler = make_manager(tmp_path, email_mode="none", clarify=True, clarification_timeout=0.05)
+    scheduler.run.side_effect, calls = clarifying_agents(plans=[["solar panel costs"]], questions=["Which country?"])
+
+    chunks = [chunk async for chunk in manager.run("solar power")]
+
+    # The questions arrive before the plan and stay in the update that follows.
+    planned = next(chunk for chunk in chunks if chunk.startswith("Searches planned"))
+    assert "1. Which country?" in planned
+    assert "Continuing with the initial search plan..." in chunks
+    assert calls["search"] == ["solar panel costs"]
+    assert "Answers:" not in calls["writer"][0]
+    assert manager.checkpoints.load(manager.run_id)[checkpoints.CLARIFICATION]["answers"] is None
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_uses_the_corpus_when_it_covers_the_search(tmp_path):
+    """
+    Tests that hybrid search summarizes local passages when they contain the
+    search's words, and searches the web when the corpus has nothing on it.
+    """
+    index = corpus_index.CorpusIndex(str(tmp_path / "index"))
+    index.add_documents([("solar.md", "Rooftop solar panel prices fell sharply across Europe last year.")])
+    registry = metrics.MetricsRegistry()
+    manager, scheduler = make_manager(tmp_path, search_backend="hybrid", corpus_index=index, metrics=registry)
+    scheduler.run.return_value = make_result("summary")
+
+    await manager.search(planner_agent.WebSearchItem(reason="r", query="solar panel prices Europe"))
+    corpus_agent, input = scheduler.run.await_args.args[:2]
+    # The hits hybrid search found are summarized, not searched for again.
+    assert corpus_agent.name == "Corpus summary agent"
+    assert corpus_agent.tools == []
+    assert "Rooftop solar panel prices fell sharply" in input
+    assert "solar.md" in input
+
+    await manager.search(planner_agent.WebSearchItem(reason="r", query="deep sea mining permits"))
+    assert scheduler.run.await_args.args[0].name == "Search agent"
+    assert registry.counter("search_backend_total", backend="local") == 1
+    assert registry.counter("search_backend_total", backend="web") == 1
+
+    with pytest.raises(ValueError):
+        make_manager(tmp_path, search_backend="intranet")
@@ -0,0 +1,201 @@
+import asyncio
+
+import httpx
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+from openai import RateLimitError
+
+from deep_research.metrics import MetricsRegistry
+from deep_research.scheduler import (
+    AgentScheduler,
+    TokenBucket,
+    BATCH,
+    INTERACTIVE,
+    result_tokens,
+)
+
+
+def make_rate_limit_error():
+    request = httpx.Request("POST", "https://api.openai.com/v1/responses")
+    return RateLimitError("rate limited", response=httpx.Response(429, request=request), body=None)
+
+
+def make_result(input_tokens=10, output_tokens=5):
+    response = MagicMock()
+    response.usage.input_tokens = input_tokens
+    response.usage.output_tokens = output_tokens
+    result = MagicMock()
+    result.raw_responses = [response]
+    return result
+
+
+def test_token_bucket_reserve_returns_wait_for_debt():
+    """
+    Tests that reserving beyond the bucket level returns the refill wait.
+    """
+    bucket = TokenBucket(per_minute=60, capacity=2)
+    assert bucket.reserve(2) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+
+
+def test_result_tokens_sums_raw_responses():
+    """
+    Tests that token usage is summed over every model response.
+    """
+    result = make_result()
+    result.raw_responses = result.raw_responses * 2
+    assert result_tokens(result) == (20, 10)
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_and_priority_lanes():
+    """
+    Tests that no more than max_concurrency calls run at once and that queued
+    interactive calls are served before queued batch calls.
+    """
+    scheduler = AgentScheduler(max_concurrency=1, requests_per_minute=10_000, tokens_per_minute=10_000_000)
+    order = []
+    release = asyncio.Event()
+
+    async def hold():
+        async with scheduler.slot():
+            await release.wait()
+
+    async def call(name, priority):
+        async with scheduler.slot(priority):
+            order.append(name)
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    tasks = [
+        asyncio.create_task(call("batch", BATCH)),
+        asyncio.create_task(call("interactive", INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.stats()["active"] == 1
+    assert scheduler.stats()["queued"] == 2
+
+    release.set()
+    await asyncio.gather(holder, *tasks)
+    assert order == ["interactive", "batch"]
+    assert scheduler.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_run_retries_rate_limit_errors():
+    """
+    Tests that rate-limit errors are retried and usage is recorded on success.
+    """
+    scheduler = AgentScheduler(base_delay=0.0)
+    agent = MagicMock()
+    agent.name = "Search agent"
+    side_effect = [make_rate_limit_error(), make_rate_limit_error(), make_result()]
+
+    with patch("agents.Runner.run", new_callable=AsyncMock, side_effect=side_effect) as mock_run:
+        await scheduler.run(agent, "input")
+
+    assert mock_run.await_count == 3
+    stats = scheduler.stats()
+    assert stats["retries"] == 2
+    assert stats["input_tokens"] == 10
+    assert stats["output_tokens"] == 5
+
+
+@pytest.mark.asyncio
+async def test_run_records_per_agent_metrics():
+    """
+    Tests that calls, retries, tokens and latency are recorded per agent.
+    """
+    metrics = MetricsRegistry(jsonl_path=None)
+    scheduler = AgentScheduler(base_delay=0.0, metrics=metrics)
+    agent = MagicMock()
+    agent.name = "Search agent"
+    side_effect = [make_rate_limit_error(), make_result(input_tokens=30, output_tokens=7)]
+
+    with patch("agents.Runner.run", new_callable=AsyncMock, side_effect=side_effect):
+        await scheduler.run(agent, "input")
+
+    assert metrics.counter("agent_calls_total", agent="Search agent") == 1
+    assert metrics.counter("agent_retries_total", agent="Search agent") == 1
+    assert metrics.counter("agent_input_tokens_total", agent="Search agent") == 30
+    assert metrics.counter("agent_output_tokens_total", agent="Search agent") == 7
+    assert metrics.histogram("agent_latency_seconds", agent="Search agent").count == 1
+
+
+@pytest.mark.asyncio
+async def test_run_raises_other_errors_without_retry():
+    """
+    Tests that non rate-limit errors are raised immediately.
+    """
+    scheduler = AgentScheduler(base_delay=0.0)
+    agent = MagicMock()
+
+    with patch("agents.Runner.run", new_callable=AsyncMock, side_effect=ValueError("boom")) as mock_run:
+        with pytest.raises(ValueError):
+            await scheduler.run(agent, "input")
+
+    assert mock_run.await_count == 1
+    assert scheduler.stats()["failures"] == 1
+    assert scheduler.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_calls_waiting_on_quota_do_not_hold_slots():
+    """
+    Tests that a call throttled by token-bucket debt leaves the concurrency
+    slot free for other calls while it waits.
+    """
+    scheduler = AgentScheduler(max_concurrency=1, requests_per_minute=10_000, tokens_per_minute=60)
+
+    async def throttled():
+        async with scheduler.slot(BATCH, estimated_tokens=600):
+            pass
+
+    waiting = asyncio.create_task(throttled())
+    await asyncio.sleep(0)
+    assert scheduler.stats()["active"] == 0
+
+    scheduler.tokens.adjust(-10_000)
+    async with scheduler.slot(INTERACTIVE, estimated_tokens=1):
+        assert scheduler.stats()["active"] == 1
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert scheduler.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_streamed_run_retries_rate_limits_before_model_output():
+    """
+    Tests that a 429 raised after the SDK's agent-updated event, but before
+    any model output, is retried, and that the failed attempt's token
+    reservation is refunded.
+    """
+    scheduler = AgentScheduler(base_delay=0.0, tokens_per_minute=10_000)
+    agent = MagicMock()
+    agent.name = "WriterAgent"
+    attempts = []
+
+    def run_streamed(agent, input, **kwargs):
+        attempts.append(input)
+        result = make_result(input_tokens=0, output_tokens=0)
+        fail = len(attempts) == 1
+
+        async def stream_events():
+            yield MagicMock(type="agent_updated_stream_event")
+            if fail:
+                raise make_rate_limit_error()
+            yield MagicMock(type="raw_response_event")
+
+        result.stream_events = stream_events
+        return result
+
+    with patch("agents.Runner.run_streamed", side_effect=run_streamed):
+        events = [event async for event in scheduler.run_streamed(agent, "input", estimated_tokens=1000)]
+
+    assert len(attempts) == 2
+    assert scheduler.stats()["retries"] == 1
+    assert events[-2].type == "raw_response_event"
+    # One attempt's estimate is still held; the failed one was refunded.
+    assert scheduler.tokens.level == pytest.approx(9000, abs=5)
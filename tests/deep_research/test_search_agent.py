@@ -5,8 +5,10 @@ from agents import Agent, WebSearchTool
 from agents.model_settings import ModelSettings
 from deep_research.search_agent import (
     search_agent,
+    corpus_search_agent,
     main,
     INSTRUCTIONS,
+    CORPUS_INSTRUCTIONS,
 )
 
 
@@ -55,4 +57,14 @@ async def test_main_execution_flow(capsys):
         assert mock_summary in captured.out
 
         # 6. Assert the return value
-        assert result == mock_summary
\ No newline at end of file
+        assert result == mock_summary
+
+
+def test_corpus_search_agent_configuration():
+    """
+    Tests that the corpus search agent must call its local search tool.
+    """
+    assert isinstance(corpus_search_agent, Agent)
+    assert corpus_search_agent.instructions == CORPUS_INSTRUCTIONS
+    assert [tool.name for tool in corpus_search_agent.tools] == ["search_corpus"]
+    assert corpus_search_agent.model_settings.tool_choice == "required"
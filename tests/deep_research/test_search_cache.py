@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+from deep_research.search_cache import SearchCache, normalize_query
+
+
+def test_normalize_query():
+    """
+    Tests that whitespace and case differences map to the same key.
+    """
+    assert normalize_query("  Solar   Power\nEurope ") == "solar power europe"
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    """
+    Tests that a summary stored by one cache instance is served from memory,
+    and from disk by a second instance sharing the same path.
+    """
+    path = str(tmp_path / "cache.sqlite")
+    cache = SearchCache(path=path)
+    assert cache.get("solar power") is None
+
+    cache.set("Solar Power", "summary")
+    assert cache.get("solar  power") == "summary"
+
+    other = SearchCache(path=path)
+    assert other.get("SOLAR POWER") == "summary"
+
+    assert cache.stats()["memory_hits"] == 1
+    assert other.stats()["disk_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_expiry(tmp_path):
+    """
+    Tests that entries older than the TTL are treated as missing in both tiers.
+    """
+    cache = SearchCache(path=str(tmp_path / "cache.sqlite"), ttl_seconds=60)
+    with patch("deep_research.search_cache.time.time", return_value=1000.0):
+        cache.set("wind power", "summary")
+    with patch("deep_research.search_cache.time.time", return_value=1061.0):
+        assert cache.get("wind power") is None
+    assert cache.stats()["disk_entries"] == 0
+
+
+def test_size_based_eviction(tmp_path):
+    """
+    Tests that the memory tier evicts its least recently used entry and the
+    disk tier is trimmed to its size limit.
+    """
+    cache = SearchCache(path=str(tmp_path / "cache.sqlite"), max_memory_entries=2, max_disk_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    cache.get("a")
+    cache.set("c", "C")
+
+    stats = cache.stats()
+    assert stats["memory_entries"] == 2
+    assert stats["disk_entries"] == 2
+
+    memory_only = SearchCache(path=None, max_memory_entries=2)
+    memory_only.set("a", "A")
+    memory_only.set("b", "B")
+    memory_only.get("a")
+    memory_only.set("c", "C")
+    assert memory_only.get("b") is None
+    assert memory_only.get("a") == "A"
+    assert memory_only.get("c") == "C"
+
+
+def test_memory_only_cache():
+    """
+    Tests that the cache works without a disk tier.
+    """
+    cache = SearchCache(path=None)
+    cache.set("hydro", "summary")
+    assert cache.get("hydro") == "summary"
+    assert cache.stats()["disk_entries"] == 0
@@ -0,0 +1,58 @@
+from deep_research.planner_agent import WebSearchItem, WebSearchPlan
+from deep_research.search_dedup import cluster_queries, dedupe_plan, query_similarity
+
+
+def test_query_similarity_ignores_word_order_and_stopwords():
+    """
+    Tests that reordered queries are identical and unrelated ones are not.
+    """
+    assert query_similarity("future of renewable energy in Europe", "Europe renewable energy future") == 1.0
+    assert query_similarity("battery storage costs", "grid integration challenges") == 0.0
+
+
+def test_cluster_queries_threshold():
+    """
+    Tests that the threshold decides whether close queries are merged.
+    """
+    queries = ["renewable energy trends Europe 2025", "renewables trend Europe 2025", "wind power Germany"]
+    assert cluster_queries(queries, threshold=0.7) == [[0, 1], [2]]
+    assert cluster_queries(queries, threshold=0.95) == [[0], [1], [2]]
+
+
+def test_dedupe_plan_merges_reasons():
+    """
+    Tests that one search is kept per cluster with the reasons merged.
+    """
+    plan = WebSearchPlan(
+        searches=[
+            WebSearchItem(reason="Get the outlook.", query="future of renewable energy in Europe"),
+            WebSearchItem(reason="Understand policy.", query="EU renewable energy policy"),
+            WebSearchItem(reason="Check projections.", query="Europe renewable energy future"),
+        ]
+    )
+
+    deduped = dedupe_plan(plan)
+
+    assert [item.query for item in deduped.searches] == [
+        "future of renewable energy in Europe",
+        "EU renewable energy policy",
+    ]
+    assert deduped.searches[0].reason == "Get the outlook. Check projections."
+    assert len(plan.searches) == 3
+
+
+def test_queries_differing_in_numbers_or_entities_are_not_merged():
+    """
+    Tests that a different year or country keeps queries apart, however
+    close the rest of the text is.
+    """
+    assert query_similarity("electric vehicle sales 2023", "electric vehicle sales 2024") == 0.0
+    assert query_similarity("renewable energy policy Germany 2025", "renewable energy policy France 2025") == 0.0
+    assert cluster_queries(["electric vehicle sales 2023", "electric vehicle sales 2024"]) == [[0], [1]]
+
+
+def test_capitalization_alone_does_not_block_merging():
+    """
+    Tests that a capitalized word present in both queries still matches.
+    """
+    assert query_similarity("Solar power Germany", "germany solar power") == 1.0
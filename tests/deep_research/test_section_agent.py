@@ -0,0 +1,26 @@
+from agents import Agent
+from deep_research.outline_agent import ReportOutline, outline_agent
+from deep_research.section_agent import INSTRUCTIONS, section_agent, section_input
+
+
+def test_agent_configuration():
+    """
+    Tests that the outline agent returns a structured outline and the section writer plain markdown.
+    """
+    assert isinstance(outline_agent, Agent)
+    assert outline_agent.output_type == ReportOutline
+    assert isinstance(section_agent, Agent)
+    assert section_agent.name == "SectionWriterAgent"
+    assert section_agent.instructions == INSTRUCTIONS
+    assert section_agent.output_type is None
+
+
+def test_section_input_marks_the_section_to_write():
+    """
+    Tests that the section prompt carries the whole outline, marks this
+    section in it, and includes the focus, length and evidence.
+    """
+    prompt = section_input("renewables", "Renewables", ["Solar", "Wind"], 1, "Wind costs", "- [S1] Costs rose.", 300)
+    assert "1. Solar\n2. Wind  <- your section" in prompt
+    assert "Your section: Wind\nFocus: Wind costs\nLength: about 300 words" in prompt
+    assert prompt.endswith("- [S1] Costs rose.")
@@ -0,0 +1,93 @@
+import json
+
+from starlette.testclient import TestClient
+
+from tests.deep_research.app_modules import import_app_module
+
+service = import_app_module("service")
+benchmark = import_app_module("benchmark")
+
+
+def test_submission_backpressure_and_coalescing():
+    """
+    Tests that identical queries join the queued job, that submissions beyond
+    the queue bound get 503 with Retry-After, and the job endpoints' errors.
+    """
+    research = service.ResearchService(workers=0, max_queue=2)
+    client = TestClient(research.app)
+
+    first = client.post("/jobs", json={"query": "Solar power"})
+    assert first.status_code == 202
+    job_id = first.json()["job_id"]
+    joined = client.post("/jobs", json={"query": "solar  POWER"})
+    assert joined.status_code == 200
+    assert joined.json()["job_id"] == job_id and joined.json()["coalesced"]
+
+    assert client.post("/jobs", json={"query": "wind power"}).status_code == 202
+    busy = client.post("/jobs", json={"query": "hydro power"})
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"] == str(service.RETRY_AFTER_SECONDS)
+
+    assert client.post("/jobs", json={}).status_code == 400
+    assert client.post("/jobs", json=["Solar power"]).status_code == 400
+    assert client.get("/jobs/missing").status_code == 404
+    assert client.get(f"/jobs/{job_id}").json()["status"] == service.QUEUED
+    assert client.get(f"/jobs/{job_id}/report").status_code == 409
+
+
+def test_partial_reports_are_compacted_and_finished_jobs_keep_the_outcome():
+    """
+    Tests that each cumulative partial report replaces the one before it while
+    status updates are kept, and that a finished job only keeps its final event.
+    """
+    research = service.ResearchService(workers=0)
+    job = service.Job("Solar power", None)
+    research.jobs[job.id] = job
+
+    research._apply(job.id, "started", 1)
+    research._apply(job.id, "update", "Searching...")
+    for partial in ("# Solar", "# Solar power", "# Solar power\n\nPanels"):
+        research._apply(job.id, "update", partial)
+    research._apply(job.id, "update", "Report written")
+    assert job.events == [
+        ("started", 1),
+        ("update", "Searching..."),
+        ("update", "# Solar power\n\nPanels"),
+        ("update", "Report written"),
+    ]
+
+    report = {"short_summary": "s", "markdown_report": "m", "follow_up_questions": []}
+    research._apply(job.id, "report", report)
+    assert job.events == [("report", report)]
+    assert job.report == report
+
+
+def test_job_runs_in_worker_process_and_streams_events():
+    """
+    Tests a job end to end on a worker process running the simulated model:
+    updates stream over SSE and the final ReportData is served as JSON.
+    """
+    research = service.ResearchService(workers=1, jobs_per_worker=2, manager_factory=benchmark.offline_manager)
+    with TestClient(research.app) as client:
+        job_id = client.post("/jobs", json={"query": "battery storage"}).json()["job_id"]
+
+        events = []
+        with client.stream("GET", f"/jobs/{job_id}/events") as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            kind = None
+            for line in response.iter_lines():
+                if line.startswith("event: "):
+                    kind = line.removeprefix("event: ")
+                elif line.startswith("data: "):
+                    events.append((kind, json.loads(line.removeprefix("data: "))))
+
+        kinds = [kind for kind, _ in events]
+        assert kinds[0] == "started" and kinds[-1] == "report"
+        assert "update" in kinds
+        assert any(data == "Research complete" for kind, data in events if kind == "update")
+
+        report = client.get(f"/jobs/{job_id}/report")
+        assert report.status_code == 200
+        assert set(report.json()) == {"short_summary", "markdown_report", "follow_up_questions"}
+        assert client.get(f"/jobs/{job_id}").json()["status"] == service.DONE
+        assert client.get("/healthz").json()["workers"] == 1
@@ -0,0 +1,69 @@
+import pytest
+
+from deep_research import startup
+from tests.deep_research.app_modules import import_app_module
+
+agent_registry = import_app_module("agent_registry")
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |       2500 | site
+import time:       900 |       1500 |     planner_agent
+import time:      4000 |       5500 |   schemas
+import time:      1000 |       6500 | research_manager
+"""
+
+
+def test_parse_importtime_reads_nesting_and_cumulative_time():
+    """
+    Tests that each module maps to its nesting level and cumulative import time.
+    """
+    modules = startup.parse_importtime(IMPORTTIME)
+    assert modules["research_manager"] == (0, 6500)
+    assert modules["schemas"] == (1, 5500)
+    assert modules["planner_agent"] == (2, 1500)
+    assert "imported" not in modules
+
+
+def test_compare_startup_flags_heavy_imports_and_slowdowns():
+    """
+    Tests that heavy modules at startup are always regressions, and that import
+    time is only gated beyond both the tolerance and the noise floor.
+    """
+    baseline = {"targets": {"cli": {"import_ms": 50.0}, "service": {"import_ms": 10.0}}}
+    results = {
+        "targets": {
+            "cli": {"import_ms": 90.0, "heavy_modules": []},
+            "service": {"import_ms": 25.0, "heavy_modules": ["gradio"]},
+            "batch": {"import_ms": 500.0, "heavy_modules": []},
+        }
+    }
+    regressions = startup.compare_startup(results, baseline, tolerance=0.5)
+    assert regressions == [
+        "cli import time 90.0ms vs baseline 50.0ms",
+        "service imports gradio at startup",
+    ]
+
+
+def test_core_modules_import_without_heavy_dependencies():
+    """
+    Tests in a fresh interpreter that the research pipeline, batch runner and
+    CLI import without loading the Agents SDK, OpenAI, Gradio or Brevo.
+    """
+    for name in ("cli", "research_manager", "batch"):
+        directory, module = startup.STARTUP_TARGETS[name]
+        milliseconds, heavy = startup.measure_import(directory, module)
+        assert milliseconds > 0
+        assert heavy == [], f"{module} loads {heavy}"
+
+
+def test_agent_registry_builds_each_agent_once():
+    """
+    Tests that agents are looked up by name, cached, and that unknown names fail.
+    """
+    planner = agent_registry.get_agent("planner")
+    assert planner.name == "PlannerAgent"
+    assert agent_registry.get_agent("planner") is planner
+    with pytest.raises(ValueError, match="Unknown agent"):
+        agent_registry.get_agent("translator")
@@ -0,0 +1,167 @@
+from types import SimpleNamespace
+
+from tests.deep_research.app_modules import import_app_module
+
+trace_export = import_app_module("trace_export")
+metrics = import_app_module("metrics")
+
+
+class RecordingProcessor:
+    def __init__(self):
+        self.events = []
+
+    def on_trace_start(self, trace):
+        self.events.append(("trace_start", trace.trace_id))
+
+    def on_trace_end(self, trace):
+        self.events.append(("trace_end", trace.trace_id))
+
+    def on_span_start(self, span):
+        self.events.append(("span_start", span.span_id))
+
+    def on_span_end(self, span):
+        self.events.append(("span_end", span.span_id))
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self):
+        pass
+
+
+class FakeItem:
+    def __init__(self, record):
+        self.record = record
+
+    def export(self):
+        return self.record
+
+
+def make_trace(trace_id, name="Research trace"):
+    return SimpleNamespace(trace_id=trace_id, name=name)
+
+
+def make_span(trace_id, span_id, error=None):
+    return SimpleNamespace(trace_id=trace_id, span_id=span_id, error=error)
+
+
+def run_trace(sampler, trace_id, error=None):
+    trace = make_trace(trace_id)
+    span = make_span(trace_id, f"{trace_id}-span", error)
+    sampler.on_trace_start(trace)
+    sampler.on_span_start(span)
+    sampler.on_span_end(span)
+    sampler.on_trace_end(trace)
+
+
+def test_head_sampling_forwards_or_drops_whole_traces():
+    """
+    Tests that a sampled trace streams through as it runs and that an
+    unsampled, healthy and fast trace never reaches the exporters.
+    """
+    recorder = RecordingProcessor()
+    registry = metrics.MetricsRegistry()
+    sampler = trace_export.SamplingProcessor(
+        [recorder], default_rate=1.0, rates={"Research trace": 0.0, "Other": 1.0}, metrics=registry
+    )
+
+    run_trace(sampler, "dropped")
+    assert recorder.events == []
+    assert registry.counter("traces_total", decision="dropped") == 1
+
+    other = make_trace("kept", name="Other")
+    sampler.on_trace_start(other)
+    assert recorder.events == [("trace_start", "kept")]
+    sampler.on_trace_end(other)
+    assert registry.counter("traces_total", decision="sampled") == 1
+
+
+def test_errored_and_slow_traces_are_kept_by_tail_sampling():
+    """
+    Tests that an unsampled trace with an errored span, or one that ran past
+    ``slow_seconds``, is replayed to the exporters when it ends.
+    """
+    recorder = RecordingProcessor()
+    registry = metrics.MetricsRegistry()
+    sampler = trace_export.SamplingProcessor([recorder], default_rate=0.0, slow_seconds=3600, metrics=registry)
+
+    run_trace(sampler, "failed", error={"message": "boom"})
+    assert recorder.events == [
+        ("trace_start", "failed"),
+        ("span_start", "failed-span"),
+        ("span_end", "failed-span"),
+        ("trace_end", "failed"),
+    ]
+    assert registry.counter("traces_total", decision="kept_error") == 1
+
+    sampler.slow_seconds = 0
+    run_trace(sampler, "slow")
+    assert ("trace_end", "slow") in recorder.events
+    assert registry.counter("traces_total", decision="kept_slow") == 1
+
+
+def test_local_exporter_writes_compressed_batches(tmp_path):
+    """
+    Tests that exported traces and spans are written in batches of gzip
+    JSON lines that read back in order, and that a full queue drops items.
+    """
+    exporter = trace_export.LocalTraceExporter(str(tmp_path), batch_size=2, flush_interval=3600)
+    exporter.on_trace_start(FakeItem({"object": "trace", "id": "t1"}))
+    exporter.on_span_end(FakeItem({"object": "trace.span", "id": "s1"}))
+    exporter.on_span_end(FakeItem({"object": "trace.span", "id": "s2"}))
+    exporter.shutdown()
+
+    assert [record["id"] for record in trace_export.read_trace_files(str(tmp_path))] == ["t1", "s1", "s2"]
+    assert len(list(tmp_path.glob("traces-*.jsonl.gz"))) == exporter.files == 2
+
+    full = trace_export.LocalTraceExporter(str(tmp_path / "full"), max_queue=1)
+    full.shutdown()
+    full.on_span_end(FakeItem({"object": "trace.span", "id": "s3"}))
+    full.on_span_end(FakeItem({"object": "trace.span", "id": "s4"}))
+    assert full.dropped == 1
+
+
+def span_record(span_id, kind, start, end, parent=None, name=None, error=None):
+    return {
+        "object": "trace.span",
+        "id": span_id,
+        "trace_id": "trace_1",
+        "parent_id": parent,
+        "started_at": f"2026-01-01T00:00:{start:02d}+00:00",
+        "ended_at": f"2026-01-01T00:00:{end:02d}+00:00",
+        "span_data": {"type": kind, "name": name},
+        "error": error,
+    }
+
+
+def test_summary_splits_agent_latency_into_model_and_tool_time():
+    """
+    Tests that the summary counts calls and errors per agent, attributes
+    nested response and function spans to the agent, and measures the workflow.
+    """
+    records = [
+        {"object": "trace", "id": "trace_1", "workflow_name": "Research trace"},
+        span_record("a1", "agent", 0, 10, name="SearchAgent"),
+        span_record("r1", "response", 0, 6, parent="a1"),
+        span_record("f1", "function", 6, 9, parent="a1"),
+        span_record("a2", "agent", 10, 14, name="SearchAgent", error={"message": "timeout"}),
+        span_record("a3", "agent", 14, 20, name="WriterAgent"),
+        span_record("r3", "response", 14, 20, parent="a3"),
+    ]
+    summary = trace_export.summarize_traces(records)
+
+    search = summary["agents"]["SearchAgent"]
+    assert (search["calls"], search["errors"]) == (2, 1)
+    assert search["total_seconds"] == 14.0
+    assert (search["model_seconds"], search["tool_seconds"]) == (6.0, 3.0)
+    assert summary["agents"]["WriterAgent"]["model_seconds"] == 6.0
+    assert summary["workflows"]["Research trace"]["count"] == 1
+    assert summary["workflows"]["Research trace"]["p50"] == 20.0
+
+
+def test_parse_sample_rates():
+    """
+    Tests that per-workflow rates are parsed and blank entries ignored.
+    """
+    assert trace_export.parse_sample_rates("Research trace=0.1, Search=0,") == {"Research trace": 0.1, "Search": 0.0}
+    assert trace_export.parse_sample_rates("") == {}